@@ -0,0 +1,199 @@
+import datetime
+import numpy as np
+from transaction_store import EPOCH_ORDINAL, INCOME, TransactionStore, to_days
+
+# Reports over the ledger's columns in a TransactionStore (one element per transaction, kept
+# current from DBManager's data-change events). Every report is a handful of vectorised
+# passes over those columns, so it costs the same at any granularity and needs no SQL.
+# Amounts are int64 cents so sums stay exact; dates are int32 days since 1970-01-01.
+
+GRANULARITIES = ("day", "week", "month", "year")
+LABEL_FORMATS = {"day": "%d %b", "week": "%d %b", "month": "%b %y", "year": "%Y"}
+
+
+def period_keys(days, granularity):
+    """Maps days since the epoch to consecutive period numbers (day, Monday-based week, month or year)."""
+    if granularity == "day":
+        return days.astype(np.int64)
+    if granularity == "week":
+        return (days.astype(np.int64) + 3) // 7  # 1970-01-01 was a Thursday
+    if granularity == "month":
+        return days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    if granularity == "year":
+        return days.astype("datetime64[D]").astype("datetime64[Y]").astype(np.int64)
+    raise ValueError(f"Unknown granularity: {granularity!r}")
+
+
+def period_start(key, granularity):
+    """The first date of period number key."""
+    if granularity == "day":
+        return datetime.date.fromordinal(int(key) + EPOCH_ORDINAL)
+    if granularity == "week":
+        return datetime.date.fromordinal(int(key) * 7 - 3 + EPOCH_ORDINAL)
+    unit = "M" if granularity == "month" else "Y"
+    return np.datetime64(int(key), unit).astype("datetime64[D]").astype(datetime.date)
+
+
+def rolling_mean(values, window):
+    """Trailing mean over `window` periods; the first window - 1 entries are NaN."""
+    values = np.asarray(values, dtype=np.float64)
+    result = np.full(len(values), np.nan)
+    if window < 1 or len(values) < window:
+        return result
+    sums = np.cumsum(np.concatenate(([0.0], values)))
+    result[window - 1:] = (sums[window:] - sums[:-window]) / window
+    return result
+
+
+def linear_forecast(values, horizon, history=12):
+    """Extends the least-squares trend of the last `history` values by `horizon` periods (never below zero)."""
+    values = np.asarray(values, dtype=np.float64)[-history:]
+    if len(values) == 0:
+        return np.zeros(horizon)
+    if len(values) == 1:
+        return np.full(horizon, values[0])
+    x = np.arange(len(values))
+    slope, intercept = np.polyfit(x, values, 1)
+    future = np.arange(len(values), len(values) + horizon)
+    return np.clip(slope * future + intercept, 0, None)
+
+
+class Rollup:
+    def __init__(self, granularity, first, income, expense, by_category):
+        """Dense per-period totals in cents from period number `first` on; by_category is periods x category_id."""
+        self.granularity = granularity
+        self.first = first
+        self.income = income
+        self.expense = expense
+        self.by_category = by_category
+
+    def add(self, key, category_id, is_income, cents):
+        """Applies one transaction's contribution in place; returns False if it falls outside the rollup."""
+        index = key - self.first
+        if not 0 <= index < len(self.income) or category_id >= self.by_category.shape[1]:
+            return False
+        if is_income:
+            self.income[index] += cents
+        else:
+            self.expense[index] += cents
+            self.by_category[index, category_id] += cents
+        return True
+
+
+class LedgerAnalytics:
+    def __init__(self, db, store=None):
+        """Columnar analytics over db's transactions, read from store (by default db.store, or a store of its own)."""
+        self.db = db
+        self.owns_store = store is None and db.store is None
+        self.store = store or db.store or TransactionStore(db)
+        self._rollups = {}
+        self.unwatch = self.store.watch(self.on_row_change)
+
+    def load(self):
+        """(Re)reads every transaction into the store's columns."""
+        self.store.load()
+
+    def ensure_loaded(self):
+        self.store.ensure_loaded()
+
+    def on_row_change(self, change):
+        """Keeps the cached rollups in step with the store (called under its lock)."""
+        if change is None:
+            self._rollups = {}
+            return
+        day, cents, type_code, category_id, sign = change
+        for granularity, rollup in list(self._rollups.items()):
+            key = int(period_keys(np.array([day], dtype=np.int32), granularity)[0])
+            if not rollup.add(key, category_id, type_code == INCOME, sign * cents):
+                del self._rollups[granularity]  # A new period or category: rebuilt on next use
+
+    def rollup(self, granularity="month"):
+        """Per-period income, expense and expense-by-category totals over the whole history (cached)."""
+        with self.store.lock:
+            self.store.ensure_current()
+            rollup = self._rollups.get(granularity)
+            if rollup is None:
+                rollup = self._rollups[granularity] = self._build_rollup(granularity)
+            return rollup
+
+    def _build_rollup(self, granularity):
+        store = self.store
+        keys = period_keys(store.days, granularity)
+        categories = int(store.category_ids.max()) + 1 if len(store.category_ids) else 1
+        if len(keys) == 0:
+            return Rollup(granularity, 0, np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros((0, categories), np.int64))
+        first = int(keys.min())
+        offsets = keys - first
+        periods = int(offsets.max()) + 1
+        is_income = store.types == INCOME
+        # Weighted bincounts sum in float64, which is exact for totals below 2**53 cents
+        income = np.bincount(offsets, weights=np.where(is_income, store.cents, 0), minlength=periods)
+        expense_cents = np.where(is_income, 0, store.cents)
+        expense = np.bincount(offsets, weights=expense_cents, minlength=periods)
+        cells = offsets * categories + store.category_ids
+        by_category = np.bincount(cells, weights=expense_cents, minlength=periods * categories).reshape(periods, categories)
+        as_cents = lambda values: np.rint(values).astype(np.int64)
+        return Rollup(granularity, first, as_cents(income), as_cents(expense), as_cents(by_category))
+
+    def report(self, granularity="month", periods=12, window=3, horizon=3, top_categories=5, today=None):
+        """Everything the Reports view draws for the last `periods` periods up to today, in currency units.
+
+        Returns labels, income, expense, a rolling mean of expense over `window` periods, the
+        running balance (including all earlier history), a linear expense forecast for the next
+        `horizon` periods, and expense per category for the top categories (plus the rest combined).
+        """
+        today = today or datetime.date.today()
+        with self.store.lock:
+            rollup = self.rollup(granularity)
+            last = int(period_keys(np.array([to_days(today)], dtype=np.int32), granularity)[0])
+            first = last - periods + 1
+            income = self._window(rollup.income, rollup.first, first, last)
+            expense = self._window(rollup.expense, rollup.first, first, last)
+            by_category = self._window(rollup.by_category, rollup.first, first, last)
+            before = slice(0, max(0, min(first - rollup.first, len(rollup.income))))
+            opening = int(rollup.income[before].sum() - rollup.expense[before].sum())
+            # Rolling means may reach back before the window
+            history = self._window(rollup.expense, rollup.first, first - window + 1, last)
+        balance = opening + np.cumsum(income - expense)
+        rolling = rolling_mean(history, window)[window - 1:]
+        totals = by_category.sum(axis=0)
+        top = [int(category_id) for category_id in np.argsort(totals)[::-1][:top_categories] if totals[category_id] > 0]
+        categories = {self.category_name(category_id): by_category[:, category_id] / 100 for category_id in top}
+        rest = totals.sum() - totals[top].sum() if top else totals.sum()
+        if rest > 0:
+            categories["Other categories"] = (by_category.sum(axis=1) - by_category[:, top].sum(axis=1)) / 100
+        keys = range(first, last + 1)
+        return {
+            "granularity": granularity,
+            "labels": [period_start(key, granularity).strftime(LABEL_FORMATS[granularity]) for key in keys],
+            "income": income / 100,
+            "expense": expense / 100,
+            "rolling_expense": rolling / 100,
+            "balance": balance / 100,
+            "forecast_labels": [period_start(last + step, granularity).strftime(LABEL_FORMATS[granularity]) for step in range(1, horizon + 1)],
+            "forecast": linear_forecast(expense, horizon) / 100,
+            "categories": categories,
+        }
+
+    def clear_cache(self):
+        """Drops the cached rollups (the columns stay loaded)."""
+        with self.store.lock:
+            self._rollups = {}
+
+    def category_name(self, category_id):
+        return (category_id and self.db.category_cache.name_for(category_id)) or "Uncategorised"
+
+    @staticmethod
+    def _window(values, values_first, first, last):
+        """values[first..last] by period number, zero-filled where the rollup has no data."""
+        shape = (last - first + 1,) + values.shape[1:]
+        result = np.zeros(shape, dtype=values.dtype)
+        start, stop = max(first, values_first), min(last, values_first + len(values) - 1)
+        if start <= stop:
+            result[start - first:stop - first + 1] = values[start - values_first:stop - values_first + 1]
+        return result
+
+    def close(self):
+        self.unwatch()
+        if self.owns_store:
+            self.store.close()
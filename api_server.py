@@ -0,0 +1,455 @@
+import argparse
+import asyncio
+import datetime
+import functools
+import json
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs
+from backends import DATABASE_ERRORS
+from db_manager import DBManager, DashboardSnapshot
+from write_queue import DURABILITY_LEVELS
+
+# A headless HTTP/JSON service over DBManager, for scripts and web dashboards. It runs on one
+# asyncio event loop; DBManager calls block, so they run on a thread pool with one thread per
+# pooled connection, and writes go through DBManager.submit_write() so concurrent clients
+# can share group commits (--durability group). Run from the repository root:
+#
+#   python api_server.py --backend sqlite --path bms.sqlite3 --port 8080
+#
+# Requests act on the ledger of the account in the X-Account-Id header (the server's
+# --account by default). The aggregate endpoints (summary, spending, dashboard, budgets,
+# goals) carry an ETag built from DBManager.get_data_version(), so a client that sends it
+# back in If-None-Match gets 304 Not Modified for the price of one small query; identical
+# requests that arrive while one is already being answered share its result.
+
+MAX_HEADER_LINES = 100
+MAX_BODY_BYTES = 1024 * 1024
+KEEP_ALIVE_SECONDS = 15
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+RECENT_TRANSACTIONS = 20
+DASHBOARD_TRANSACTIONS = 15
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def to_json(value):
+    # DECIMAL(10, 2) amounts convert to floats that print back as the same digits
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, DashboardSnapshot):
+        return value.parts()
+    raise TypeError(f"Cannot encode {type(value).__name__} as JSON")
+
+
+def parse_date(text, name):
+    try:
+        return datetime.datetime.strptime(text, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"{name} must be a date in YYYY-MM-DD format.")
+
+
+def parse_amount(value, name="amount"):
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"{name} must be a number.")
+    try:
+        amount = float(value)
+    except ValueError:
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"{name} must be a number.")
+    if not amount > 0:
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"{name} must be positive.")
+    return amount
+
+
+def page_limit(request, default, name="limit"):
+    """A row-count query parameter, capped at MAX_PAGE_SIZE; 400 unless it is at least 1."""
+    limit = request.param(name, int, default)
+    if limit < 1:
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"{name} must be at least 1.")
+    return min(limit, MAX_PAGE_SIZE)
+
+
+class Request:
+    def __init__(self, method, target, version, headers, body):
+        self.method = method
+        url = urlsplit(target)
+        self.path = url.path.rstrip("/") or "/"
+        self.query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        self.headers = headers
+        self.body = body
+        connection = headers.get("connection", "").lower()
+        self.keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+
+    def json(self):
+        try:
+            data = json.loads(self.body or b"{}")
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "The request body must be JSON.")
+        if not isinstance(data, dict):
+            raise HttpError(HTTPStatus.BAD_REQUEST, "The request body must be a JSON object.")
+        return data
+
+    def param(self, name, convert=str, default=None):
+        if name not in self.query:
+            return default
+        try:
+            return convert(self.query[name])
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"Invalid value for {name}: {self.query[name]!r}")
+
+    def matches(self, etag):
+        tags = self.headers.get("if-none-match", "")
+        return tags.strip() == "*" or etag in [tag.strip() for tag in tags.split(",")]
+
+
+class Response:
+    def __init__(self, status=HTTPStatus.OK, payload=None, etag=None):
+        self.status = HTTPStatus(status)
+        self.payload = payload
+        self.etag = etag
+
+    def encode(self, keep_alive):
+        body = b""
+        if self.status != HTTPStatus.NOT_MODIFIED and self.status != HTTPStatus.NO_CONTENT:
+            body = json.dumps(self.payload, default=to_json, separators=(",", ":")).encode()
+        lines = [f"HTTP/1.1 {self.status.value} {self.status.phrase}", f"Content-Length: {len(body)}",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if body:
+            lines.append("Content-Type: application/json")
+        if self.etag:
+            # Clients may keep the result, but must check it is still current before using it
+            lines += [f"ETag: {self.etag}", "Cache-Control: no-cache"]
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+class ApiServer:
+    ROUTES = [
+        ("GET", r"/transactions", "list_transactions"),
+        ("POST", r"/transactions", "create_transaction"),
+        ("GET", r"/transactions/search", "search_transactions"),
+        ("GET", r"/transactions/(\d+)", "get_transaction"),
+        ("PUT", r"/transactions/(\d+)", "update_transaction"),
+        ("DELETE", r"/transactions/(\d+)", "delete_transaction"),
+        ("GET", r"/summary", "summary"),
+        ("GET", r"/spending", "spending"),
+        ("GET", r"/dashboard", "dashboard"),
+        ("GET", r"/budgets", "budgets"),
+        ("PUT", r"/budgets", "set_budget"),
+        ("GET", r"/goals", "goals"),
+        ("POST", r"/goals", "create_goal"),
+        ("POST", r"/goals/(\d+)/contributions", "fund_goal"),
+        ("GET", r"/stats", "stats"),
+    ]
+
+    def __init__(self, db, workers=None):
+        """Serves db's operations, running at most `workers` DBManager calls at once (by default one per pooled connection)."""
+        self.db = db
+        self.workers = workers or db.pool.size
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bms-api")
+        self.routes = [(method, re.compile(pattern + "$"), getattr(self, name)) for method, pattern, name in self.ROUTES]
+        self.accounts = set()
+        # Calls being answered right now, by what was asked; see coalesced()
+        self._inflight = {}
+        # Moves on every write this server commits, so reads started after it never join older calls
+        self._writes = 0
+        self.counts = {"requests": 0, "not_modified": 0, "coalesced": 0, "errors": 0}
+
+    # --- Plumbing --- #
+
+    async def run(self, func, *args, **kwargs):
+        """Runs a blocking call on the worker threads."""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    async def coalesced(self, key, func, *args):
+        """Runs func(*args), or waits for the identical call already running and shares its result."""
+        key = (self._writes, key)
+        future = self._inflight.get(key)
+        if future is None:
+            future = self._inflight[key] = asyncio.ensure_future(self.run(func, *args))
+            future.add_done_callback(lambda done: self._inflight.pop(key, None) if self._inflight.get(key) is done else None)
+        else:
+            self.counts["coalesced"] += 1
+        # A client that disconnects must not cancel the call for everyone else waiting on it
+        return await asyncio.shield(future)
+
+    async def write(self, func, *args):
+        """Runs a write method as one unit of work through the db's write queue."""
+        try:
+            return await self.run(lambda: self.db.submit_write(func, *args).result())
+        finally:
+            self._writes += 1
+
+    async def aggregate(self, request, db, name, func, *args):
+        """Answers a read with an ETag of the data version, or 304 if the client's copy is still current."""
+        # The version is read first: data written in between only makes the result newer than its tag
+        version = await self.coalesced((db.account_id, "version"), db.get_data_version)
+        etag = f'W/"{db.account_id}-{version}"' if version is not None else None
+        if etag and request.matches(etag):
+            self.counts["not_modified"] += 1
+            return Response(HTTPStatus.NOT_MODIFIED, etag=etag)
+        result = await self.coalesced((db.account_id, name, args), func, *args)
+        if result is None:
+            raise HttpError(HTTPStatus.SERVICE_UNAVAILABLE, "The query failed.")
+        return Response(payload=result, etag=etag)
+
+    async def account_db(self, request):
+        """The DBManager for the request's X-Account-Id."""
+        header = request.headers.get("x-account-id")
+        if header is None:
+            return self.db
+        try:
+            account_id = int(header)
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "X-Account-Id must be a number.")
+        if account_id not in self.accounts:
+            # Accounts are only ever added, so the set is re-read only for an id not seen yet
+            rows = await self.run(self.db.get_accounts)
+            self.accounts = {row['id'] for row in rows or []}
+            if account_id not in self.accounts:
+                raise HttpError(HTTPStatus.NOT_FOUND, f"Unknown account {account_id}.")
+        return self.db.for_account(account_id)
+
+    async def dispatch(self, request):
+        self.counts["requests"] += 1
+        allowed = []
+        for method, pattern, handler in self.routes:
+            match = pattern.match(request.path)
+            if not match:
+                continue
+            if method != request.method:
+                allowed.append(method)
+                continue
+            try:
+                db = await self.account_db(request)
+                response = await handler(request, db, *match.groups())
+                return response if isinstance(response, Response) else Response(payload=response)
+            except HttpError as e:
+                return self.error(e.status, str(e))
+            except DATABASE_ERRORS as e:
+                return self.error(HTTPStatus.SERVICE_UNAVAILABLE, f"Database error: {e}")
+        if allowed:
+            return self.error(HTTPStatus.METHOD_NOT_ALLOWED, f"{request.path} allows {', '.join(allowed)}.")
+        return self.error(HTTPStatus.NOT_FOUND, f"No such endpoint: {request.path}")
+
+    def error(self, status, message):
+        self.counts["errors"] += 1
+        return Response(status, {"error": message})
+
+    # --- HTTP/1.1 --- #
+
+    async def read_request(self, reader):
+        """Reads one request from the connection; None once the client has closed it."""
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, version = line.decode("latin-1").split()
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Malformed request line.")
+        headers = {}
+        for _ in range(MAX_HEADER_LINES):
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        else:
+            raise HttpError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Too many headers.")
+        if "transfer-encoding" in headers:
+            raise HttpError(HTTPStatus.LENGTH_REQUIRED, "Send a Content-Length instead of a chunked body.")
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length.")
+        if length > MAX_BODY_BYTES:
+            raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large.")
+        body = await reader.readexactly(length) if length else b""
+        return Request(method.upper(), target, version, headers, body)
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self.read_request(reader), KEEP_ALIVE_SECONDS)
+                except HttpError as e:
+                    writer.write(self.error(e.status, str(e)).encode(keep_alive=False))
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                response = await self.dispatch(request)
+                writer.write(response.encode(request.keep_alive))
+                await writer.drain()
+                if not request.keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass  # Idle, or gone mid-request
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8080, on_ready=None):
+        """Serves until cancelled; on_ready(server) is called once the socket is listening."""
+        server = await asyncio.start_server(self.handle_connection, host, port, backlog=1024)
+        if on_ready:
+            on_ready(server)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    # --- Endpoints --- #
+
+    async def list_transactions(self, request, db):
+        limit = page_limit(request, RECENT_TRANSACTIONS)
+        return await self.run(db.get_transactions, limit)
+
+    async def search_transactions(self, request, db):
+        filters = {
+            "description": request.param("description"),
+            "category": request.param("category"),
+            "trans_type": request.param("type"),
+            "start_date": parse_date(request.query["start"], "start") if "start" in request.query else None,
+            "end_date": parse_date(request.query["end"], "end") if "end" in request.query else None,
+        }
+        page_size = page_limit(request, PAGE_SIZE)
+        try:
+            rows, cursor = await self.run(db.search_transactions_page, page_size, request.param("cursor"), **filters)
+        except ValueError as e:
+            raise HttpError(HTTPStatus.BAD_REQUEST, str(e))
+        return {"transactions": rows, "next_cursor": cursor}
+
+    async def get_transaction(self, request, db, transaction_id):
+        row = await self.run(db.get_transaction_by_id, int(transaction_id))
+        if row is None:
+            raise HttpError(HTTPStatus.NOT_FOUND, f"Transaction {transaction_id} not found.")
+        return row
+
+    def transaction_fields(self, request):
+        data = request.json()
+        trans_type = data.get("type")
+        if trans_type not in ("income", "expense"):
+            raise HttpError(HTTPStatus.BAD_REQUEST, "type must be 'income' or 'expense'.")
+        if not data.get("category") or not data.get("description"):
+            raise HttpError(HTTPStatus.BAD_REQUEST, "category and description are required.")
+        date = parse_date(data["date"], "date") if data.get("date") else datetime.date.today()
+        return date, parse_amount(data.get("amount")), trans_type, data["category"], data["description"]
+
+    async def create_transaction(self, request, db):
+        date, amount, trans_type, category, description = self.transaction_fields(request)
+        transaction_id = await self.write(db.add_transaction, amount, trans_type, category, description, date)
+        if transaction_id is None:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"Could not add the transaction (is '{category}' a category?).")
+        return Response(HTTPStatus.CREATED, await self.run(db.get_transaction_by_id, transaction_id))
+
+    async def update_transaction(self, request, db, transaction_id):
+        date, amount, trans_type, category, description = self.transaction_fields(request)
+        if await self.write(db.update_transaction, int(transaction_id), date, amount, trans_type, category, description) is None:
+            raise HttpError(HTTPStatus.NOT_FOUND, f"Transaction {transaction_id} not found (or '{category}' is not a category).")
+        return await self.run(db.get_transaction_by_id, int(transaction_id))
+
+    async def delete_transaction(self, request, db, transaction_id):
+        if await self.write(db.delete_transaction, int(transaction_id)) is None:
+            raise HttpError(HTTPStatus.NOT_FOUND, f"Transaction {transaction_id} not found.")
+        return Response(HTTPStatus.NO_CONTENT)
+
+    async def summary(self, request, db):
+        return await self.aggregate(request, db, "summary", db.get_summary)
+
+    async def spending(self, request, db):
+        return await self.aggregate(request, db, "spending", db.get_spending_by_category)
+
+    async def dashboard(self, request, db):
+        recent = page_limit(request, DASHBOARD_TRANSACTIONS, "recent")
+        return await self.aggregate(request, db, "dashboard", db.get_dashboard_snapshot, recent)
+
+    async def budgets(self, request, db):
+        today = datetime.date.today()
+        month, year = request.param("month", int, today.month), request.param("year", int, today.year)
+        if not 1 <= month <= 12:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "month must be between 1 and 12.")
+        return await self.aggregate(request, db, "budgets", db.get_budgets_for_month, month, year)
+
+    async def set_budget(self, request, db):
+        data = request.json()
+        today = datetime.date.today()
+        month, year = data.get("month", today.month), data.get("year", today.year)
+        if not isinstance(month, int) or not isinstance(year, int) or not 1 <= month <= 12:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "month and year must be numbers, with month between 1 and 12.")
+        if not data.get("category"):
+            raise HttpError(HTTPStatus.BAD_REQUEST, "category is required.")
+        amount = parse_amount(data.get("amount"))
+        if await self.write(db.set_budget, data["category"], amount, month, year) is None:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"Could not set the budget (is '{data['category']}' a category?).")
+        return {"category": data["category"], "amount": amount, "month": month, "year": year}
+
+    async def goals(self, request, db):
+        return await self.aggregate(request, db, "goals", db.get_savings_goals)
+
+    async def create_goal(self, request, db):
+        data = request.json()
+        if not data.get("name"):
+            raise HttpError(HTTPStatus.BAD_REQUEST, "name is required.")
+        target = parse_amount(data.get("target_amount"), "target_amount")
+        goal_id = await self.write(db.add_savings_goal, data["name"], target)
+        if goal_id is None:
+            raise HttpError(HTTPStatus.SERVICE_UNAVAILABLE, "Could not add the goal.")
+        return Response(HTTPStatus.CREATED, {"id": goal_id, "name": data["name"], "target_amount": target})
+
+    async def fund_goal(self, request, db, goal_id):
+        amount = parse_amount(request.json().get("amount"))
+
+        def fund():
+            goal = next((goal for goal in db.get_savings_goals() or [] if goal['id'] == int(goal_id)), None)
+            return goal and db.add_to_savings_goal(goal['id'], goal['name'], amount)
+        if await self.write(fund) is None:
+            raise HttpError(HTTPStatus.NOT_FOUND, f"Savings goal {goal_id} not found.")
+        return {"id": int(goal_id), "added": amount}
+
+    async def stats(self, request, db):
+        return dict(self.counts, inflight=len(self._inflight), workers=self.workers, commits=self.db.writes.commits)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the BMS ledger as an HTTP/JSON API.")
+    parser.add_argument("--bind", default="127.0.0.1", help="Address to listen on.")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", default="")
+    parser.add_argument("--database", default="bms_db")
+    parser.add_argument("--backend", choices=["mysql", "sqlite"], default="mysql")
+    parser.add_argument("--path", default="bms.sqlite3", help="Database file for --backend sqlite.")
+    parser.add_argument("--account", type=int, default=1, help="Account for requests without an X-Account-Id header.")
+    parser.add_argument("--pool-size", type=int, default=10, help="Database connections, and so DBManager calls run at once.")
+    parser.add_argument("--durability", choices=DURABILITY_LEVELS, default="group", help="How writes are committed (see write_queue.py).")
+    parser.add_argument("--in-memory", action="store_true", help="Answer reads from an in-memory copy of the ledger.")
+    args = parser.parse_args(argv)
+
+    db = DBManager(host=args.host, user=args.user, password=args.password, database=args.database, backend=args.backend,
+                   path=args.path, account_id=args.account, pool_size=args.pool_size, durability=args.durability, in_memory=args.in_memory)
+    if not db.pool:
+        return 1
+    server = ApiServer(db)
+    try:
+        asyncio.run(server.serve(args.bind, args.port, on_ready=lambda _: print(f"Serving on http://{args.bind}:{args.port}")))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
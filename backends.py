@@ -0,0 +1,374 @@
+import datetime
+import functools
+import os
+import re
+import sqlite3
+from decimal import Decimal
+from connection_pool import ConnectionPool, DatabaseUnavailable
+
+try:
+    import pymysql
+    import pymysql.cursors
+except ImportError:  # Without pymysql only the SQLite backend is available
+    pymysql = None
+
+# A backend opens connections for DBManager's pool and supplies the few pieces of SQL that
+# differ between MySQL and SQLite. Everything else in DBManager is plain SQL with %s
+# placeholders that both backends run unchanged.
+
+DATABASE_ERRORS = (DatabaseUnavailable, sqlite3.Error) + ((pymysql.Error,) if pymysql else ())
+
+SQLITE_SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bms_sqlite.sql')
+
+# InnoDB's default full-text stopwords and minimum token length (innodb_ft_min_token_size);
+# words the index cannot answer fall back to a LIKE filter
+FULLTEXT_STOPWORDS = {'a', 'about', 'an', 'are', 'as', 'at', 'be', 'by', 'com', 'de', 'en', 'for', 'from', 'how', 'i', 'in',
+                      'is', 'it', 'la', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'was', 'what', 'when', 'where', 'who',
+                      'will', 'with', 'und', 'www'}
+FULLTEXT_MIN_LENGTH = 3
+
+
+def search_words(text):
+    return re.findall(r"\w+", text.lower())
+
+
+def upsert_assignments(increment, replace, new):
+    return [f"{column} = {column} + {new(column)}" for column in increment] + [f"{column} = {new(column)}" for column in replace]
+
+
+class MySQLBackend:
+    name = "mysql"
+    for_update = " FOR UPDATE"
+    id_column = "INT AUTO_INCREMENT PRIMARY KEY"
+
+    def __init__(self, host='localhost', user='root', password='', database='bms_db'):
+        self.connect_kwargs = dict(host=host, user=user, password=password, database=database)
+        self.location = f"mysql://{user}@{host}/{database}"
+
+    def create_pool(self, size, timeout):
+        if pymysql is None:
+            raise DatabaseUnavailable("The MySQL backend needs the 'pymysql' package.")
+        return ConnectionPool(self.connect, lambda conn: conn.ping(reconnect=True), size=size, timeout=timeout)
+
+    def connect(self):
+        return pymysql.connect(cursorclass=pymysql.cursors.DictCursor, **self.connect_kwargs) # Return rows as dictionaries
+
+    def ensure_schema(self, cursor):
+        pass  # The base schema is created by running bms.sql on the server
+
+    def begin(self, conn):
+        conn.begin()
+
+    def stream_cursor(self, conn):
+        return conn.cursor(pymysql.cursors.SSDictCursor)
+
+    def year(self, column):
+        return f"YEAR({column})"
+
+    def month(self, column):
+        return f"MONTH({column})"
+
+    def upsert(self, table, columns, keys, increment=(), replace=()):
+        """INSERT one row, or on a key collision add `increment` columns to and overwrite `replace` columns of the existing row."""
+        placeholders = ", ".join(["%s"] * len(columns))
+        assignments = upsert_assignments(increment, replace, lambda column: f"VALUES({column})")
+        return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders}) ON DUPLICATE KEY UPDATE {', '.join(assignments)}"
+
+    def fulltext_match(self, text):
+        """Builds a boolean-mode MATCH query from a description search, plus the words it cannot cover.
+
+        Every indexable word becomes a required prefix term ("+lunch*"), so "lun caf" finds
+        "Lunch at the cafe".
+        """
+        indexed, other = [], []
+        for word in search_words(text):
+            if len(word) >= FULLTEXT_MIN_LENGTH and word not in FULLTEXT_STOPWORDS:
+                indexed.append(f"+{word}*")
+            else:
+                other.append(word)
+        return " ".join(indexed) or None, other
+
+    def description_terms(self, text):
+        """The words description_filter() matches as word prefixes, and those it matches anywhere (LIKE)."""
+        words = search_words(text)
+        prefixes = [word for word in words if len(word) >= FULLTEXT_MIN_LENGTH and word not in FULLTEXT_STOPWORDS]
+        return prefixes, [word for word in words if word not in prefixes] if prefixes else [text.lower()]
+
+    def description_filter(self, text):
+        """WHERE conditions and parameters for a description search on transactions t."""
+        match_query, other_words = self.fulltext_match(text)
+        conditions, params = [], []
+        if match_query:
+            conditions.append("MATCH(t.description) AGAINST (%s IN BOOLEAN MODE)")
+            params.append(match_query)
+        for word in other_words if match_query else [text]:
+            conditions.append("t.description LIKE %s")
+            params.append(f"%{word}%")
+        return conditions, params
+
+    def relevance_order(self, text):
+        """ORDER BY expression (best match first) and its parameters, or (None, []) if text has no indexed words."""
+        match_query = self.fulltext_match(text)[0]
+        if not match_query:
+            return None, []
+        return "MATCH(t.description) AGAINST (%s IN BOOLEAN MODE) DESC", [match_query]
+
+    def create_index(self, cursor, table, name, columns, kind=""):
+        cursor.execute(
+            "SELECT 1 FROM information_schema.statistics WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s",
+            (table, name))
+        if not cursor.fetchone():
+            cursor.execute(f"CREATE {kind} INDEX `{name}` ON `{table}` ({columns})")
+
+    def drop_index(self, cursor, table, name):
+        cursor.execute(
+            "SELECT 1 FROM information_schema.statistics WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s",
+            (table, name))
+        if cursor.fetchone():
+            cursor.execute(f"DROP INDEX `{name}` ON `{table}`")
+
+    def add_column(self, cursor, table, column, definition):
+        cursor.execute(
+            "SELECT 1 FROM information_schema.columns WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s",
+            (table, column))
+        if not cursor.fetchone():
+            cursor.execute(f"ALTER TABLE `{table}` ADD COLUMN `{column}` {definition}")
+
+    def replace_unique(self, cursor, table, columns, name, new_columns):
+        """Swaps the UNIQUE key over `columns` for a unique index `name` over `new_columns`."""
+        self.create_index(cursor, table, name, new_columns, "UNIQUE")
+        cursor.execute("""
+            SELECT index_name, GROUP_CONCAT(column_name ORDER BY seq_in_index SEPARATOR ', ') AS key_columns
+            FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = %s AND non_unique = 0
+            GROUP BY index_name
+            """, (table,))
+        old = [row['index_name'] for row in cursor.fetchall() if row['key_columns'] == columns]
+        if old:
+            # A foreign key on the old key's first column needs an index led by that column
+            first = columns.split(",")[0].strip()
+            self.create_index(cursor, table, f"idx_{table}_{first}", first)
+            cursor.execute(f"DROP INDEX `{old[0]}` ON `{table}`")
+
+    def explain(self, db, query, params):
+        """Yields (table, access type, index) for every step of the query plan."""
+        for row in db.execute_query("EXPLAIN " + query, params, fetch=True) or []:
+            yield row.get('table'), row.get('type'), row.get('key')
+
+
+CENT = Decimal("0.01")
+
+
+def money(value):
+    return Decimal(value).quantize(CENT)
+
+
+def dict_row(cursor, row):
+    # SQLite computes with binary floats, and the only REAL values in this schema are money:
+    # hand them back as cent Decimals, as DECIMAL columns and sums come back from MySQL
+    return {column[0]: money(repr(value)) if isinstance(value, float) else value
+            for column, value in zip(cursor.description, row)}
+
+
+@functools.lru_cache(maxsize=512)
+def qmark(query):
+    """Rewrites pymysql-style %s placeholders for sqlite3 (cached, as the same statements repeat)."""
+    return query.replace("%s", "?")
+
+
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_adapter(datetime.date, lambda value: value.isoformat())
+sqlite3.register_adapter(datetime.datetime, lambda value: value.isoformat(" "))
+sqlite3.register_converter("DATE", lambda value: datetime.date.fromisoformat(value.decode()))
+sqlite3.register_converter("DATETIME", lambda value: datetime.datetime.fromisoformat(value.decode()))
+sqlite3.register_converter("DECIMAL", lambda value: money(value.decode()))
+
+
+class SQLiteCursor:
+    def __init__(self, connection, cursor):
+        """A sqlite3 cursor that accepts the %s placeholders DBManager writes for pymysql."""
+        self.connection = connection
+        self._cursor = cursor
+
+    def execute(self, query, params=()):
+        self._cursor.execute(qmark(query), tuple(params or ()))
+
+    def executemany(self, query, seq_of_params):
+        self._cursor.executemany(qmark(query), seq_of_params)
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def fetchmany(self, size):
+        return self._cursor.fetchmany(size)
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def close(self):
+        self._cursor.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SQLiteConnection:
+    def __init__(self, raw):
+        self.raw = raw
+
+    def cursor(self, cursorclass=None):
+        return SQLiteCursor(self, self.raw.cursor())
+
+    def commit(self):
+        self.raw.commit()
+
+    def rollback(self):
+        self.raw.rollback()
+
+    def close(self):
+        self.raw.close()
+
+
+class SQLiteBackend:
+    name = "sqlite"
+    for_update = ""  # BEGIN IMMEDIATE already takes the write lock for the whole transaction
+    id_column = "INTEGER PRIMARY KEY AUTOINCREMENT"
+
+    def __init__(self, path='bms.sqlite3', synchronous='NORMAL'):
+        """An embedded database file; synchronous='FULL' trades commit speed for durability on power loss."""
+        self.path = path
+        self.location = f"sqlite:{os.path.abspath(path)}"
+        self.pragmas = [
+            ("journal_mode", "WAL"),        # Readers never block the writer (or each other)
+            ("synchronous", synchronous),   # NORMAL: fsync at checkpoints only, safe with WAL
+            ("foreign_keys", "ON"),
+            ("busy_timeout", "5000"),
+            ("cache_size", "-16000"),       # 16 MB page cache per connection
+            ("temp_store", "MEMORY"),
+            ("mmap_size", "268435456"),
+        ]
+
+    def create_pool(self, size, timeout):
+        return ConnectionPool(self.connect, lambda conn: conn.raw.execute("SELECT 1"), size=size, timeout=timeout)
+
+    def connect(self):
+        # isolation_level=None: DBManager issues BEGIN itself, so reads never open a transaction
+        raw = sqlite3.connect(self.path, detect_types=sqlite3.PARSE_DECLTYPES, isolation_level=None,
+                              check_same_thread=False, cached_statements=256, timeout=5)
+        raw.row_factory = dict_row
+        for name, value in self.pragmas:
+            raw.execute(f"PRAGMA {name} = {value}")
+        return SQLiteConnection(raw)
+
+    def ensure_schema(self, cursor):
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'categories'")
+        if not cursor.fetchone():
+            with open(SQLITE_SCHEMA_FILE, encoding='utf-8') as stream:
+                cursor.connection.raw.executescript(stream.read())
+
+    def begin(self, conn):
+        conn.raw.execute("BEGIN IMMEDIATE")
+
+    def stream_cursor(self, conn):
+        return conn.cursor()  # sqlite3 cursors already step through results lazily
+
+    def year(self, column):
+        return f"CAST(strftime('%Y', {column}) AS INTEGER)"
+
+    def month(self, column):
+        return f"CAST(strftime('%m', {column}) AS INTEGER)"
+
+    def upsert(self, table, columns, keys, increment=(), replace=()):
+        placeholders = ", ".join(["%s"] * len(columns))
+        assignments = upsert_assignments(increment, replace, lambda column: f"excluded.{column}")
+        return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders}) "
+                f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {', '.join(assignments)}")
+
+    def fulltext_match(self, text):
+        """Builds an FTS5 query in which every word is a required prefix term."""
+        return " ".join(f'"{word}"*' for word in search_words(text)) or None
+
+    def description_terms(self, text):
+        """The words description_filter() matches as word prefixes (all of them), and those it matches anywhere."""
+        words = search_words(text)
+        return (words, []) if words else ([], [text.lower()])
+
+    def description_filter(self, text):
+        match_query = self.fulltext_match(text)
+        if not match_query:
+            return ["t.description LIKE %s"], [f"%{text}%"]
+        return ["t.id IN (SELECT rowid FROM transactions_fts WHERE transactions_fts MATCH %s)"], [match_query]
+
+    def relevance_order(self, text):
+        match_query = self.fulltext_match(text)
+        if not match_query:
+            return None, []
+        # bm25() is lower for better matches
+        return "(SELECT bm25(transactions_fts) FROM transactions_fts WHERE transactions_fts MATCH %s AND rowid = t.id) ASC", [match_query]
+
+    def create_index(self, cursor, table, name, columns, kind=""):
+        if kind != "FULLTEXT":
+            cursor.execute(f"CREATE {kind} INDEX IF NOT EXISTS `{name}` ON `{table}` ({columns})")
+            return
+        # An external-content FTS5 table over the column, kept in sync by triggers
+        fts = f"{table}_fts"
+        cursor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({columns}, content='{table}', content_rowid='id')")
+        cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts} (rowid, {columns}) VALUES (new.id, new.{columns}); END""")
+        cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts} ({fts}, rowid, {columns}) VALUES ('delete', old.id, old.{columns}); END""")
+        cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {columns} ON {table} BEGIN
+            INSERT INTO {fts} ({fts}, rowid, {columns}) VALUES ('delete', old.id, old.{columns});
+            INSERT INTO {fts} (rowid, {columns}) VALUES (new.id, new.{columns}); END""")
+        cursor.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+    def drop_index(self, cursor, table, name):
+        cursor.execute(f"DROP INDEX IF EXISTS `{name}`")
+
+    def add_column(self, cursor, table, column, definition):
+        cursor.execute(f"PRAGMA table_info(`{table}`)")
+        if column not in {row['name'] for row in cursor.fetchall()}:
+            cursor.execute(f"ALTER TABLE `{table}` ADD COLUMN `{column}` {definition}")
+
+    def replace_unique(self, cursor, table, columns, name, new_columns):
+        # A UNIQUE table constraint cannot be dropped in SQLite, so copy the table without it
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = %s", (table,))
+        create = cursor.fetchone()['sql']
+        pattern = r",\s*UNIQUE\s*\(\s*" + r"\s*,\s*".join(f"`?{column.strip()}`?" for column in columns.split(",")) + r"\s*\)"
+        stripped = re.sub(pattern, "", create)
+        if stripped != create:
+            cursor.execute(f"PRAGMA table_info(`{table}`)")
+            names = ", ".join(f"`{row['name']}`" for row in cursor.fetchall())
+            cursor.execute(stripped.replace(f"`{table}`", f"`{table}_rebuild`", 1))
+            cursor.execute(f"INSERT INTO `{table}_rebuild` ({names}) SELECT {names} FROM `{table}`")
+            cursor.execute(f"DROP TABLE `{table}`")
+            cursor.execute(f"ALTER TABLE `{table}_rebuild` RENAME TO `{table}`")
+        cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS `{name}` ON `{table}` ({new_columns})")
+
+    def explain(self, db, query, params):
+        for row in db.execute_query("EXPLAIN QUERY PLAN " + query, params, fetch=True) or []:
+            match = re.match(r"(SCAN|SEARCH) (\w+)(?: USING (?:COVERING )?INDEX (\w+)| USING (INTEGER PRIMARY KEY))?", row['detail'])
+            if match:
+                step, table, index, primary = match.groups()
+                key = index or (primary and "PRIMARY")
+                yield table, "ALL" if step == "SCAN" and not key else step, key
+
+
+def create_backend(backend='mysql', **options):
+    """Builds a backend from configuration: 'mysql' (host, user, password, database) or 'sqlite' (path)."""
+    if backend == 'mysql':
+        return MySQLBackend(**options)
+    if backend == 'sqlite':
+        return SQLiteBackend(**options)
+    raise ValueError(f"Unknown database backend: {backend!r}")
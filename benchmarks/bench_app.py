@@ -0,0 +1,115 @@
+import argparse
+import datetime
+import json
+import sys
+import time
+import customtkinter as ctk
+from db_manager import DBManager
+from main_app import App
+from virtual_list import PAGE_SIZE
+from benchmarks.bench_db import percentile, git_revision
+
+# Times the App refresh paths (query on the worker side + render on the Tk side) without
+# user interaction. The window is withdrawn, but Tk still needs a display (use Xvfb on CI):
+#
+#   python -m benchmarks.bench_app --database bms_bench --output bench/app.json
+
+
+def settle(app):
+    """Process Tk events until no background query is pending, so the next sample starts clean."""
+    while app.executor.busy:
+        app.update()
+        time.sleep(0.005)
+    app.update()
+
+
+def refresh_cases(app, db):
+    now = datetime.datetime.now()
+
+    def dashboard():
+        if app.pie_chart is not None:
+            app.pie_chart.data_hash = None  # Force a real redraw rather than the unchanged-data shortcut
+        app.render_dashboard(app.fetch_dashboard_data())
+
+    def history():
+        rows, _ = db.search_transactions_page(PAGE_SIZE)
+        app.history_results_frame.show_rows(rows)
+
+    def reports():
+        app.report_chart.data_hash = None
+        app.analytics.clear_cache()
+        app.render_report(app.analytics.report("month"))
+
+    def budgets():
+        app.render_budgets_view(db.get_budgets_for_month(now.month, now.year))
+
+    def savings():
+        app.render_savings_view(db.get_savings_goals())
+
+    return [("dashboard", dashboard), ("history", history), ("reports", reports), ("budgets", budgets), ("savings", savings)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the App refresh paths headlessly.")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", default="")
+    parser.add_argument("--database", default="bms_bench")
+    parser.add_argument("--backend", choices=["mysql", "sqlite"], default="mysql")
+    parser.add_argument("--path", default="bms_bench.sqlite3", help="Database file for --backend sqlite.")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--output", default="bench_app_results.json")
+    args = parser.parse_args(argv)
+
+    db = DBManager(host=args.host, user=args.user, password=args.password, database=args.database,
+                   backend=args.backend, path=args.path)
+    if not db.pool:
+        return 1
+    ctk.set_appearance_mode("Dark")
+    start = time.perf_counter()
+    app = App(db_manager=db)
+    app.withdraw()
+    painted = []
+    app.on_first_paint = lambda: painted.append(time.perf_counter())
+    settle(app)
+    startup_ms = (time.perf_counter() - start) * 1000
+    results = [{"name": "startup", "calls": 1, "p50_ms": startup_ms, "p95_ms": startup_ms, "mean_ms": startup_ms}]
+    if painted:
+        paint_ms = (painted[0] - start) * 1000
+        results.append({"name": "first_paint", "calls": 1, "p50_ms": paint_ms, "p95_ms": paint_ms, "mean_ms": paint_ms})
+    try:
+        for name, refresh in refresh_cases(app, db):
+            app.select_frame_by_name(name)
+            settle(app)
+            samples = []
+            for _ in range(args.repeat):
+                begin = time.perf_counter()
+                refresh()
+                app.update()  # Include layout and the idle chart draw in the sample
+                samples.append(time.perf_counter() - begin)
+            result = {
+                "name": name,
+                "calls": args.repeat,
+                "mean_ms": sum(samples) / len(samples) * 1000,
+                "p50_ms": percentile(samples, 0.50) * 1000,
+                "p95_ms": percentile(samples, 0.95) * 1000,
+            }
+            results.append(result)
+            print(f"{name:<12} p50 {result['p50_ms']:9.2f} ms  p95 {result['p95_ms']:9.2f} ms")
+    finally:
+        app.on_close()
+        db.close()
+    report = {
+        "suite": "app",
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as stream:
+        json.dump(report, stream, indent=2)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
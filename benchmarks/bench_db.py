@@ -0,0 +1,190 @@
+import argparse
+import datetime
+import itertools
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from db_manager import DBManager, DashboardSnapshot
+from benchmarks import datagen
+from write_queue import WriteQueue, DURABILITY_LEVELS
+from analytics import LedgerAnalytics, GRANULARITIES
+
+# Times every DBManager read path against a synthetic ledger and writes the results as JSON
+# so runs can be diffed for regressions. Run from the repository root:
+#
+#   python -m benchmarks.bench_db --seed --transactions 1000000 --output bench/1m.json
+#   python -m benchmarks.bench_db --backend sqlite --seed --transactions 1000000 --output bench/1m-sqlite.json
+#   python -m benchmarks.bench_db --in-memory --output bench/1m-in-memory.json
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def count_rows(result):
+    if isinstance(result, tuple):
+        result = result[0]
+    if isinstance(result, DashboardSnapshot):
+        result = result.transactions
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    return 1 if result is not None else 0
+
+
+def time_call(name, call, repeat, warmup=1):
+    for _ in range(warmup):
+        call()
+    samples = []
+    rows = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = call()
+        samples.append(time.perf_counter() - start)
+        rows = count_rows(result)
+    mean = statistics.mean(samples)
+    return {
+        "name": name,
+        "calls": repeat,
+        "rows": rows,
+        "mean_ms": mean * 1000,
+        "p50_ms": percentile(samples, 0.50) * 1000,
+        "p95_ms": percentile(samples, 0.95) * 1000,
+        "rows_per_sec": rows / mean if mean else None,
+    }
+
+
+def search_cases(db):
+    """One search per combination of the five search_transactions filters."""
+    today = datetime.date.today()
+    values = {
+        "description": "lunch",
+        "category": "Canteen/Food",
+        "trans_type": "expense",
+        "start_date": today - datetime.timedelta(days=180),
+        "end_date": today - datetime.timedelta(days=30),
+    }
+    for size in range(len(values) + 1):
+        for names in itertools.combinations(values, size):
+            filters = {name: values[name] for name in names}
+            label = "+".join(names) or "no filters"
+            yield f"search_transactions({label})", (lambda f=filters: db.search_transactions(**f))
+            yield f"search_transactions_page({label})", (lambda f=filters: db.search_transactions_page(50, **f))
+
+
+def analytics_cases(db):
+    """Loading the ledger into LedgerAnalytics, then one uncached report per granularity."""
+    analytics = LedgerAnalytics(db)
+    yield "analytics.load", analytics.load
+    for granularity in GRANULARITIES:
+        yield f"analytics.report({granularity})", lambda g=granularity: (analytics.clear_cache(), analytics.report(g))[1]
+
+
+def cases(db):
+    today = datetime.date.today()
+    if db.store is not None:
+        yield "store.load", db.store.load
+    yield "get_summary", db.get_summary
+    yield "get_dashboard_snapshot", db.get_dashboard_snapshot
+    yield "get_transactions(15)", lambda: db.get_transactions(limit=15)
+    yield "get_spending_by_category", db.get_spending_by_category
+    yield "get_monthly_summary", db.get_monthly_summary
+    yield "get_budgets_for_month", lambda: db.get_budgets_for_month(today.month, today.year)
+    yield "get_savings_goals", db.get_savings_goals
+    yield "get_categories", db.get_categories
+    yield from search_cases(db)
+    yield from analytics_cases(db)
+
+
+def time_writes(db, durability, count):
+    """Times `count` scripted add_transaction calls submitted at one durability level."""
+    queue = WriteQueue(db, durability=durability)
+    category_id = db.get_category_id_by_name('Other')
+    start = time.perf_counter()
+    for number in range(count):
+        queue.submit(db.add_transaction, 100 + number % 50, 'expense', category_id, f"bench write {number}")
+    queue.flush()
+    elapsed = time.perf_counter() - start
+    queue.close()
+    return {
+        "name": f"add_transaction x{count} ({durability})",
+        "calls": count,
+        "commits": queue.commits,
+        "mean_ms": elapsed / count * 1000,
+        "writes_per_sec": count / elapsed,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the DBManager queries.")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", default="")
+    parser.add_argument("--database", default="bms_bench", help="Benchmark database; never point this at real data when seeding.")
+    parser.add_argument("--backend", choices=["mysql", "sqlite"], default="mysql")
+    parser.add_argument("--path", default="bms_bench.sqlite3", help="Database file for --backend sqlite.")
+    parser.add_argument("--seed", action="store_true", help="Recreate the database and fill it with synthetic data first.")
+    parser.add_argument("--transactions", type=int, default=10000, help="Transactions to generate (10k to 10M).")
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--goals", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20, help="Timed calls per query.")
+    parser.add_argument("--filter", help="Only run cases whose name contains this text.")
+    parser.add_argument("--in-memory", action="store_true", help="Answer the queries from the in-memory transaction store.")
+    parser.add_argument("--writes", type=int, default=0, help="Also time this many scripted inserts at each durability level (adds rows).")
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args(argv)
+
+    if args.seed and args.backend == "sqlite":
+        datagen.remove_sqlite_database(args.path)
+    elif args.seed:
+        datagen.create_database(args.host, args.user, args.password, args.database)
+    db = DBManager(host=args.host, user=args.user, password=args.password, database=args.database,
+                   backend=args.backend, path=args.path, in_memory=args.in_memory)
+    if not db.pool:
+        return 1
+    try:
+        if args.seed:
+            start = time.perf_counter()
+            datagen.seed(db, args.transactions, args.years, args.goals,
+                         on_progress=lambda n: print(f"\rSeeded {n:,} transactions", end="", flush=True))
+            print(f"\nSeeding took {time.perf_counter() - start:.1f}s")
+        results = []
+        for name, call in cases(db):
+            if args.filter and args.filter not in name:
+                continue
+            result = time_call(name, call, args.repeat)
+            results.append(result)
+            print(f"{name:<70} p50 {result['p50_ms']:9.2f} ms  p95 {result['p95_ms']:9.2f} ms  {result['rows']:>9,} rows")
+        for durability in DURABILITY_LEVELS if args.writes else ():
+            result = time_writes(db, durability, args.writes)
+            results.append(result)
+            print(f"{result['name']:<70} {result['writes_per_sec']:9,.0f} writes/s  {result['commits']:>9,} commits")
+        report = {
+            "suite": "db",
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "transactions": db.get_max_transaction_id(),
+            "repeat": args.repeat,
+            "store_bytes": db.store.nbytes() if db.store is not None else None,
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as stream:
+            json.dump(report, stream, indent=2)
+        print(f"Wrote {args.output}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+import datetime
+import os
+import random
+import re
+from decimal import Decimal
+
+# Synthetic ledgers for the benchmarks. Everything is derived from one seed, so two runs
+# with the same options produce the same database and their timings are comparable.
+
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bms.sql')
+EXTRA_CATEGORIES = ['Transport', 'Books', 'Clothes', 'Health', 'Phone', 'Entertainment', 'Rent', 'Gifts']
+DESCRIPTION_WORDS = ['lunch', 'bus', 'fare', 'coffee', 'bundle', 'monthly', 'textbook', 'groceries', 'ticket',
+                     'airtime', 'snack', 'dinner', 'taxi', 'rent', 'gift', 'pharmacy', 'shoes', 'movie']
+CHUNK_SIZE = 50000
+
+
+def create_database(host, user, password, database):
+    """Creates `database` from bms.sql (with its name substituted), dropping any previous copy."""
+    with open(SCHEMA_FILE, encoding='utf-8') as stream:
+        script = re.sub(r'--[^\n]*', '', stream.read()).replace('bms_db', database)
+    import pymysql  # Only needed for the MySQL backend
+    conn = pymysql.connect(host=host, user=user, password=password)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP DATABASE IF EXISTS `{database}`")
+            for statement in script.split(';'):
+                if statement.strip():
+                    cursor.execute(statement)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def remove_sqlite_database(path):
+    """Deletes a SQLite benchmark database and its WAL files; DBManager recreates the schema on connect."""
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def generate_transactions(rng, count, category_ids, years):
+    """Yields (date, amount, type, category_id, description) tuples spread over the last `years` years."""
+    today = datetime.date.today()
+    span = years * 365
+    income_ids = [category_ids['Parental Money']]
+    expense_ids = [cid for name, cid in category_ids.items() if name != 'Parental Money']
+    for _ in range(count):
+        date = today - datetime.timedelta(days=rng.randrange(span))
+        if rng.random() < 0.1:
+            trans_type, category_id = 'income', rng.choice(income_ids)
+            amount = Decimal(rng.randrange(20000, 200000, 500))
+        else:
+            trans_type, category_id = 'expense', rng.choice(expense_ids)
+            amount = Decimal(rng.randrange(200, 30000, 50))
+        description = ' '.join(rng.sample(DESCRIPTION_WORDS, rng.randint(1, 3)))
+        yield date, amount, trans_type, category_id, description
+
+
+def seed(db, transactions=10000, years=3, goals=20, seed_value=42, on_progress=None):
+    """Fills an empty schema with categories, transactions, a budget per category-month and savings goals."""
+    rng = random.Random(seed_value)
+    for name in EXTRA_CATEGORIES:
+        if db.get_category_id_by_name(name) is None:
+            db.add_category(name)
+    category_ids = db.get_category_map()
+
+    rows = generate_transactions(rng, transactions, category_ids, years)
+    inserted = 0
+    while inserted < transactions:
+        chunk = [row for _, row in zip(range(CHUNK_SIZE), rows)]
+        db.add_transactions_bulk(chunk)
+        inserted += len(chunk)
+        if on_progress:
+            on_progress(inserted)
+
+    today = datetime.date.today()
+    for offset in range(years * 12):
+        month = (today.month - offset - 1) % 12 + 1
+        year = today.year + (today.month - offset - 1) // 12
+        for name, category_id in category_ids.items():
+            if name not in ('Parental Money', 'Savings'):
+                db.set_budget(category_id, rng.randrange(10000, 100000, 1000), month, year)
+    for number in range(goals):
+        db.add_savings_goal(f"Goal {number + 1}", rng.randrange(50000, 2000000, 10000))
@@ -0,0 +1,193 @@
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+from urllib.parse import urlsplit
+
+# Drives api_server.py with many concurrent keep-alive clients and reports throughput and
+# latency, as JSON like bench_db.py. Start the server first, e.g. against a local MySQL:
+#
+#   python api_server.py --pool-size 20 --port 8080
+#   python -m benchmarks.load_api --url http://127.0.0.1:8080 --clients 300 --duration 20 --output bench/api-300.json
+#
+# Each client picks requests from --mix. With --revalidate it sends back the ETag it last
+# saw for each URL, as a polling dashboard would; --write-every N makes every Nth request of
+# a client a POST (and later DELETE) of a small transaction, so ETags keep changing.
+
+DEFAULT_MIX = "summary=4,dashboard=2,spending=1,budgets=1,transactions=1,search=1"
+PATHS = {
+    "summary": "/summary",
+    "dashboard": "/dashboard",
+    "spending": "/spending",
+    "budgets": "/budgets",
+    "goals": "/goals",
+    "transactions": "/transactions?limit=20",
+    "search": "/transactions/search?limit=50",
+}
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in PATHS:
+            raise SystemExit(f"Unknown endpoint in --mix: {name!r} (choose from {', '.join(PATHS)})")
+        mix[PATHS[name]] = float(weight or 1)
+    return mix
+
+
+class Connection:
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, headers=None, body=None):
+        """Sends one request on the kept-alive connection; returns (status, headers, body)."""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        payload = json.dumps(body).encode() if body is not None else b""
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}", f"Content-Length: {len(payload)}"]
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        if payload:
+            lines.append("Content-Type: application/json")
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + payload)
+        await self.writer.drain()
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("Server closed the connection.")
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+        length = int(response_headers.get("content-length", 0))
+        data = await self.reader.readexactly(length) if length else b""
+        if response_headers.get("connection", "").lower() == "close":
+            self.close()
+        return status, response_headers, data
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+async def client(host, port, mix, deadline, revalidate, write_every, account, results):
+    connection = Connection(host, port)
+    paths, weights = list(mix), list(mix.values())
+    etags = {}
+    created = []
+    headers = {"X-Account-Id": str(account)} if account else {}
+    sent = 0
+    try:
+        while time.perf_counter() < deadline:
+            sent += 1
+            if write_every and sent % write_every == 0:
+                if created:
+                    method, path, body = "DELETE", f"/transactions/{created.pop()}", None
+                else:
+                    method, path, body = "POST", "/transactions", {"amount": 1, "type": "expense", "category": "Other", "description": "load test"}
+            else:
+                method, path, body = "GET", random.choices(paths, weights)[0], None
+            request_headers = dict(headers)
+            if revalidate and method == "GET" and path in etags:
+                request_headers["If-None-Match"] = etags[path]
+            start = time.perf_counter()
+            try:
+                status, response_headers, data = await connection.request(method, path, request_headers, body)
+            except (OSError, ConnectionError, asyncio.IncompleteReadError) as e:
+                results["failures"].append(str(e))
+                connection.close()
+                continue
+            results["latencies"].append(time.perf_counter() - start)
+            results["statuses"][status] = results["statuses"].get(status, 0) + 1
+            if "etag" in response_headers:
+                etags[path] = response_headers["etag"]
+            if method == "POST" and status == 201:
+                created.append(json.loads(data)["id"])
+    finally:
+        # Leave the ledger as it was
+        for transaction_id in created:
+            try:
+                await connection.request("DELETE", f"/transactions/{transaction_id}", headers)
+            except (OSError, ConnectionError, asyncio.IncompleteReadError):
+                break
+        connection.close()
+
+
+async def fetch_stats(host, port):
+    connection = Connection(host, port)
+    try:
+        status, _, data = await connection.request("GET", "/stats")
+        return json.loads(data) if status == 200 else {}
+    finally:
+        connection.close()
+
+
+async def run(args):
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+    mix = parse_mix(args.mix)
+    before = await fetch_stats(host, port)
+    results = {"latencies": [], "statuses": {}, "failures": []}
+    start = time.perf_counter()
+    deadline = start + args.duration
+    await asyncio.gather(*(client(host, port, mix, deadline, args.revalidate, args.write_every, args.account, results)
+                           for _ in range(args.clients)))
+    elapsed = time.perf_counter() - start
+    after = await fetch_stats(host, port)
+    latencies = results["latencies"] or [0]
+    return {
+        "url": args.url,
+        "clients": args.clients,
+        "duration_s": elapsed,
+        "mix": args.mix,
+        "revalidate": args.revalidate,
+        "write_every": args.write_every,
+        "requests": len(results["latencies"]),
+        "requests_per_sec": len(results["latencies"]) / elapsed,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "statuses": {str(status): count for status, count in sorted(results["statuses"].items())},
+        "connection_failures": len(results["failures"]),
+        # What the server saved: answers shared between identical requests, and 304s
+        "server": {name: after.get(name, 0) - before.get(name, 0) for name in ("requests", "coalesced", "not_modified", "errors", "commits")},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the BMS HTTP/JSON API.")
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument("--clients", type=int, default=300)
+    parser.add_argument("--duration", type=float, default=10, help="Seconds to run.")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Weighted endpoints to request (default {DEFAULT_MIX}).")
+    parser.add_argument("--revalidate", action="store_true", help="Send If-None-Match with the last ETag seen for each URL.")
+    parser.add_argument("--write-every", type=int, default=0, help="Make every Nth request of each client a write.")
+    parser.add_argument("--account", type=int, help="Send X-Account-Id.")
+    parser.add_argument("--output", help="Write the results as JSON to this file as well.")
+    args = parser.parse_args(argv)
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as stream:
+            stream.write(text + "\n")
+    return 1 if report["connection_failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -48,3 +48,7 @@ INSERT INTO `categories` (`name`) VALUES
 ('Internet'),
 ('Savings'),
 ('Other');
+
+
+-- Indexes and later schema changes are applied by migrations.py
+-- whenever the application starts (or via `python bms_admin.py migrate`)
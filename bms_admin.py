@@ -0,0 +1,188 @@
+import argparse
+import datetime
+import sys
+from db_manager import DBManager
+from migrations import apply_migrations, check_index_usage
+from importer import StatementImporter, CHUNK_SIZE
+from exporter import export_transactions, export_monthly_summaries
+from budget_alerts import BudgetMonitor
+from recurring import FREQUENCIES, UNITS
+
+
+def positive_int(text):
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be 1 or more, not {value}")
+    return value
+
+
+def migrate_command(db, args):
+    apply_migrations(db)
+    print("Schema is up to date.")
+
+
+def check_indexes_command(db, args):
+    report, failures = check_index_usage(db)
+    for name, table, access_type, key in report:
+        print(f"{name:<40} {table:<14} {access_type or '-':<8} {key or 'NO INDEX'}")
+    if failures:
+        print(f"\n{len(failures)} query plan(s) read transactions without an index.")
+        return 1
+    print("\nEvery query uses an index on transactions.")
+
+
+def rebuild_rollups_command(db, args):
+    db.rebuild_rollups()
+    print("Monthly rollups rebuilt from transactions.")
+
+
+def verify_rollups_command(db, args):
+    mismatches = db.verify_rollups()
+    for account_id, year, month, category_id, trans_type, expected, actual in mismatches:
+        print(f"account {account_id} {year}-{month:02d} category {category_id} {trans_type}: expected {expected}, found {actual}")
+    if mismatches:
+        print(f"\n{len(mismatches)} rollup row(s) disagree with transactions; run rebuild-rollups to fix.")
+        return 1
+    print("Monthly rollups match transactions.")
+
+
+def accounts_command(db, args):
+    for account in db.get_accounts():
+        print(f"{account['id']:>6}  {account['name']}")
+
+
+def add_account_command(db, args):
+    account_id = db.add_account(args.name)
+    if account_id is None:
+        return 1
+    print(f"Added account {account_id}: {args.name}")
+
+
+def import_command(db, args):
+    def report(read, inserted, duplicates):
+        print(f"\r{read:,} rows read, {inserted:,} added, {duplicates:,} duplicates", end="", flush=True)
+    counts = StatementImporter(db, chunk_size=args.chunk_size, default_category=args.default_category, on_progress=report).run(args.file)
+    print(f"\nImport complete: {counts['inserted']:,} added, {counts['duplicates']:,} duplicates, {counts['skipped']:,} unreadable rows skipped.")
+
+
+def check_budgets_command(db, args):
+    first = last = None
+    if args.since:
+        since = datetime.datetime.strptime(args.since, '%Y-%m').date()
+        today = datetime.date.today()
+        first, last = (since.year, since.month), (today.year, today.month)
+    alerts = BudgetMonitor(db).reevaluate(first, last)
+    for alert in alerts:
+        print(alert.message())
+    over = sum(1 for alert in alerts if alert.over_budget)
+    print(f"\n{len(alerts)} budget(s) past an alert threshold, {over} over budget.")
+    return 1 if over else 0
+
+
+def recurring_command(db, args):
+    for rule in db.get_recurring_rules() or []:
+        schedule = f"every {rule['every']} {UNITS[rule['frequency']]}" if rule['every'] > 1 else rule['frequency']
+        until = f" until {rule['end_date']}" if rule['end_date'] else ""
+        print(f"{rule['id']:>6}  {schedule:<15} next {rule['next_date']}{until}  {rule['type']:<7} {rule['amount']:>12,.2f}  {rule['category']}: {rule['description']}")
+
+
+def add_recurring_command(db, args):
+    start = datetime.datetime.strptime(args.start, '%Y-%m-%d').date() if args.start else None
+    end = datetime.datetime.strptime(args.end, '%Y-%m-%d').date() if args.end else None
+    rule_id = db.add_recurring_rule(args.amount, args.type, args.category, args.description, args.frequency, start, args.every, end)
+    if rule_id is None:
+        return 1
+    print(f"Added recurring rule {rule_id}.")
+
+
+def delete_recurring_command(db, args):
+    if db.delete_recurring_rule(args.rule_id) is None:
+        return 1
+    print(f"Deleted recurring rule {args.rule_id}; the transactions it posted are kept.")
+
+
+def post_recurring_command(db, args):
+    count = db.post_recurring_transactions()
+    print(f"Posted {count:,} recurring transaction(s).")
+
+
+def export_command(db, args):
+    if args.summary:
+        count = export_monthly_summaries(db, args.file)
+        print(f"Exported {count:,} monthly summaries to {args.file}.")
+        return
+    filters = {
+        "description": args.description,
+        "category": args.category,
+        "trans_type": args.type,
+        "start_date": datetime.datetime.strptime(args.start, '%Y-%m-%d').date() if args.start else None,
+        "end_date": datetime.datetime.strptime(args.end, '%Y-%m-%d').date() if args.end else None,
+    }
+    count = export_transactions(db, args.file, **filters)
+    print(f"Exported {count:,} transactions to {args.file}.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintenance commands for the BMS database.")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", default="")
+    parser.add_argument("--database", default="bms_db")
+    parser.add_argument("--backend", choices=["mysql", "sqlite"], default="mysql")
+    parser.add_argument("--path", default="bms.sqlite3", help="Database file for --backend sqlite.")
+    parser.add_argument("--account", type=int, default=1, help="Account whose ledger the commands work on.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("migrate", help="Apply pending schema migrations.").set_defaults(func=migrate_command)
+    commands.add_parser("check-indexes", help="EXPLAIN the DBManager queries and report any full table scans.").set_defaults(func=check_indexes_command)
+    commands.add_parser("rebuild-rollups", help="Recompute the monthly aggregate table from transactions.").set_defaults(func=rebuild_rollups_command)
+    commands.add_parser("verify-rollups", help="Reconcile the monthly aggregate table against transactions.").set_defaults(func=verify_rollups_command)
+    commands.add_parser("accounts", help="List the accounts.").set_defaults(func=accounts_command)
+    account_parser = commands.add_parser("add-account", help="Create an account with an empty ledger.")
+    account_parser.add_argument("name")
+    account_parser.set_defaults(func=add_account_command)
+    import_parser = commands.add_parser("import", help="Import a CSV or OFX bank statement.")
+    import_parser.add_argument("file")
+    import_parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    import_parser.add_argument("--default-category", default="Other", help="Category for rows without a known one.")
+    import_parser.set_defaults(func=import_command)
+    budgets_parser = commands.add_parser("check-budgets", help="Report every budget at 80%% or more of its amount.")
+    budgets_parser.add_argument("--since", help="Only months from this one (YYYY-MM) to the current month.")
+    budgets_parser.set_defaults(func=check_budgets_command)
+    commands.add_parser("recurring", help="List the recurring transaction rules.").set_defaults(func=recurring_command)
+    recurring_parser = commands.add_parser("add-recurring", help="Add a rule that posts a transaction on a schedule.")
+    recurring_parser.add_argument("type", choices=["income", "expense"])
+    recurring_parser.add_argument("amount", type=float)
+    recurring_parser.add_argument("category")
+    recurring_parser.add_argument("description")
+    recurring_parser.add_argument("--frequency", choices=FREQUENCIES, default="monthly")
+    recurring_parser.add_argument("--every", type=positive_int, default=1, help="Repeat every N days, weeks, months or years.")
+    recurring_parser.add_argument("--start", help="First occurrence (YYYY-MM-DD); today by default.")
+    recurring_parser.add_argument("--end", help="No occurrences after this date (YYYY-MM-DD).")
+    recurring_parser.set_defaults(func=add_recurring_command)
+    delete_recurring_parser = commands.add_parser("delete-recurring", help="Delete a recurring rule.")
+    delete_recurring_parser.add_argument("rule_id", type=int)
+    delete_recurring_parser.set_defaults(func=delete_recurring_command)
+    commands.add_parser("post-recurring", help="Post every recurring transaction that has fallen due.").set_defaults(func=post_recurring_command)
+    export_parser = commands.add_parser("export", help="Export transactions or monthly summaries to .csv, .parquet or .arrow.")
+    export_parser.add_argument("file")
+    export_parser.add_argument("--summary", action="store_true", help="Export monthly income/expense totals instead of transactions.")
+    export_parser.add_argument("--description")
+    export_parser.add_argument("--category")
+    export_parser.add_argument("--type", choices=["income", "expense"])
+    export_parser.add_argument("--start", help="Start date (YYYY-MM-DD).")
+    export_parser.add_argument("--end", help="End date (YYYY-MM-DD).")
+    export_parser.set_defaults(func=export_command)
+    args = parser.parse_args(argv)
+
+    db = DBManager(host=args.host, user=args.user, password=args.password, database=args.database,
+                   backend=args.backend, path=args.path, account_id=args.account)
+    if not db.pool:
+        return 1
+    try:
+        return args.func(db, args) or 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+-- The bms.sql schema for the embedded SQLite backend.
+-- DBManager runs this on a new database file; indexes and later changes come from migrations.py.
+
+CREATE TABLE IF NOT EXISTS `categories` (
+    `id` INTEGER PRIMARY KEY AUTOINCREMENT,
+    `name` VARCHAR(100) NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS `transactions` (
+    `id` INTEGER PRIMARY KEY AUTOINCREMENT,
+    `transaction_date` DATE NOT NULL,
+    `amount` DECIMAL(10, 2) NOT NULL,
+    `type` VARCHAR(7) NOT NULL, -- 'income' or 'expense'
+    `category_id` INTEGER REFERENCES `categories`(`id`),
+    `description` VARCHAR(255)
+);
+
+CREATE TABLE IF NOT EXISTS `budgets` (
+    `id` INTEGER PRIMARY KEY AUTOINCREMENT,
+    `category_id` INTEGER REFERENCES `categories`(`id`),
+    `amount` DECIMAL(10, 2) NOT NULL,
+    `month` INT NOT NULL,
+    `year` INT NOT NULL,
+    UNIQUE(`category_id`, `month`, `year`)
+);
+
+CREATE TABLE IF NOT EXISTS `savings_goals` (
+    `id` INTEGER PRIMARY KEY AUTOINCREMENT,
+    `name` VARCHAR(100) NOT NULL,
+    `target_amount` DECIMAL(10, 2) NOT NULL,
+    `current_amount` DECIMAL(10, 2) DEFAULT 0.00
+);
+
+INSERT OR IGNORE INTO `categories` (`name`) VALUES
+('Parental Money'),
+('Canteen/Food'),
+('Internet'),
+('Savings'),
+('Other');
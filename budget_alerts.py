@@ -0,0 +1,157 @@
+import datetime
+import threading
+from data_events import TransactionAdded, TransactionUpdated, TransactionDeleted, TransactionsImported, BudgetSet
+
+# Watches spending against budgets as writes happen. For every budgeted (category, month) it
+# has seen, the monitor holds the budget and the amount spent so far; each committed
+# transaction change adjusts those totals by its own amount and checks them against the
+# thresholds, so an alert can be shown the moment an entry crosses one, with no query.
+# A month is read from the database (budgets joined to monthly_rollups) the first time a
+# change touches it; reevaluate() re-reads everything, for imports and back-dated data.
+
+THRESHOLDS = (0.8, 1.0)
+
+
+class BudgetAlert:
+    def __init__(self, category, year, month, budget, spent, threshold):
+        self.category = category
+        self.year = year
+        self.month = month
+        self.budget = budget
+        self.spent = spent
+        self.threshold = threshold
+
+    @property
+    def over_budget(self):
+        return self.threshold >= 1
+
+    def message(self):
+        period = datetime.date(self.year, self.month, 1).strftime("%b %Y")
+        percent = self.spent / self.budget * 100
+        if self.over_budget:
+            return f"Over budget: {self.category} has spent {self.spent:,.0f} of {self.budget:,.0f} RWF for {period} ({percent:.0f}%)."
+        return f"{self.category} has used {percent:.0f}% of its {self.budget:,.0f} RWF budget for {period}."
+
+    def __repr__(self):
+        return f"BudgetAlert({self.category!r}, {self.year}-{self.month:02d}, {self.spent}/{self.budget})"
+
+
+class BudgetMonitor:
+    def __init__(self, db, thresholds=THRESHOLDS, on_alert=None):
+        """Calls on_alert(BudgetAlert) whenever a write takes a budget past one of thresholds
+        (fractions of the budget). Alerts are raised on the thread that committed the write.
+        """
+        self.db = db
+        self.thresholds = sorted(thresholds)
+        self.on_alert = on_alert
+        self.budgets = {}  # (category, year, month) -> budget
+        self.spent = {}    # (category, year, month) -> expense so far, for budgeted keys only
+        self.levels = {}   # (category, year, month) -> how many thresholds spending has reached
+        self.months = set()
+        self._lock = threading.RLock()
+        self.unsubscribe = db.events.subscribe(self.on_data_change, TransactionAdded, TransactionUpdated, TransactionDeleted, TransactionsImported, BudgetSet)
+
+    def _level(self, key):
+        budget = self.budgets.get(key) or 0
+        if budget <= 0:
+            return 0
+        used = self.spent.get(key, 0) / budget
+        return sum(1 for threshold in self.thresholds if used >= threshold)
+
+    def _load(self, first=None, last=None):
+        """Reads budgets and spending for the (year, month) range into memory; returns the keys read."""
+        rows = self.db.get_budget_totals(first, last)
+        if rows is None:
+            return []
+        if first is not None:
+            months = {(year, month) for year, month in month_range(first, last)}
+        else:
+            months = {(row['year'], row['month']) for row in rows}
+        for key in [key for key in self.budgets if key[1:] in months]:
+            del self.budgets[key]
+            self.spent.pop(key, None)
+        keys = []
+        for row in rows:
+            key = (row['category'], row['year'], row['month'])
+            self.budgets[key] = row['budget_amount']
+            self.spent[key] = row['spent_amount']
+            keys.append(key)
+        self.months |= months
+        return keys
+
+    def load(self, first=None, last=None):
+        """Reads budgets for a (year, month) range (all of them by default) without alerting:
+        whatever is already past a threshold is the baseline later changes are compared with.
+        """
+        with self._lock:
+            for key in self._load(first, last):
+                self.levels[key] = self._level(key)
+
+    def _evaluate(self, key):
+        level, previous = self._level(key), self.levels.get(key, 0)
+        self.levels[key] = level
+        if level > previous:
+            return BudgetAlert(key[0], key[1], key[2], self.budgets[key], self.spent[key], self.thresholds[level - 1])
+        return None
+
+    def on_data_change(self, event):
+        alerts = []
+        with self._lock:
+            if isinstance(event, TransactionsImported):
+                # Too many rows to follow one by one: forget the totals (keeping the levels
+                # already reported) until reevaluate() or the next change reads them again
+                self.budgets, self.spent, self.months = {}, {}, set()
+                return
+            if isinstance(event, BudgetSet):
+                key = (event.category, event.year, event.month)
+                self.levels.setdefault(key, 0)
+                self._load((event.year, event.month), (event.year, event.month))
+                alerts.append(self._evaluate(key))
+            else:
+                deltas = {}
+                for trans, sign in event.contributions():
+                    if trans['type'] == 'expense':
+                        date = trans['transaction_date']
+                        key = (trans['category'], date.year, date.month)
+                        deltas[key] = deltas.get(key, 0) + sign * trans['amount']
+                # Months not seen yet are read as they are now, this change included
+                fresh = {key[1:] for key in deltas if key[1:] not in self.months}
+                for year, month in fresh:
+                    self._load((year, month), (year, month))
+                for key, delta in deltas.items():
+                    if key not in self.budgets:
+                        continue
+                    if key[1:] in fresh:
+                        self.spent[key] -= delta
+                        self.levels.setdefault(key, self._level(key))
+                    self.spent[key] += delta
+                    alerts.append(self._evaluate(key))
+        self._raise([alert for alert in alerts if alert])
+
+    def reevaluate(self, first=None, last=None):
+        """Re-reads budgets and spending for a (year, month) range (every budgeted month by default)
+        and alerts for each budget that has reached a higher threshold than was last reported.
+
+        Returns the alerts raised.
+        """
+        with self._lock:
+            alerts = [self._evaluate(key) for key in self._load(first, last)]
+        alerts = [alert for alert in alerts if alert]
+        self._raise(alerts)
+        return alerts
+
+    def _raise(self, alerts):
+        for alert in alerts:
+            if self.on_alert:
+                self.on_alert(alert)
+
+    def close(self):
+        self.unsubscribe()
+
+
+def month_range(first, last):
+    """Every (year, month) from first to last inclusive."""
+    year, month = first
+    while (year, month) <= tuple(last):
+        yield year, month
+        year, month = (year, month + 1) if month < 12 else (year + 1, 1)
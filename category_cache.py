@@ -0,0 +1,86 @@
+import threading
+import time
+
+
+class CategoryCache:
+    def __init__(self, loader, ttl=None):
+        """An in-process name <-> id map of categories.
+
+        loader() returns rows with 'id' and 'name' (or None if the database is unreachable,
+        in which case nothing is cached). The map is loaded on first use and again after
+        invalidate(), after ttl seconds when a ttl is set, or when a lookup misses. A key still
+        missing after that reload is remembered as missing until invalidate() or the ttl, so
+        repeated lookups of an unknown name or id do not reload the table each time.
+        """
+        self.loader = loader
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._by_name = None
+        self._by_id = None
+        self._loaded_at = 0
+        self._missing = (set(), set())  # Names, ids known not to exist
+        self._lock = threading.Lock()
+
+    def _maps(self, reload=False):
+        with self._lock:
+            expired = self.ttl is not None and time.monotonic() - self._loaded_at > self.ttl
+            if self._by_name is None or expired:
+                self._missing = (set(), set())
+            if self._by_name is None or expired or reload:
+                self.misses += 1
+                rows = self.loader()
+                if rows is None:
+                    return {}, {}
+                self._by_name = {row['name']: row['id'] for row in rows}
+                self._by_id = {row['id']: row['name'] for row in rows}
+                self._loaded_at = time.monotonic()
+            else:
+                self.hits += 1
+            return self._by_name, self._by_id
+
+    def _lookup(self, index, key):
+        """key's value in map `index` (0: by name, 1: by id), or None if there is no such category."""
+        found = self._maps()[index]
+        if key in found:
+            return found[key]
+        with self._lock:
+            if key in self._missing[index]:
+                return None
+        # Possibly added by another client since we loaded
+        found = self._maps(reload=True)[index]
+        with self._lock:
+            if key not in found and self._by_name is not None:
+                self._missing[index].add(key)
+        return found.get(key)
+
+    def id_for(self, name):
+        return self._lookup(0, name)
+
+    def name_for(self, category_id):
+        if not category_id:
+            return None  # Uncategorised rows carry category_id 0 (or NULL)
+        return self._lookup(1, category_id)
+
+    def name_to_id(self):
+        return dict(self._maps()[0])
+
+    def names(self):
+        return sorted(self._maps()[0], key=str.lower)
+
+    def prime(self, rows):
+        """Replaces the map with rows the caller has already fetched, saving the loader a query."""
+        with self._lock:
+            self._by_name = {row['name']: row['id'] for row in rows}
+            self._by_id = {row['id']: row['name'] for row in rows}
+            self._loaded_at = time.monotonic()
+            self._missing = (set(), set())
+
+    def invalidate(self):
+        with self._lock:
+            self._by_name = None
+            self._by_id = None
+            self._missing = (set(), set())
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,157 @@
+import hashlib
+import math
+import customtkinter as ctk
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+# Each chart owns one Figure and one Tk canvas for the whole session. Refreshes are skipped
+# entirely when the data has not changed, and both charts update their existing artists in
+# place unless the number of slices, periods or categories changed.
+
+BACKGROUND = "#2B2B2B"
+START_ANGLE = 140
+
+
+def content_hash(*data):
+    return hashlib.sha1(repr(data).encode()).hexdigest()
+
+
+class PieChart:
+    def __init__(self, master):
+        self.figure = Figure(figsize=(5, 5), dpi=100, facecolor=BACKGROUND)
+        self.ax = self.figure.add_subplot(111)
+        self.canvas = FigureCanvasTkAgg(self.figure, master=master)
+        self.canvas.get_tk_widget().pack(side=ctk.TOP, fill=ctk.BOTH, expand=True)
+        self.wedges, self.labels, self.autotexts = [], [], []
+        self.data_hash = None
+
+    def update(self, spending_data):
+        """Redraws the spending pie; returns False when the data is unchanged and nothing was drawn."""
+        data_hash = content_hash(spending_data)
+        if data_hash == self.data_hash:
+            return False
+        self.data_hash = data_hash
+        labels = [item['category'] for item in spending_data or []]
+        sizes = [float(item['total']) for item in spending_data or []]
+        if sizes and len(sizes) == len(self.wedges):
+            self.move_wedges(labels, sizes)
+        else:
+            self.ax.clear()
+            if not sizes:
+                self.wedges, self.labels, self.autotexts = [], [], []
+                self.ax.text(0.5, 0.5, "No expense data", ha='center', va='center', color="white")
+                self.ax.axis('off')
+            else:
+                self.wedges, self.labels, self.autotexts = self.ax.pie(
+                    sizes, labels=labels, autopct=lambda p: f'{p:.0f}%', startangle=START_ANGLE, textprops={'color': "w"})
+                self.ax.axis('equal')
+            self.figure.tight_layout()
+        self.canvas.draw_idle()
+        return True
+
+    def move_wedges(self, labels, sizes):
+        """Re-angles the existing wedges and their texts the way Axes.pie would place them."""
+        total = sum(sizes)
+        theta1 = START_ANGLE
+        for wedge, label, autotext, name, size in zip(self.wedges, self.labels, self.autotexts, labels, sizes):
+            theta2 = theta1 + 360 * size / total
+            wedge.set_theta1(theta1)
+            wedge.set_theta2(theta2)
+            middle = math.radians((theta1 + theta2) / 2)
+            x, y = math.cos(middle), math.sin(middle)
+            label.set_text(name)
+            label.set_position((1.1 * x, 1.1 * y))
+            label.set_horizontalalignment('left' if x > 0 else 'right')
+            autotext.set_text(f'{100 * size / total:.0f}%')
+            autotext.set_position((0.6 * x, 0.6 * y))
+            theta1 = theta2
+
+
+class ReportChart:
+    def __init__(self, master):
+        self.figure = Figure(figsize=(10, 7), dpi=100, facecolor=BACKGROUND)
+        self.flow_ax, self.balance_ax, self.category_ax = self.figure.subplots(3, 1, sharex=True, gridspec_kw={'height_ratios': [3, 2, 3]})
+        self.canvas = FigureCanvasTkAgg(self.figure, master=master)
+        self.canvas.get_tk_widget().pack(side=ctk.TOP, fill=ctk.BOTH, expand=True)
+        self.layout = None  # (periods, forecast periods, category names) the current artists were drawn for
+        self.data_hash = None
+
+    def update(self, report):
+        """Draws an analytics report (see LedgerAnalytics.report); returns False when nothing changed."""
+        data_hash = content_hash(*(value.tolist() if isinstance(value, np.ndarray) else value for value in report.values()),
+                                 {name: values.tolist() for name, values in report["categories"].items()})
+        if data_hash == self.data_hash:
+            return False
+        self.data_hash = data_hash
+        layout = (len(report["labels"]), len(report["forecast"]), tuple(report["categories"]))
+        if layout == self.layout:
+            self.move_artists(report)
+        else:
+            self.draw(report)
+            self.layout = layout
+        self.canvas.draw_idle()
+        return True
+
+    def draw(self, report):
+        """Builds every bar and line of the report from scratch."""
+        labels = report["labels"]
+        x = np.arange(len(labels))
+        future = np.arange(len(labels), len(labels) + len(report["forecast"]))
+        width = 0.35
+
+        ax = self.flow_ax
+        ax.clear()
+        self.income_bars = ax.bar(x - width/2, report["income"], width, label='Income', color='#4CAF50')
+        self.expense_bars = ax.bar(x + width/2, report["expense"], width, label='Expense', color='#F44336')
+        self.rolling_line, = ax.plot(x, report["rolling_expense"], color='#FFC107', label='Expense (rolling mean)')
+        self.forecast_line, = ax.plot(future, report["forecast"], color='#FFC107', linestyle='--', marker='o', label='Expense forecast')
+        ax.set_title(f"Income vs Expense per {report['granularity']}", color='white')
+        ax.legend(fontsize=8)
+
+        ax = self.balance_ax
+        ax.clear()
+        self.balance_line, = ax.plot(x, report["balance"], color='#2196F3', marker='.')
+        ax.axhline(0, color='gray', linewidth=0.5)
+        ax.set_title('Running balance', color='white')
+
+        ax = self.category_ax
+        ax.clear()
+        bottom = np.zeros(len(labels))
+        self.category_bars = []
+        for name, values in report["categories"].items():
+            self.category_bars.append(ax.bar(x, values, 0.7, bottom=bottom, label=name))
+            bottom += values
+        ax.set_title('Expense by category', color='white')
+        if report["categories"]:
+            ax.legend(fontsize=8, ncol=3)
+
+        ax.set_xticks(np.concatenate((x, future)))
+        self.label_periods(report)
+        for ax in (self.flow_ax, self.balance_ax, self.category_ax):
+            ax.tick_params(axis='y', colors='white')
+            ax.set_facecolor("#343638")
+        self.figure.tight_layout()
+
+    def move_artists(self, report):
+        """Gives the existing bars and lines new values; the report must have the layout they were drawn for."""
+        for bars, values in ((self.income_bars, report["income"]), (self.expense_bars, report["expense"])):
+            for bar, value in zip(bars, values):
+                bar.set_height(value)
+        self.rolling_line.set_ydata(report["rolling_expense"])
+        self.forecast_line.set_ydata(report["forecast"])
+        self.balance_line.set_ydata(report["balance"])
+        bottom = np.zeros(len(report["labels"]))
+        for bars, values in zip(self.category_bars, report["categories"].values()):
+            for bar, base, value in zip(bars, bottom, values):
+                bar.set_y(base)
+                bar.set_height(value)
+            bottom += values
+        self.flow_ax.set_title(f"Income vs Expense per {report['granularity']}", color='white')
+        self.label_periods(report)
+        for ax in (self.flow_ax, self.balance_ax, self.category_ax):
+            ax.relim()
+            ax.autoscale_view()
+
+    def label_periods(self, report):
+        self.category_ax.set_xticklabels(report["labels"] + report["forecast_labels"], rotation=45, ha='right', color='white', fontsize=8)
@@ -0,0 +1,118 @@
+import threading
+import time
+
+# Connections idle for less than this are assumed alive and skip the ping on checkout
+PING_AFTER_IDLE = 30
+
+
+class DatabaseUnavailable(Exception):
+    """Raised by the storage layer itself: not connected, pool closed or exhausted."""
+
+
+class PoolTimeout(DatabaseUnavailable):
+    """Raised when no pooled connection becomes free in time."""
+
+
+class ConnectionPool:
+    def __init__(self, connect, ping, size=5, timeout=10, ping_after_idle=PING_AFTER_IDLE):
+        """Create a pool of at most `size` lazily opened connections.
+
+        connect() opens a new connection; ping(conn) must raise if conn is no longer usable
+        (and may repair it in place, as pymysql's ping(reconnect=True) does). Only connections
+        that sat idle for ping_after_idle seconds or more are pinged on checkout; one the server
+        dropped sooner fails its query instead, and is discarded when its rollback fails on release.
+        """
+        if size < 1:
+            raise ValueError("Pool size must be at least 1.")
+        self.size = size
+        self.timeout = timeout
+        self._connect = connect
+        self._ping = ping
+        self.ping_after_idle = ping_after_idle
+        self.pings = 0
+        self._idle = []  # (connection, time it was released), most recently released last
+        self._opened = 0
+        # Guards _idle, _opened and _closed; notified whenever a connection or a free slot appears
+        self._available = threading.Condition()
+        self._closed = False
+
+    def acquire(self, timeout=None):
+        """Check out a live connection, opening a new one if the pool is not full."""
+        wait = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + wait
+        with self._available:
+            while True:
+                if self._closed:
+                    raise DatabaseUnavailable("Connection pool is closed.")
+                if self._idle:
+                    conn, released = self._idle.pop()
+                    break
+                if self._opened < self.size:
+                    self._opened += 1
+                    conn = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(f"No database connection free after {wait}s.")
+                self._available.wait(remaining)
+        if conn is None:
+            return self._open()  # Outside the lock: connecting can be slow
+        if time.monotonic() - released < self.ping_after_idle:
+            return conn
+        return self._revive(conn)
+
+    def _open(self):
+        """Open a connection for a slot already counted in _opened, giving the slot back if that fails."""
+        try:
+            return self._connect()
+        except Exception:
+            self._free_slot()
+            raise
+
+    def _revive(self, conn):
+        """Ping a checked-out connection, replacing it if the server dropped it."""
+        try:
+            self.pings += 1
+            self._ping(conn)
+            return conn
+        except Exception:
+            self._close(conn)
+            return self._open()  # In the dropped connection's slot
+
+    def release(self, conn):
+        """Return a connection to the pool, dropping any uncommitted work."""
+        try:
+            conn.rollback()
+        except Exception:
+            self._discard(conn)
+            return
+        with self._available:
+            if not self._closed:
+                self._idle.append((conn, time.monotonic()))
+                self._available.notify()
+                return
+        self._discard(conn)
+
+    def _free_slot(self):
+        with self._available:
+            self._opened -= 1
+            self._available.notify()
+
+    def _discard(self, conn):
+        self._free_slot()
+        self._close(conn)
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def close(self):
+        """Close every idle connection; busy ones are closed when released."""
+        with self._available:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._available.notify_all()
+        for conn, _ in idle:
+            self._discard(conn)
@@ -0,0 +1,99 @@
+import threading
+
+# DBManager publishes one of these on db.events after every committed write, so views can
+# patch what they show instead of re-running their queries. Transaction rows have the
+# same keys as DBManager.TRANSACTION_COLUMNS rows.
+
+
+class DataChange:
+    """Base class of every data-change event."""
+
+    def contributions(self):
+        """(transaction row, +1 or -1) pairs this change adds to or takes from any total."""
+        return []
+
+    def __repr__(self):
+        return f"{type(self).__name__}({vars(self)!r})"
+
+
+class TransactionAdded(DataChange):
+    def __init__(self, transaction):
+        self.transaction = transaction
+
+    def contributions(self):
+        return [(self.transaction, 1)]
+
+
+class TransactionUpdated(DataChange):
+    def __init__(self, transaction, previous):
+        self.transaction = transaction
+        self.previous = previous
+
+    def contributions(self):
+        return [(self.previous, -1), (self.transaction, 1)]
+
+
+class TransactionDeleted(DataChange):
+    def __init__(self, previous):
+        self.previous = previous
+
+    def contributions(self):
+        return [(self.previous, -1)]
+
+
+class TransactionsImported(DataChange):
+    """Many rows were added at once; views should reload rather than patch."""
+
+    def __init__(self, count):
+        self.count = count
+
+
+class BudgetSet(DataChange):
+    def __init__(self, category, month, year, amount):
+        self.category = category
+        self.month = month
+        self.year = year
+        self.amount = amount
+
+
+class GoalAdded(DataChange):
+    def __init__(self, goal_id, name, target_amount):
+        self.goal_id = goal_id
+        self.name = name
+        self.target_amount = target_amount
+
+
+class GoalFunded(DataChange):
+    def __init__(self, goal_id, amount):
+        self.goal_id = goal_id
+        self.amount = amount
+
+
+class EventBus:
+    def __init__(self):
+        """Calls subscribers synchronously, on the thread that committed the change."""
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback, *event_types):
+        """Calls callback(event) for every event of the given types (all events if none); returns an unsubscribe function."""
+        entry = (callback, event_types or (DataChange,))
+        with self._lock:
+            self._subscribers.append(entry)
+
+        def unsubscribe():
+            with self._lock:
+                if entry in self._subscribers:
+                    self._subscribers.remove(entry)
+        return unsubscribe
+
+    def publish(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback, event_types in subscribers:
+            if isinstance(event, event_types):
+                try:
+                    callback(event)
+                except Exception as e:
+                    # A failing view must not turn a committed write into an error
+                    print(f"Data change subscriber failed: {e}")
@@ -1,87 +1,525 @@
-import pymysql
-from pymysql import Error
+import copy
 import datetime
+import base64
+import binascii
+import threading
+import time
+from collections import Counter
+from decimal import Decimal
+from contextlib import contextmanager
+from connection_pool import DatabaseUnavailable
+from backends import DATABASE_ERRORS, create_backend
+from migrations import apply_migrations
+from category_cache import CategoryCache
+from query_stats import QueryStats
+from write_queue import WriteQueue
+from data_events import EventBus, TransactionAdded, TransactionUpdated, TransactionDeleted, TransactionsImported, BudgetSet, GoalAdded, GoalFunded
+import recurring
+import rollups
+
+def encode_cursor(row):
+    """Packs the (transaction_date, id) of the last row on a page into an opaque page cursor."""
+    raw = f"{row['transaction_date']:%Y-%m-%d}:{row['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def month_start(year, month):
+    """First day of the given month; months past 12 or below 1 roll over into other years."""
+    year += (month - 1) // 12
+    month = (month - 1) % 12 + 1
+    return datetime.date(year, month, 1)
+
+def as_money(value):
+    """The Decimal a DECIMAL(10, 2) column would hold for value."""
+    return Decimal(str(value)).quantize(rollups.CENT)
+
+def decode_cursor(cursor):
+    """Unpacks a page cursor into (transaction_date, id); raises ValueError if it is malformed."""
+    try:
+        date_str, id_str = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+        return datetime.datetime.strptime(date_str, '%Y-%m-%d').date(), int(id_str)
+    except (ValueError, UnicodeDecodeError, binascii.Error) as e:
+        raise ValueError(f"Invalid page cursor: {cursor!r}") from e
+
+class DashboardSnapshot:
+    def __init__(self, summary, categories, transactions, spending):
+        """Everything the dashboard shows, read at one point in time.
+
+        summary is a get_summary() dict, categories a sorted list of names, transactions the most
+        recent TRANSACTION_COLUMNS rows (newest first) and spending a get_spending_by_category() list.
+        """
+        self.summary = summary
+        self.categories = categories
+        self.transactions = transactions
+        self.spending = spending
+
+    def parts(self):
+        return {
+            "summary": self.summary,
+            "categories": self.categories,
+            "transactions": self.transactions,
+            "spending": self.spending,
+        }
+
 
 class DBManager:
-    def __init__(self, host='localhost', user='root', password='', database='bms_db'):
-        """Initialize the database connection."""
+    # Shared SELECT for every query that returns full transaction rows; uncategorised ones have category None
+    TRANSACTION_COLUMNS = """
+        SELECT t.id, t.transaction_date, t.amount, t.type, c.name as category, t.description
+        FROM transactions t
+        LEFT JOIN categories c ON t.category_id = c.id
+        """
+
+    def __init__(self, host='localhost', user='root', password='', database='bms_db', pool_size=5, pool_timeout=10, migrate=True, category_ttl=None, slow_query_ms=200,
+                 backend='mysql', path='bms.sqlite3', durability='immediate', group_commit_ms=5, in_memory=False, account_id=1):
+        """Initialize the database connection pool.
+
+        backend='mysql' connects to the server given by host/user/password/database;
+        backend='sqlite' opens (and on first use creates) the embedded database file at path.
+        durability sets how writes passed to submit_write() are committed (see write_queue.py).
+        in_memory=True keeps a columnar copy of the transactions (see transaction_store.py) and
+        answers searches, summaries and budgets from it instead of the database.
+        Every read and write is scoped to the ledger of account_id; for_account() gives views of
+        other accounts over the same connections.
+        """
+        self._local = threading.local()
+        self.account_id = account_id
+        self._accounts = {account_id: self}
+        self._shared = False
+        self.writes = WriteQueue(self, durability=durability, max_delay_ms=group_commit_ms)
+        self.events = EventBus()
+        self.store = None
+        self.query_stats = QueryStats(slow_query_ms=slow_query_ms)
+        self.category_cache = CategoryCache(lambda: self.execute_query("SELECT id, name FROM categories", fetch=True), ttl=category_ttl)
+        if backend == 'sqlite':
+            self.backend = create_backend('sqlite', path=path)
+        else:
+            self.backend = create_backend(backend, host=host, user=user, password=password, database=database)
         try:
-            self.conn = pymysql.connect(
-                host=host,
-                user=user,
-                password=password,
-                database=database,
-                cursorclass=pymysql.cursors.DictCursor # Return rows as dictionaries
-            )
-            self.cursor = self.conn.cursor()
+            self.pool = self.backend.create_pool(pool_size, pool_timeout)
+            # Open the first connection now so a bad configuration fails at startup
+            with self.cursor() as cursor:
+                self.backend.ensure_schema(cursor)
             print("Database connection successful")
-        except Error as e:
-            print(f"Error connecting to MySQL: {e}")
-            self.conn = None
+        except DATABASE_ERRORS as e:
+            print(f"Error connecting to the {self.backend.name} database: {e}")
+            self.pool = None
+            return
+        if migrate:
+            try:
+                apply_migrations(self)
+            except DATABASE_ERRORS as e:
+                print(f"Schema migration failed: {e}")
+        if in_memory:
+            # Deferred: numpy is only needed for the in-memory store
+            from transaction_store import TransactionStore
+            self.store = TransactionStore(self)
+
+    @contextmanager
+    def connection(self):
+        """Check out a pooled connection, reusing the one this thread already holds."""
+        held = getattr(self._local, 'conn', None)
+        if held is not None:
+            yield held
+            return
+        if not self.pool:
+            raise DatabaseUnavailable("Not connected to the database.")
+        conn = self.pool.acquire()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self.pool.release(conn)
+
+    @contextmanager
+    def cursor(self, cursorclass=None):
+        """Yield a fresh cursor on this thread's connection and close it afterwards."""
+        with self.connection() as conn:
+            cur = conn.cursor(cursorclass) if cursorclass else conn.cursor()
+            try:
+                yield cur
+            finally:
+                cur.close()
+
+    @contextmanager
+    def record_queries(self):
+        """Collect the (query, params) of every statement this thread runs inside the block."""
+        self._local.recorder = queries = []
+        try:
+            yield queries
+        finally:
+            self._local.recorder = None
+
+    @contextmanager
+    def transaction(self):
+        """Group the writes made inside the block into a single commit.
+
+        A nested block runs under a savepoint: if it raises, only its own writes are undone
+        and the enclosing transaction carries on.
+        """
+        with self.connection() as conn:
+            depth = getattr(self._local, 'depth', 0)
+            if depth:
+                pending = self._local.pending_events
+                mark = len(pending)
+                try:
+                    with self._savepoint(conn, f"sp_{depth}"):
+                        self._local.depth = depth + 1
+                        try:
+                            yield conn
+                        finally:
+                            self._local.depth = depth
+                except BaseException:
+                    del pending[mark:]  # Those writes were undone
+                    raise
+                return
+            self._local.in_transaction = True
+            self._local.depth = 1
+            self._local.pending_events = pending = []
+            try:
+                self.backend.begin(conn)
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                self._local.in_transaction = False
+                self._local.depth = 0
+                self._local.pending_events = []
+            # Only announce changes once they are committed
+            for events, event in pending:
+                events.publish(event)
+
+    @contextmanager
+    def _savepoint(self, conn, name):
+        with conn.cursor() as cursor:
+            cursor.execute(f"SAVEPOINT {name}")
+        try:
+            yield
+        except BaseException:
+            with conn.cursor() as cursor:
+                cursor.execute(f"ROLLBACK TO SAVEPOINT {name}")
+            raise
+        with conn.cursor() as cursor:
+            cursor.execute(f"RELEASE SAVEPOINT {name}")
+
+    def submit_write(self, func, *args, **kwargs):
+        """Runs a write method such as add_transaction as one unit of work, group-committed per the durability setting.
+
+        Returns a Future of func's result; call flush() to wait for deferred writes.
+        """
+        return self.writes.submit(func, *args, **kwargs)
+
+    def flush(self):
+        """Waits until every write passed to submit_write() so far is committed."""
+        self.writes.flush()
+
+    def _emit(self, event):
+        """Publishes a data-change event, holding it back until the current transaction commits.
+
+        Every announced change also moves the account's data version, in the same transaction.
+        """
+        self._bump_version(self.account_id)
+        if getattr(self._local, 'in_transaction', False):
+            self._local.pending_events.append((self.events, event))
+        else:
+            self.events.publish(event)
+
+    def _bump_version(self, account_id):
+        query = self.backend.upsert("data_versions", ["account_id", "version"], ["account_id"], increment=["version"])
+        self.execute_query(query, (account_id, 1))
+
+    def get_data_version(self):
+        """A number that changes whenever this account's data or the categories change; one cheap query.
+
+        Callers that cache query results can compare it with the version they cached at.
+        """
+        query = "SELECT COALESCE(SUM(version), 0) AS version FROM data_versions WHERE account_id IN (0, %s)"
+        result = self.execute_query(query, (self.account_id,), fetch=True)
+        return int(result[0]['version']) if result else None
+
+    def for_account(self, account_id):
+        """The DBManager of another account's ledger.
+
+        It shares this one's connection pool, write queue and category cache, but has its own
+        events and (with in_memory) its own TransactionStore, so one tenant's changes never
+        touch another's caches. Asking twice for the same account returns the same object.
+        """
+        tenant = self._accounts.get(account_id)
+        if tenant is None:
+            tenant = copy.copy(self)
+            tenant.account_id = account_id
+            tenant.events = EventBus()
+            tenant._shared = True
+            if self.store is not None:
+                tenant.store = type(self.store)(tenant)
+            tenant = self._accounts.setdefault(account_id, tenant)
+        return tenant
+
+    def add_account(self, name):
+        """Creates an account with an empty ledger; returns its id."""
+        return self.execute_query("INSERT INTO accounts (name) VALUES (%s)", (name,))
+
+    def get_accounts(self):
+        """Every account's id and name."""
+        return self.execute_query("SELECT id, name FROM accounts ORDER BY id", fetch=True)
+
+    def _local_store(self):
+        """The in-memory store, if there is one and it can see everything this thread would.
+
+        Inside a transaction it cannot: the thread's own uncommitted writes only reach it on commit.
+        """
+        if self.store is None or getattr(self._local, 'in_transaction', False):
+            return None
+        return self.store
+
+    def _transaction_row(self, transaction_id, date, amount, trans_type, category_id, description):
+        """A TRANSACTION_COLUMNS-shaped row for a data-change event, built without a query."""
+        return {
+            'id': transaction_id,
+            'transaction_date': rollups.as_date(date),
+            'amount': as_money(amount),
+            'type': trans_type,
+            'category': self.category_cache.name_for(category_id),
+            'description': description,
+        }
+
+    def _stored_row(self, row):
+        return self._transaction_row(row['id'], row['transaction_date'], row['amount'], row['type'], row['category_id'], row['description'])
 
     def execute_query(self, query, params=None, fetch=False):
         """Execute a generic query."""
-        if not self.conn:
+        if not self.pool:
             return None
+        recorder = getattr(self._local, 'recorder', None)
+        if recorder is not None:
+            recorder.append((query, params))
+        start = time.perf_counter()
+        result = None
+        failed = False
         try:
-            self.cursor.execute(query, params or ())
-            if fetch:
-                result = self.cursor.fetchall()
-                return result
-            else:
-                self.conn.commit()
-                return self.cursor.lastrowid
-        except Error as e:
+            with self.cursor() as cursor:
+                cursor.execute(query, params or ())
+                if fetch:
+                    result = cursor.fetchall()
+                    return result
+                if not getattr(self._local, 'in_transaction', False):
+                    cursor.connection.commit()
+                return cursor.lastrowid
+        except DATABASE_ERRORS as e:
+            failed = True
+            if getattr(self._local, 'in_transaction', False):
+                raise
             print(f"Query failed: {e}")
             return None
+        finally:
+            self.query_stats.record(query, params, time.perf_counter() - start, result, failed)
 
     def get_category_id_by_name(self, category_name):
         """Finds a category's ID by its name."""
-        query = "SELECT id FROM categories WHERE name = %s"
-        result = self.execute_query(query, (category_name,), fetch=True)
-        return result[0]['id'] if result else None
+        return self.category_cache.id_for(category_name)
+
+    def _resolve_category_id(self, category):
+        """Accepts a category ID as-is, or looks a category name up in the cache."""
+        if isinstance(category, int):
+            return category
+        return self.get_category_id_by_name(category)
+
+    def add_category(self, name):
+        """Adds a new category."""
+        result = self.execute_query("INSERT INTO categories (name) VALUES (%s)", (name,))
+        self.category_cache.invalidate()
+        if result is not None:
+            self._bump_version(0)
+        return result
+
+    def rename_category(self, category_id, new_name):
+        """Renames a category."""
+        result = self.execute_query("UPDATE categories SET name = %s WHERE id = %s", (new_name, category_id))
+        self.category_cache.invalidate()
+        if result is not None:
+            self._bump_version(0)
+        return result
 
     def add_transaction(self, amount, trans_type, category_name, description, date=None):
-        """Adds a new transaction to the database."""
+        """Adds a new transaction to the database; category_name may also be a category ID."""
         if date is None:
             date = datetime.date.today()
         
-        category_id = self.get_category_id_by_name(category_name)
+        category_id = self._resolve_category_id(category_name)
         if category_id is None:
             print(f"Category '{category_name}' not found.")
             return None
 
         query = """
-        INSERT INTO transactions (transaction_date, amount, type, category_id, description)
-        VALUES (%s, %s, %s, %s, %s)
+        INSERT INTO transactions (transaction_date, amount, type, category_id, description, account_id)
+        VALUES (%s, %s, %s, %s, %s, %s)
         """
-        params = (date, amount, trans_type, category_id, description)
+        params = (date, amount, trans_type, category_id, description, self.account_id)
+        try:
+            with self.transaction():
+                transaction_id = self.execute_query(query, params)
+                self._adjust_rollup(date, category_id, trans_type, amount, 1)
+                self._emit(TransactionAdded(self._transaction_row(transaction_id, date, amount, trans_type, category_id, description)))
+            return transaction_id
+        except DATABASE_ERRORS as e:
+            print(f"Query failed: {e}")
+            return None
+
+    def _adjust_rollup(self, date, category_id, trans_type, amount, count):
+        """Adds (or with negative values removes) a transaction's contribution to monthly_rollups."""
+        self.execute_query(rollups.adjust_sql(self.backend), rollups.delta_params(self.account_id, date, category_id, trans_type, amount, count))
+
+    def _lock_transaction_row(self, transaction_id):
+        """Reads a transaction's stored values, locking it until the current transaction ends."""
+        query = "SELECT id, transaction_date, amount, type, category_id, description FROM transactions WHERE id = %s AND account_id = %s" + self.backend.for_update
+        result = self.execute_query(query, (transaction_id, self.account_id), fetch=True)
+        return result[0] if result else None
+
+    def add_transactions_bulk(self, rows):
+        """Inserts many (date, amount, type, category_id, description) rows in one transaction."""
+        start = time.perf_counter()
+        with self.transaction():
+            query = self._insert_transactions(rows)
+            self._emit(TransactionsImported(len(rows)))
+        self.query_stats.record(query, None, time.perf_counter() - start, row_count=len(rows))
+        return len(rows)
+
+    def _insert_transactions(self, rows, extra_columns=()):
+        """Inserts (date, amount, type, category_id, description, *extra) rows with one executemany
+        and adds them to monthly_rollups; call inside a transaction. Returns the INSERT statement.
+        """
+        columns = ["transaction_date", "amount", "type", "category_id", "description", *extra_columns, "account_id"]
+        query = f"""
+        INSERT INTO transactions ({", ".join(columns)})
+        VALUES ({", ".join(["%s"] * len(columns))})
+        """
+        deltas = {}
+        for date, amount, trans_type, category_id, *_ in rows:
+            key = rollups.delta_params(self.account_id, date, category_id, trans_type, 0, 0)[:5]
+            total, count = deltas.get(key, (0, 0))
+            deltas[key] = (total + amount, count + 1)
+        with self.cursor() as cursor:
+            cursor.executemany(query, [tuple(row) + (self.account_id,) for row in rows])
+            cursor.executemany(rollups.adjust_sql(self.backend), [key + value for key, value in deltas.items()])
+        return query
+
+    def add_recurring_rule(self, amount, trans_type, category_name, description, frequency, start_date=None, every=1, end_date=None):
+        """Adds a rule posting the transaction every `every` days, weeks, months or years (frequency) from start_date.
+
+        Nothing is posted until post_recurring_transactions() runs.
+        """
+        if frequency not in recurring.FREQUENCIES:
+            raise ValueError(f"Unknown frequency: {frequency!r}")
+        if not isinstance(every, int) or every < 1:
+            raise ValueError(f"A rule must repeat every 1 or more {recurring.UNITS[frequency]}, not {every!r}.")
+        category_id = self._resolve_category_id(category_name)
+        if category_id is None:
+            print(f"Category '{category_name}' not found.")
+            return None
+        start_date = start_date or datetime.date.today()
+        query = """
+        INSERT INTO recurring_rules (account_id, amount, type, category_id, description, frequency, every, start_date, end_date, next_date)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """
+        params = (self.account_id, amount, trans_type, category_id, description, frequency, every, start_date, end_date, start_date)
         return self.execute_query(query, params)
 
+    def get_recurring_rules(self):
+        """Retrieves every recurring rule with its category name, soonest first."""
+        query = """
+        SELECT r.id, r.amount, r.type, c.name AS category, r.description, r.frequency, r.every, r.start_date, r.end_date, r.next_date
+        FROM recurring_rules r
+        LEFT JOIN categories c ON r.category_id = c.id
+        WHERE r.account_id = %s
+        ORDER BY r.next_date, r.id
+        """
+        return self.execute_query(query, (self.account_id,), fetch=True)
+
+    def delete_recurring_rule(self, rule_id):
+        """Stops a rule; transactions it has already posted are kept."""
+        query = "DELETE FROM recurring_rules WHERE id = %s AND account_id = %s"
+        return self.execute_query(query, (rule_id, self.account_id))
+
+    def post_recurring_transactions(self, today=None):
+        """Posts every occurrence of every rule that has fallen due up to today, in one transaction.
+
+        However long the app was closed, this is one batched insert. Rules are locked while
+        they are read and advanced, so concurrent runs post each occurrence once. Returns the
+        number of transactions posted.
+        """
+        today = today or datetime.date.today()
+        start = time.perf_counter()
+        with self.transaction():
+            query = "SELECT * FROM recurring_rules WHERE account_id = %s AND next_date <= %s" + self.backend.for_update
+            rules = self.execute_query(query, (self.account_id, today), fetch=True)
+            if not rules:
+                return 0
+            rows, advanced = [], []
+            for rule in rules:
+                try:
+                    dates, next_date = recurring.due_dates(rule, today)
+                except ValueError as e:
+                    print(f"Skipping recurring rule: {e}")
+                    continue
+                rows += [(date, rule['amount'], rule['type'], rule['category_id'], rule['description'], rule['id'], date) for date in dates]
+                advanced.append((next_date, rule['id']))
+            # Occurrences of a rule whose next_date was moved back are already there
+            rule_ids = [rule['id'] for rule in rules]
+            query = f"""
+            SELECT recurring_rule_id, occurrence_date FROM transactions
+            WHERE recurring_rule_id IN ({", ".join(["%s"] * len(rule_ids))}) AND occurrence_date >= %s
+            """
+            posted = self.execute_query(query, (*rule_ids, min(rule['next_date'] for rule in rules)), fetch=True)
+            posted = {(row['recurring_rule_id'], row['occurrence_date']) for row in posted}
+            rows = [row for row in rows if row[5:] not in posted]
+            if rows:
+                query = self._insert_transactions(rows, ["recurring_rule_id", "occurrence_date"])
+            with self.cursor() as cursor:
+                cursor.executemany("UPDATE recurring_rules SET next_date = %s WHERE id = %s", advanced)
+            if rows:
+                self._emit(TransactionsImported(len(rows)))
+        self.query_stats.record(query, None, time.perf_counter() - start, row_count=len(rows))
+        return len(rows)
+
+    def get_max_transaction_id(self):
+        """Returns the highest transaction id in this account's ledger, or 0 for an empty one."""
+        result = self.execute_query("SELECT MAX(id) AS max_id FROM transactions WHERE account_id = %s", (self.account_id,), fetch=True)
+        return (result[0]['max_id'] or 0) if result else 0
+
+    def count_transaction_keys(self, start_date, end_date, max_id):
+        """Counts transactions per (date, amount, description) between two dates, ignoring ids above max_id."""
+        query = """
+        SELECT transaction_date, amount, description, COUNT(*) AS n
+        FROM transactions
+        WHERE account_id = %s AND transaction_date >= %s AND transaction_date <= %s AND id <= %s
+        GROUP BY transaction_date, amount, description
+        """
+        rows = self.execute_query(query, (self.account_id, start_date, end_date, max_id), fetch=True) or []
+        return Counter({(row['transaction_date'], row['amount'], row['description'] or ''): row['n'] for row in rows})
+
     def get_transactions(self, limit=20):
         """Fetches recent transactions, joining with categories."""
+        store = self._local_store()
+        if store:
+            return store.search(limit=limit)
         query = """
-        SELECT t.id, t.transaction_date, t.amount, t.type, c.name as category, t.description
-        FROM transactions t
-        JOIN categories c ON t.category_id = c.id
+        WHERE t.account_id = %s
         ORDER BY t.transaction_date DESC, t.id DESC
         LIMIT %s
         """
-        return self.execute_query(query, (limit,), fetch=True)
+        return self.execute_query(self.TRANSACTION_COLUMNS + query, (self.account_id, limit), fetch=True)
 
-    def search_transactions(self, description=None, category=None, trans_type=None, start_date=None, end_date=None):
-        """Searches for transactions based on a set of optional criteria."""
-        query_base = """
-        SELECT t.id, t.transaction_date, t.amount, t.type, c.name as category, t.description
-        FROM transactions t
-        JOIN categories c ON t.category_id = c.id
-        """
-        conditions = []
-        params = []
+    def _search_conditions(self, description=None, category=None, trans_type=None, start_date=None, end_date=None):
+        """Builds the WHERE conditions and parameters shared by every transaction search."""
+        conditions = ["t.account_id = %s"]
+        params = [self.account_id]
 
         if description:
-            conditions.append("t.description LIKE %s")
-            params.append(f"%{description}%")
+            description_conditions, description_params = self.backend.description_filter(description)
+            conditions.extend(description_conditions)
+            params.extend(description_params)
         if category:
             conditions.append("c.name = %s")
             params.append(category)
@@ -94,53 +532,168 @@ class DBManager:
         if end_date:
             conditions.append("t.transaction_date <= %s")
             params.append(end_date)
+        return conditions, params
 
+    def search_transactions(self, description=None, category=None, trans_type=None, start_date=None, end_date=None, rank=False):
+        """Searches for transactions based on a set of optional criteria.
+
+        With rank=True, description matches come back by full-text relevance instead of newest first.
+        """
+        store = self._local_store()
+        if store and not (description and rank):  # Relevance ranking needs the full-text index
+            return store.search(description, category, trans_type, start_date, end_date)
+        conditions, params = self._search_conditions(description, category, trans_type, start_date, end_date)
+        query = self.TRANSACTION_COLUMNS
         if conditions:
-            query = query_base + " WHERE " + " AND ".join(conditions)
+            query += " WHERE " + " AND ".join(conditions)
+        relevance, relevance_params = self.backend.relevance_order(description) if description and rank else (None, [])
+        if relevance:
+            query += f" ORDER BY {relevance}, t.transaction_date DESC, t.id DESC"
+            params.extend(relevance_params)
         else:
-            query = query_base
-        
-        query += " ORDER BY t.transaction_date DESC, t.id DESC"
+            query += " ORDER BY t.transaction_date DESC, t.id DESC"
 
         return self.execute_query(query, tuple(params), fetch=True)
 
+    def search_transactions_page(self, page_size=50, cursor=None, description=None, category=None, trans_type=None, start_date=None, end_date=None):
+        """Returns one page of matching transactions and an opaque cursor for the next page (None on the last page).
+
+        Pages are read with a keyset seek on (transaction_date, id), so every page costs the same
+        however deep into the history it is. Raises ValueError unless page_size is at least 1.
+        """
+        if not isinstance(page_size, int) or page_size < 1:
+            raise ValueError(f"page_size must be at least 1, not {page_size!r}")
+        before = decode_cursor(cursor) if cursor else None
+        store = self._local_store()
+        if store:
+            rows = store.search(description, category, trans_type, start_date, end_date, before=before, limit=page_size + 1)
+        else:
+            conditions, params = self._search_conditions(description, category, trans_type, start_date, end_date)
+            if before:
+                last_date, last_id = before
+                conditions.append("(t.transaction_date < %s OR (t.transaction_date = %s AND t.id < %s))")
+                params.extend([last_date, last_date, last_id])
+            query = self.TRANSACTION_COLUMNS
+            if conditions:
+                query += " WHERE " + " AND ".join(conditions)
+            # Ask for one extra row to learn whether another page follows
+            query += " ORDER BY t.transaction_date DESC, t.id DESC LIMIT %s"
+            params.append(page_size + 1)
+            rows = self.execute_query(query, tuple(params), fetch=True) or []
+        if len(rows) <= page_size:
+            return list(rows), None
+        rows = list(rows[:page_size])
+        return rows, encode_cursor(rows[-1])
+
+    def _stream(self, query, params, batch_size):
+        """Yields the rows of a query through an unbuffered cursor, batch_size rows at a time.
+
+        The generator holds its own pooled connection (not the thread's) until it is exhausted or closed,
+        so the caller may run other queries while iterating.
+        """
+        if not self.pool:
+            return
+        conn = self.pool.acquire()
+        start = time.perf_counter()
+        count = 0
+        try:
+            cursor = self.backend.stream_cursor(conn)
+            try:
+                cursor.execute(query, params)
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    count += len(rows)
+                    yield from rows
+            finally:
+                cursor.close()
+        finally:
+            self.pool.release(conn)
+            # Includes the time the consumer spent between batches
+            self.query_stats.record(query, params, time.perf_counter() - start, row_count=count)
+
+    def stream_transactions(self, description=None, category=None, trans_type=None, start_date=None, end_date=None, batch_size=1000):
+        """Yields every transaction matching the search_transactions filters, in the same order, in bounded memory."""
+        conditions, params = self._search_conditions(description, category, trans_type, start_date, end_date)
+        query = self.TRANSACTION_COLUMNS
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY t.transaction_date DESC, t.id DESC"
+        return self._stream(query, tuple(params), batch_size)
+
+    def stream_monthly_summaries(self, batch_size=1000):
+        """Yields total income and expense for every month on record, oldest first."""
+        query = """
+        SELECT
+            year,
+            month,
+            SUM(CASE WHEN type = 'income' THEN total ELSE 0 END) as total_income,
+            SUM(CASE WHEN type = 'expense' THEN total ELSE 0 END) as total_expense
+        FROM monthly_rollups
+        WHERE account_id = %s
+        GROUP BY year, month
+        ORDER BY year, month
+        """
+        return self._stream(query, (self.account_id,), batch_size)
+
+    def stream_ledger(self, batch_size=50000):
+        """Yields the id, date, amount, type, category_id and description of every transaction in id order, for columnar loading."""
+        query = "SELECT id, transaction_date, amount, type, category_id, description FROM transactions WHERE account_id = %s ORDER BY id"
+        return self._stream(query, (self.account_id,), batch_size)
+
+    def get_transactions_page(self, page_size=50, cursor=None):
+        """Returns one page of the most recent transactions and the cursor for the next page."""
+        return self.search_transactions_page(page_size, cursor)
+
     def get_monthly_summary(self):
         """Calculates total income and expense for the last 12 months."""
+        today = datetime.date.today()
+        first = month_start(today.year, today.month - 11)
         query = """
         SELECT
-            YEAR(transaction_date) as year,
-            MONTH(transaction_date) as month,
-            SUM(CASE WHEN type = 'income' THEN amount ELSE 0 END) as total_income,
-            SUM(CASE WHEN type = 'expense' THEN amount ELSE 0 END) as total_expense
-        FROM transactions
-        WHERE transaction_date >= DATE_SUB(CURDATE(), INTERVAL 12 MONTH)
-        GROUP BY YEAR(transaction_date), MONTH(transaction_date)
+            year,
+            month,
+            SUM(CASE WHEN type = 'income' THEN total ELSE 0 END) as total_income,
+            SUM(CASE WHEN type = 'expense' THEN total ELSE 0 END) as total_expense
+        FROM monthly_rollups
+        WHERE account_id = %s
+          AND (year > %s OR (year = %s AND month >= %s)) AND (year < %s OR (year = %s AND month <= %s))
+        GROUP BY year, month
         ORDER BY year, month;
         """
-        return self.execute_query(query, fetch=True)
+        params = (self.account_id, first.year, first.year, first.month, today.year, today.year, today.month)
+        return self.execute_query(query, params, fetch=True)
 
     def get_transaction_by_id(self, transaction_id):
         """Fetches a single transaction by its ID."""
-        query = """
-        SELECT t.id, t.transaction_date, t.amount, t.type, c.name as category, t.description
-        FROM transactions t
-        JOIN categories c ON t.category_id = c.id
-        WHERE t.id = %s
-        """
-        result = self.execute_query(query, (transaction_id,), fetch=True)
+        query = self.TRANSACTION_COLUMNS + " WHERE t.id = %s AND t.account_id = %s"
+        result = self.execute_query(query, (transaction_id, self.account_id), fetch=True)
         return result[0] if result else None
 
     def update_transaction(self, transaction_id, date, amount, trans_type, category_name, description):
-        """Updates an existing transaction."""
-        category_id = self.get_category_id_by_name(category_name)
+        """Updates an existing transaction; category_name may also be a category ID."""
+        category_id = self._resolve_category_id(category_name)
         if category_id is None: return None
         query = """
         UPDATE transactions
         SET transaction_date = %s, amount = %s, type = %s, category_id = %s, description = %s
-        WHERE id = %s
+        WHERE id = %s AND account_id = %s
         """
-        params = (date, amount, trans_type, category_id, description, transaction_id)
-        return self.execute_query(query, params)
+        params = (date, amount, trans_type, category_id, description, transaction_id, self.account_id)
+        try:
+            with self.transaction():
+                old = self._lock_transaction_row(transaction_id)
+                if old is None:
+                    return None
+                result = self.execute_query(query, params)
+                self._adjust_rollup(old['transaction_date'], old['category_id'], old['type'], -old['amount'], -1)
+                self._adjust_rollup(date, category_id, trans_type, amount, 1)
+                self._emit(TransactionUpdated(self._transaction_row(transaction_id, date, amount, trans_type, category_id, description), self._stored_row(old)))
+            return result
+        except DATABASE_ERRORS as e:
+            print(f"Query failed: {e}")
+            return None
 
     def delete_transaction(self, transaction_id):
         """Deletes a transaction by its ID."""
@@ -151,110 +704,260 @@ class DBManager:
             # For now, we alert the user that manual adjustment of goals might be needed
             pass # In a real app, you might reverse the goal contribution here.
 
-        query = "DELETE FROM transactions WHERE id = %s"
-        return self.execute_query(query, (transaction_id,))
+        query = "DELETE FROM transactions WHERE id = %s AND account_id = %s"
+        try:
+            with self.transaction():
+                old = self._lock_transaction_row(transaction_id)
+                if old is None:
+                    return None
+                result = self.execute_query(query, (transaction_id, self.account_id))
+                self._adjust_rollup(old['transaction_date'], old['category_id'], old['type'], -old['amount'], -1)
+                self._emit(TransactionDeleted(self._stored_row(old)))
+            return result
+        except DATABASE_ERRORS as e:
+            print(f"Query failed: {e}")
+            return None
+
+    def rebuild_rollups(self):
+        """Recomputes monthly_rollups from the raw transactions."""
+        with self.transaction():
+            with self.cursor() as cursor:
+                rollups.rebuild(cursor, self.backend)
+
+    def verify_rollups(self):
+        """Returns the rollup keys that disagree with the raw transactions (empty when consistent)."""
+        with self.cursor() as cursor:
+            return rollups.verify(cursor, self.backend)
+
+    def get_category_map(self):
+        """Returns a {name: id} dict of every category."""
+        return self.category_cache.name_to_id()
 
     def get_categories(self):
         """Fetches all category names."""
-        query = "SELECT name FROM categories ORDER BY name ASC"
-        results = self.execute_query(query, fetch=True)
-        return [row['name'] for row in results] if results else []
+        return self.category_cache.names()
 
     def get_summary(self):
         """Calculates total income, expenses, and current balance."""
-        query_income = "SELECT SUM(amount) as total FROM transactions WHERE type = 'income'"
-        query_expense = "SELECT SUM(amount) as total FROM transactions WHERE type = 'expense'"
-        
-        total_income_result = self.execute_query(query_income, fetch=True)
-        total_expense_result = self.execute_query(query_expense, fetch=True)
-
-        total_income = total_income_result[0]['total'] or 0
-        total_expense = total_expense_result[0]['total'] or 0
-        balance = total_income - total_expense
+        store = self._local_store()
+        if store:
+            return store.summary()
+        query = """
+        SELECT
+            SUM(CASE WHEN type = 'income' THEN total ELSE 0 END) AS total_income,
+            SUM(CASE WHEN type = 'expense' THEN total ELSE 0 END) AS total_expense
+        FROM monthly_rollups
+        WHERE account_id = %s
+        """
+        result = self.execute_query(query, (self.account_id,), fetch=True)
+        return self._summary(*((result[0]['total_income'], result[0]['total_expense']) if result else (0, 0)))
 
+    @staticmethod
+    def _summary(total_income, total_expense):
+        total_income = total_income or 0
+        total_expense = total_expense or 0
         return {
             "total_income": total_income,
             "total_expense": total_expense,
-            "balance": balance
+            "balance": total_income - total_expense
         }
 
+    def get_dashboard_snapshot(self, recent=15):
+        """Returns a DashboardSnapshot with the summary, category names, the `recent` newest
+        transactions and spending by category, read in a single round trip.
+
+        The four queries run as one UNION ALL statement whose `section` column says which part
+        each row belongs to. With in_memory, only the category names need the database.
+        """
+        store = self._local_store()
+        if store:
+            totals = sorted(store.spending_by_category().items(), key=lambda item: item[1], reverse=True)
+            spending = [{'category': self.category_cache.name_for(category_id), 'total': rollups.from_cents(cents)}
+                        for category_id, cents in totals if cents > 0]
+            return DashboardSnapshot(store.summary(), self.get_categories(), store.search(limit=recent), spending)
+        # The transactions branch comes first: SQLite takes the result's column types from it
+        query = """
+        SELECT 'transaction' AS section, recent.* FROM (
+            SELECT t.id, t.transaction_date, t.amount, t.type, c.name AS name, t.description
+            FROM transactions t
+            LEFT JOIN categories c ON t.category_id = c.id
+            WHERE t.account_id = %s
+            ORDER BY t.transaction_date DESC, t.id DESC
+            LIMIT %s
+        ) recent
+        UNION ALL
+        SELECT 'summary', NULL, NULL, SUM(total), type, NULL, NULL
+        FROM monthly_rollups
+        WHERE account_id = %s
+        GROUP BY type
+        UNION ALL
+        SELECT 'spending', NULL, NULL, SUM(r.total), NULL, c.name, NULL
+        FROM monthly_rollups r
+        JOIN categories c ON r.category_id = c.id
+        WHERE r.account_id = %s AND r.type = 'expense'
+        GROUP BY c.name
+        HAVING SUM(r.total) > 0
+        UNION ALL
+        SELECT 'category', id, NULL, NULL, NULL, name, NULL
+        FROM categories
+        """
+        rows = self.execute_query(query, (self.account_id, recent, self.account_id, self.account_id), fetch=True)
+        if rows is None:
+            return None
+        totals = {}
+        categories = []
+        transactions = []
+        spending = []
+        for row in rows:
+            section = row['section']
+            if section == 'transaction':
+                transactions.append({'id': row['id'], 'transaction_date': row['transaction_date'], 'amount': row['amount'],
+                                     'type': row['type'], 'category': row['name'], 'description': row['description']})
+            elif section == 'summary':
+                totals[row['type']] = row['amount']
+            elif section == 'spending':
+                spending.append({'category': row['name'], 'total': row['amount']})
+            else:
+                categories.append({'id': row['id'], 'name': row['name']})
+        self.category_cache.prime(categories)
+        transactions.sort(key=lambda trans: (trans['transaction_date'], trans['id']), reverse=True)
+        spending.sort(key=lambda item: item['total'], reverse=True)
+        summary = self._summary(totals.get('income'), totals.get('expense'))
+        return DashboardSnapshot(summary, sorted((category['name'] for category in categories), key=str.lower), transactions, spending)
+
     def get_spending_by_category(self):
         """Calculates total spending for each category."""
+        store = self._local_store()
+        if store:
+            totals = sorted(store.spending_by_category().items(), key=lambda item: item[1], reverse=True)
+            return [{'category': self.category_cache.name_for(category_id), 'total': rollups.from_cents(cents)}
+                    for category_id, cents in totals if cents > 0]
         query = """
-        SELECT c.name as category, SUM(t.amount) as total
-        FROM transactions t
-        JOIN categories c ON t.category_id = c.id
-        WHERE t.type = 'expense'
+        SELECT c.name as category, SUM(r.total) as total
+        FROM monthly_rollups r
+        JOIN categories c ON r.category_id = c.id
+        WHERE r.account_id = %s AND r.type = 'expense'
         GROUP BY c.name
-        HAVING total > 0
+        HAVING SUM(r.total) > 0
         ORDER BY total DESC
         """
-        return self.execute_query(query, fetch=True)
+        return self.execute_query(query, (self.account_id,), fetch=True)
 
     def set_budget(self, category_name, amount, month, year):
-        """Sets or updates the budget for a given category, month, and year."""
-        category_id = self.get_category_id_by_name(category_name)
+        """Sets or updates the budget for a given category, month, and year; category_name may also be a category ID."""
+        category_id = self._resolve_category_id(category_name)
         if not category_id:
             return None
         
-        query = """
-        INSERT INTO budgets (category_id, amount, month, year)
-        VALUES (%s, %s, %s, %s)
-        ON DUPLICATE KEY UPDATE amount = VALUES(amount)
-        """
-        params = (category_id, amount, month, year)
-        return self.execute_query(query, params)
+        query = self.backend.upsert("budgets", ["account_id", "category_id", "amount", "month", "year"], ["account_id", "category_id", "month", "year"], replace=["amount"])
+        params = (self.account_id, category_id, amount, month, year)
+        result = self.execute_query(query, params)
+        if result is not None:
+            self._emit(BudgetSet(self.category_cache.name_for(category_id), month, year, as_money(amount)))
+        return result
 
     def get_budgets_for_month(self, month, year):
         """Retrieves each category's budget and actual spending for a given month."""
+        store = self._local_store()
+        if store:
+            query = """
+            SELECT c.id, c.name AS category, COALESCE(b.amount, 0) AS budget_amount
+            FROM categories c
+            LEFT JOIN budgets b ON c.id = b.category_id AND b.account_id = %s AND b.month = %s AND b.year = %s
+            WHERE c.name NOT IN ('Parental Allowance', 'Savings')
+            ORDER BY c.name
+            """
+            rows = self.execute_query(query, (self.account_id, month, year), fetch=True)
+            if rows is None:
+                return None
+            spent = store.spending_by_category(month_start(year, month), month_start(year, month + 1) - datetime.timedelta(days=1))
+            return [{'category': row['category'], 'budget_amount': row['budget_amount'], 'spent_amount': rollups.from_cents(spent.get(row['id'], 0))}
+                    for row in rows]
         query = """
         SELECT 
             c.name AS category,
             COALESCE(b.amount, 0) AS budget_amount,
             COALESCE(spent.total_spent, 0) AS spent_amount
         FROM categories c
-        LEFT JOIN budgets b ON c.id = b.category_id AND b.month = %s AND b.year = %s
+        LEFT JOIN budgets b ON c.id = b.category_id AND b.account_id = %s AND b.month = %s AND b.year = %s
         LEFT JOIN (
-            SELECT category_id, SUM(amount) AS total_spent
-            FROM transactions
-            WHERE type = 'expense' AND MONTH(transaction_date) = %s AND YEAR(transaction_date) = %s
-            GROUP BY category_id
+            SELECT category_id, total AS total_spent
+            FROM monthly_rollups
+            WHERE account_id = %s AND type = 'expense' AND year = %s AND month = %s
         ) AS spent ON c.id = spent.category_id
         WHERE c.name NOT IN ('Parental Allowance', 'Savings') -- Exclude income categories
         ORDER BY c.name;
         """
-        params = (month, year, month, year)
+        params = (self.account_id, month, year, self.account_id, year, month)
         return self.execute_query(query, params, fetch=True)
 
+    def get_budget_totals(self, first=None, last=None):
+        """Every budget from (year, month) first to last inclusive (all of them by default) with what was spent against it."""
+        query = """
+        SELECT b.year, b.month, c.name AS category, b.amount AS budget_amount, COALESCE(r.total, 0) AS spent_amount
+        FROM budgets b
+        JOIN categories c ON c.id = b.category_id
+        LEFT JOIN monthly_rollups r ON r.account_id = b.account_id AND r.year = b.year AND r.month = b.month
+                                   AND r.category_id = b.category_id AND r.type = 'expense'
+        WHERE b.account_id = %s
+        """
+        params = [self.account_id]
+        if first is not None:
+            query += " AND b.year * 12 + b.month BETWEEN %s AND %s"
+            params += [first[0] * 12 + first[1], last[0] * 12 + last[1]]
+        return self.execute_query(query + " ORDER BY b.year, b.month, c.name", tuple(params), fetch=True)
+
     def add_savings_goal(self, name, target_amount):
         """Adds a new savings goal."""
-        query = "INSERT INTO savings_goals (name, target_amount) VALUES (%s, %s)"
-        return self.execute_query(query, (name, target_amount))
+        query = "INSERT INTO savings_goals (name, target_amount, account_id) VALUES (%s, %s, %s)"
+        goal_id = self.execute_query(query, (name, target_amount, self.account_id))
+        if goal_id is not None:
+            self._emit(GoalAdded(goal_id, name, as_money(target_amount)))
+        return goal_id
 
     def get_savings_goals(self):
         """Retrieves all savings goals."""
-        query = "SELECT * FROM savings_goals ORDER BY name"
-        return self.execute_query(query, fetch=True)
+        query = "SELECT * FROM savings_goals WHERE account_id = %s ORDER BY name"
+        return self.execute_query(query, (self.account_id,), fetch=True)
 
     def add_to_savings_goal(self, goal_id, goal_name, amount):
-        """Adds funds to a savings goal and creates a corresponding transaction."""
-        # First, create the expense transaction
-        self.add_transaction(amount, 'expense', 'Savings', f"Contribution to {goal_name}")
-        
-        # Second, update the goal's current amount
-        query = "UPDATE savings_goals SET current_amount = current_amount + %s WHERE id = %s"
-        return self.execute_query(query, (amount, goal_id))
+        """Adds funds to a savings goal and creates a corresponding transaction, both or neither."""
+        query = "UPDATE savings_goals SET current_amount = current_amount + %s WHERE id = %s AND account_id = %s"
+        try:
+            with self.transaction():
+                goal = self.execute_query("SELECT id FROM savings_goals WHERE id = %s AND account_id = %s" + self.backend.for_update, (goal_id, self.account_id), fetch=True)
+                if not goal:
+                    return None
+                # First, create the expense transaction
+                if self.add_transaction(amount, 'expense', 'Savings', f"Contribution to {goal_name}") is None:
+                    return None
+                # Second, update the goal's current amount
+                result = self.execute_query(query, (amount, goal_id, self.account_id))
+                self._emit(GoalFunded(goal_id, as_money(amount)))
+                return result
+        except DATABASE_ERRORS as e:
+            print(f"Query failed: {e}")
+            return None
 
     def close(self):
-        """Close the database connection."""
-        if self.conn:
-            self.conn.close()
+        """Close the database connection pool."""
+        if self._shared:
+            # A for_account() view: the pool and write queue belong to the DBManager it came from
+            if self.store is not None:
+                self.store.close()
+            return
+        self.writes.close()
+        for tenant in self._accounts.values():
+            if tenant.store is not None:
+                tenant.store.close()
+        if self.pool:
+            self.pool.close()
             print("Database connection closed.")
 
 # Example of how to use it (for testing)
 if __name__ == '__main__':
     db = DBManager()
-    if db.conn:
+    if db.pool:
         # Add a test transaction
         # db.add_transaction(1000, 'income', 'Parental Allowance', 'Monthly allowance')
         # db.add_transaction(50, 'expense', 'Canteen/Food', 'Lunch')
@@ -0,0 +1,91 @@
+import csv
+import os
+
+# Rows flow from a DBManager stream_* generator straight into the file writer, a batch at a
+# time, so memory use depends on the batch size and never on how many rows are exported.
+
+TRANSACTION_FIELDS = ['id', 'transaction_date', 'amount', 'type', 'category', 'description']
+SUMMARY_FIELDS = ['year', 'month', 'total_income', 'total_expense']
+FORMATS = {'.csv': 'csv', '.parquet': 'parquet', '.arrow': 'arrow', '.feather': 'arrow'}
+BATCH_SIZE = 10000
+
+
+def export_format(path, fmt=None):
+    if fmt:
+        return fmt
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Unsupported export file type: {extension or path}")
+    return FORMATS[extension]
+
+
+def write_csv(rows, path, fields):
+    """Writes rows (dicts) to a CSV file and returns how many were written."""
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as stream:
+        writer = csv.DictWriter(stream, fieldnames=fields, extrasaction='ignore')
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def arrow_schema(fields):
+    import pyarrow as pa
+    types = {
+        'id': pa.int64(),
+        'transaction_date': pa.date32(),
+        'amount': pa.decimal128(12, 2),
+        'type': pa.string(),
+        'category': pa.string(),
+        'description': pa.string(),
+        'year': pa.int16(),
+        'month': pa.int8(),
+        'total_income': pa.decimal128(14, 2),
+        'total_expense': pa.decimal128(14, 2),
+    }
+    return pa.schema([(name, types[name]) for name in fields])
+
+
+def write_columnar(rows, path, fields, fmt, batch_size=BATCH_SIZE):
+    """Writes rows to a Parquet or Arrow IPC file in record batches and returns how many were written."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet and Arrow export need the 'pyarrow' package (pip install pyarrow).")
+    schema = arrow_schema(fields)
+    writer = pq.ParquetWriter(path, schema) if fmt == 'parquet' else pa.ipc.new_file(path, schema)
+    count = 0
+    columns = {name: [] for name in fields}
+    try:
+        for row in rows:
+            for name in fields:
+                columns[name].append(row[name])
+            count += 1
+            if count % batch_size == 0:
+                writer.write_batch(pa.RecordBatch.from_pydict(columns, schema=schema))
+                columns = {name: [] for name in fields}
+        if count % batch_size:
+            writer.write_batch(pa.RecordBatch.from_pydict(columns, schema=schema))
+    finally:
+        writer.close()
+    return count
+
+
+def write_rows(rows, path, fields, fmt=None):
+    fmt = export_format(path, fmt)
+    if fmt == 'csv':
+        return write_csv(rows, path, fields)
+    return write_columnar(rows, path, fields, fmt)
+
+
+def export_transactions(db, path, fmt=None, **filters):
+    """Exports the transactions matching the search_transactions filters; returns the row count."""
+    return write_rows(db.stream_transactions(**filters), path, TRANSACTION_FIELDS, fmt)
+
+
+def export_monthly_summaries(db, path, fmt=None):
+    """Exports income and expense totals for every month; returns the row count."""
+    return write_rows(db.stream_monthly_summaries(), path, SUMMARY_FIELDS, fmt)
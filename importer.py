@@ -0,0 +1,136 @@
+import csv
+import datetime
+import itertools
+import os
+import re
+from collections import Counter
+from decimal import Decimal, InvalidOperation
+
+CHUNK_SIZE = 5000
+
+CSV_DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%d.%m.%Y')
+OFX_FIELD = re.compile(r'<(\w+)>([^<\r\n]*)')
+
+
+class StatementFormatError(ValueError):
+    """Raised for a statement file that cannot be read at all (as opposed to one bad row)."""
+
+
+def parse_date(value):
+    value = value.strip()
+    for fmt in CSV_DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, fmt).date()
+        except ValueError:
+            pass
+    raise ValueError(f"Unrecognised date: {value!r}")
+
+
+def read_csv(stream):
+    """Yields one raw dict per CSV row, with lower-cased column names."""
+    reader = csv.DictReader(stream)
+    if not reader.fieldnames or not {'date', 'amount'} <= {name.strip().lower() for name in reader.fieldnames}:
+        raise StatementFormatError("CSV files need at least 'date' and 'amount' columns.")
+    for row in reader:
+        yield {(key or '').strip().lower(): (value or '').strip() for key, value in row.items()}
+
+
+def read_ofx(stream):
+    """Yields one raw dict per <STMTTRN> block of an OFX/QFX statement, reading line by line."""
+    block = None
+    for line in stream:
+        if '<STMTTRN>' in line.upper():
+            block = {}
+        if block is not None:
+            for tag, value in OFX_FIELD.findall(line):
+                block[tag.upper()] = value.strip()
+        if '</STMTTRN>' in line.upper() and block is not None:
+            amount = block.get('TRNAMT', '')
+            yield {
+                'date': block.get('DTPOSTED', '')[:8],
+                'amount': amount,
+                'type': '',
+                'category': '',
+                'description': block.get('MEMO') or block.get('NAME', ''),
+            }
+            block = None
+
+
+def normalize(raw, category_ids, default_category_id):
+    """Turns a raw statement row into (date, amount, type, category_id, description)."""
+    date_str = raw.get('date', '')
+    date = datetime.datetime.strptime(date_str, '%Y%m%d').date() if date_str.isdigit() else parse_date(date_str)
+    try:
+        amount = Decimal(raw.get('amount', '').replace(',', ''))
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {raw.get('amount')!r}")
+    trans_type = raw.get('type', '').lower()
+    if trans_type not in ('income', 'expense'):
+        # Bank exports sign the amount instead: money in is positive, money out negative
+        trans_type = 'income' if amount > 0 else 'expense'
+    category_id = category_ids.get(raw.get('category', ''), default_category_id)
+    description = raw.get('description', '')[:255]
+    return date, abs(amount).quantize(Decimal('0.01')), trans_type, category_id, description
+
+
+class StatementImporter:
+    def __init__(self, db, chunk_size=CHUNK_SIZE, default_category='Other', on_progress=None):
+        """Streams a CSV or OFX statement into the database one chunk at a time.
+
+        Each chunk is inserted with a single executemany inside one transaction. Rows whose
+        (date, amount, description) already exist in the database are skipped, so importing
+        the same statement twice adds nothing the second time.
+        """
+        self.db = db
+        self.chunk_size = chunk_size
+        self.default_category = default_category
+        self.on_progress = on_progress
+
+    def read_rows(self, stream, path):
+        extension = os.path.splitext(path)[1].lower()
+        return read_ofx(stream) if extension in ('.ofx', '.qfx') else read_csv(stream)
+
+    def run(self, path):
+        """Imports the file at path and returns counts of rows read, inserted, duplicate and skipped."""
+        category_ids = self.db.get_category_map()
+        default_category_id = category_ids.get(self.default_category)
+        counts = {'read': 0, 'inserted': 0, 'duplicates': 0, 'skipped': 0}
+        # Only rows that existed before the import count as duplicates, and each one
+        # matches at most one statement row, so repeated identical lines still import
+        last_existing_id = self.db.get_max_transaction_id()
+        consumed = Counter()
+        with open(path, newline='', encoding='utf-8-sig') as stream:
+            raw_rows = self.read_rows(stream, path)
+            while True:
+                chunk = list(itertools.islice(raw_rows, self.chunk_size))
+                if not chunk:
+                    break
+                counts['read'] += len(chunk)
+                rows = []
+                for raw in chunk:
+                    try:
+                        rows.append(normalize(raw, category_ids, default_category_id))
+                    except ValueError:
+                        counts['skipped'] += 1
+                new_rows = self.drop_duplicates(rows, last_existing_id, consumed)
+                counts['duplicates'] += len(rows) - len(new_rows)
+                if new_rows:
+                    self.db.add_transactions_bulk(new_rows)
+                    counts['inserted'] += len(new_rows)
+                if self.on_progress:
+                    self.on_progress(counts['read'], counts['inserted'], counts['duplicates'])
+        return counts
+
+    def drop_duplicates(self, rows, last_existing_id, consumed):
+        if not rows:
+            return rows
+        dates = [row[0] for row in rows]
+        existing = self.db.count_transaction_keys(min(dates), max(dates), last_existing_id)
+        new_rows = []
+        for row in rows:
+            key = (row[0], row[1], row[4])
+            if existing[key] > consumed[key]:
+                consumed[key] += 1
+            else:
+                new_rows.append(row)
+        return new_rows
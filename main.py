@@ -1,7 +1,37 @@
+import os
+import sys
+import time
+
+# Taken before the heavy imports below, so --startup-time covers the whole cold start
+STARTED = time.perf_counter()
+
 from main_app import App
 from db_manager import DBManager
+from warm_start import SnapshotFile
+
+# Where the data lives. BMS_BACKEND=sqlite runs against a local file instead of a MySQL server;
+# BMS_IN_MEMORY=1 answers searches, summaries and budgets from an in-memory copy of the ledger;
+# BMS_ACCOUNT_ID picks whose ledger the app shows.
+DATABASE_CONFIG = {
+    "backend": os.environ.get("BMS_BACKEND", "mysql"),
+    "path": os.environ.get("BMS_SQLITE_PATH", "bms.sqlite3"),
+    "in_memory": os.environ.get("BMS_IN_MEMORY") == "1",
+    "account_id": int(os.environ.get("BMS_ACCOUNT_ID", "1")),
+}
+# The dashboard saved at exit and shown straight away at the next start; BMS_SNAPSHOT_PATH= (empty) turns it off
+SNAPSHOT_PATH = os.environ.get("BMS_SNAPSHOT_PATH", "bms_snapshot.json")
+
+
+def elapsed_ms():
+    return (time.perf_counter() - STARTED) * 1000
+
 
 if __name__ == "__main__":
+    # python main.py --startup-time opens the app, prints how long it took until the dashboard
+    # was first painted, and exits
+    measure_startup = "--startup-time" in sys.argv[1:]
+    imported_ms = elapsed_ms()
+
     # Set the appearance mode
     # Options: "System" (default), "Dark", "Light"
     import customtkinter
@@ -11,10 +41,18 @@ if __name__ == "__main__":
     db_manager = None
     try:
         # Initialize the database manager
-        db_manager = DBManager()
+        db_manager = DBManager(**DATABASE_CONFIG)
+        connected_ms = elapsed_ms()
         
         # Create and run the application
-        app = App(db_manager=db_manager)
+        app = App(db_manager=db_manager, snapshot_file=SnapshotFile(SNAPSHOT_PATH) if SNAPSHOT_PATH else None)
+        if measure_startup:
+            window_ms = elapsed_ms()
+            def report_startup():
+                print(f"Imports: {imported_ms:.0f} ms, database: {connected_ms:.0f} ms, "
+                      f"window built: {window_ms:.0f} ms, first paint: {elapsed_ms():.0f} ms")
+                app.on_close()
+            app.when_painted(report_startup)
         app.mainloop()
 
     finally:
@@ -1,18 +1,62 @@
 import customtkinter as ctk
-import numpy as np
-from db_manager import DBManager
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from query_executor import QueryExecutor
+from virtual_list import VirtualTransactionList, PAGE_SIZE
 import datetime
-from tkinter import messagebox
+from tkinter import messagebox, filedialog
+from importer import StatementImporter
+from exporter import export_transactions
+from data_events import TransactionsImported, BudgetSet, GoalAdded, GoalFunded
+from budget_alerts import BudgetMonitor
+
+SEARCH_DEBOUNCE_MS = 300
+# The dashboard counts as painted once these parts are on screen; the pie chart follows
+FIRST_PAINT_PARTS = {"summary", "transactions"}
+RECENT_TRANSACTIONS = 15
+# Periods shown on the Reports page for each granularity
+REPORT_PERIODS = {"day": 30, "week": 26, "month": 12, "year": 5}
+# How often recurring transactions that have fallen due are posted while the app is open
+RECURRING_INTERVAL_MS = 60 * 60 * 1000
+REPEAT_OPTIONS = {"Once": None, "Weekly": "weekly", "Monthly": "monthly", "Yearly": "yearly"}
 
 class App(ctk.CTk):
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, snapshot_file=None):
+        """snapshot_file (a warm_start.SnapshotFile) shows the dashboard as it was at the last exit until fresh data arrives."""
         super().__init__()
         self.db = db_manager
-        self.chart_canvas = None
-        self.trends_canvas = None
+        self.snapshot_file = snapshot_file
         self.edit_window = None
+        self.diagnostics_window = None
+        self.search_after_id = None
+        self.last_search_params = {}
+        # Built with the footer, after the first queries have been started
+        self.loading_label = None
+        self.executor = QueryExecutor(self, on_busy_change=self.show_loading_indicator)
+        self.frames = {}
+        self.pie_chart = None
+        self.dashboard_painted = set()
+        self.on_first_paint = None
+        # What each view last drew, so data changes can be patched in without a query
+        self.summary = None
+        self.spending = None
+        self.analytics = None
+        self.budget_rows = {}
+        self.budget_period = None
+        self.goal_rows = {}
+        self.refresh_after_id = None
+        self.recurring_after_id = None
+        # get_data_version() of what the dashboard shows; None once it has been patched past any known version
+        self.data_version = None
+        # Writes may commit on other threads, so changes are applied on the UI thread
+        self.unsubscribe_events = self.db.events.subscribe(lambda event: self.executor.post(self.apply_data_change, event))
+        # Warns in the status bar as soon as a write takes a budget past 80% or 100%
+        self.budget_monitor = BudgetMonitor(self.db, on_alert=lambda alert: self.executor.post(self.show_budget_alert, alert))
+
+        # Start the dashboard query now so it runs while the window is being built; if the saved
+        # snapshot is still current it stops after the version check
+        warm = snapshot_file.load(self.db) if snapshot_file else None
+        self.update_dashboard(known_version=warm[0] if warm else None)
+        # Budgets are read before recurring transactions are posted, so those can raise alerts
+        self.run_query("budget_alerts", self.budget_monitor.load, lambda _: self.run_recurring())
 
         self.title("Budget Management System")
         self.geometry("1100x700")
@@ -34,6 +78,9 @@ class App(ctk.CTk):
         self.budgets_button.grid(row=4, column=0, padx=20, pady=10)
         self.savings_button = ctk.CTkButton(self.sidebar_frame, text="Savings", command=lambda: self.select_frame_by_name("savings"))
         self.savings_button.grid(row=5, column=0, padx=20, pady=10)
+        self.import_button = ctk.CTkButton(self.sidebar_frame, text="Import", fg_color="gray50", command=self.import_action)
+        self.import_button.grid(row=6, column=0, padx=20, pady=10)
+        ctk.CTkButton(self.sidebar_frame, text="Diagnostics", fg_color="transparent", border_width=1, command=self.open_diagnostics_window).grid(row=8, column=0, padx=20, pady=(10, 20))
 
         # --- Main Content --- #
         self.main_content_frame = ctk.CTkFrame(self, corner_radius=0, fg_color="transparent")
@@ -41,17 +88,7 @@ class App(ctk.CTk):
         self.main_content_frame.grid_rowconfigure(0, weight=1)
         self.main_content_frame.grid_columnconfigure(0, weight=1)
 
-        self.dashboard_frame = ctk.CTkFrame(self.main_content_frame, fg_color='transparent')
-        self.history_frame = ctk.CTkFrame(self.main_content_frame, fg_color='transparent')
-        self.reports_frame = ctk.CTkFrame(self.main_content_frame, fg_color='transparent')
-        self.budgets_frame = ctk.CTkFrame(self.main_content_frame, fg_color='transparent')
-        self.savings_frame = ctk.CTkFrame(self.main_content_frame, fg_color='transparent')
-        
-        self.setup_dashboard_ui()
-        self.setup_history_ui()
-        self.setup_reports_ui()
-        self.setup_budgets_ui()
-        self.setup_savings_ui()
+        # Page frames are built by get_frame() the first time they are shown
 
         # ---- Status and Copyright Bar ---
         footer_frame = ctk.CTkFrame(self, corner_radius=0, height=25)
@@ -61,47 +98,207 @@ class App(ctk.CTk):
         self.status_bar = ctk.CTkLabel(footer_frame, text="Welcome!", anchor="w", font=ctk.CTkFont(size=12))
         self.status_bar.grid(row=0, column=0, sticky="ew", padx=(10, 5))
 
+        self.loading_label = ctk.CTkLabel(footer_frame, text="", text_color="gray60", anchor="e", font=ctk.CTkFont(size=12))
+        self.loading_label.grid(row=0, column=1, sticky="e", padx=5)
+        self.show_loading_indicator(self.executor.busy)
+
         copyright_label = ctk.CTkLabel(footer_frame, text="© 2025, Hirwa Munyaneza Jean Leon", text_color="gray50", anchor="e", font=ctk.CTkFont(size=11))
-        copyright_label.grid(row=0, column=1, sticky="e", padx=(5, 10))
+        copyright_label.grid(row=0, column=2, sticky="e", padx=(5, 10))
 
-        # ---- Select initial frame ----
-        self.select_frame_by_name("dashboard")
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
 
-    def select_frame_by_name(self, name):
+        # ---- Select initial frame ----
+        self.select_frame_by_name("dashboard", refresh=False)  # Its data is already on the way
+        if warm and not self.dashboard_painted:
+            self.data_version = warm[0]
+            self.render_dashboard_parts(warm[1])
+
+    def on_close(self):
+        self.save_dashboard_snapshot()
+        self.unsubscribe_events()
+        if self.recurring_after_id is not None:
+            self.after_cancel(self.recurring_after_id)
+        self.budget_monitor.close()
+        if self.analytics is not None:
+            self.analytics.close()
+        self.executor.shutdown()
+        self.destroy()
+
+    def get_frame(self, name):
+        """Returns the page frame for name, building its widgets on first use."""
+        if name not in self.frames:
+            frame = ctk.CTkFrame(self.main_content_frame, fg_color='transparent')
+            setattr(self, f"{name}_frame", frame)
+            getattr(self, f"setup_{name}_ui")()
+            self.frames[name] = frame
+        return self.frames[name]
+
+    def select_frame_by_name(self, name, refresh=True):
         buttons = {"dashboard": self.dashboard_button, "history": self.history_button, "reports": self.reports_button, "budgets": self.budgets_button, "savings": self.savings_button}
         for btn_name, btn in buttons.items():
             btn.configure(fg_color="#1f6aa5" if name == btn_name else "transparent")
-        
-        for frame in [self.dashboard_frame, self.history_frame, self.reports_frame, self.budgets_frame, self.savings_frame]:
+
+        # Results still in flight for the frames being left are no longer wanted
+        for frame_name in buttons:
+            if frame_name != name:
+                self.executor.cancel(frame_name)
+
+        for frame in self.frames.values():
             frame.grid_forget()
+        self.get_frame(name).grid(row=0, column=0, sticky="nsew")
+        if not refresh:
+            return
 
         if name == "dashboard":
-            self.dashboard_frame.grid(row=0, column=0, sticky="nsew")
             self.update_dashboard()
         elif name == "history":
-            self.history_frame.grid(row=0, column=0, sticky="nsew")
+            self.load_search_categories()
             self.search_transactions_action()
         elif name == "reports":
-            self.reports_frame.grid(row=0, column=0, sticky="nsew")
-            self.update_trends_chart()
+            self.update_reports()
         elif name == "budgets":
-            self.budgets_frame.grid(row=0, column=0, sticky="nsew")
             self.update_budgets_view()
         elif name == "savings":
-            self.savings_frame.grid(row=0, column=0, sticky="nsew")
             self.update_savings_view()
 
     def show_status_message(self, message, is_error=False):
         self.status_bar.configure(text=message, text_color="#F44336" if is_error else "gray60")
 
+    def show_budget_alert(self, alert):
+        self.show_status_message(alert.message(), is_error=alert.over_budget)
+
+    def show_loading_indicator(self, busy):
+        if self.loading_label is None:
+            return  # The footer shows the current state once it is built
+        self.loading_label.configure(text="Loading..." if busy else "")
+
+    def run_query(self, view, func, on_done, key=None, on_dropped=None):
+        """Run a DBManager call for a view in the background and render its result on the UI thread.
+
+        on_dropped() is called instead of on_done if the query fails or is cancelled.
+        """
+        def on_error(error):
+            self.on_query_error(error)
+            if on_dropped:
+                on_dropped()
+        # Every query the call makes is counted towards one refresh of this view in the diagnostics
+        self.executor.submit(view, self.db.query_stats.scoped(view, func), on_done=on_done, on_error=on_error, on_cancel=on_dropped, key=key or view)
+
+    def on_query_error(self, error):
+        self.show_status_message(f"Error: Query failed ({error}).", is_error=True)
+
+    def run_write(self, func, *args, on_done=None):
+        """Commit a DBManager write through db.submit_write() on a worker and call on_done(result) on the UI thread.
+
+        The views are patched by the write's data-change events, like writes made anywhere else.
+        """
+        self.executor.submit("write", lambda: self.db.submit_write(func, *args).result(), on_done=on_done,
+                             on_error=lambda error: self.show_status_message(f"Error: Could not save the change ({error}).", is_error=True))
+
     def update_all_views(self):
         active_frame_name = self.get_active_frame_name()
         if active_frame_name == "dashboard": self.update_dashboard()
         if active_frame_name == "history": self.search_transactions_action()
-        if active_frame_name == "reports": self.update_trends_chart()
+        if active_frame_name == "reports": self.update_reports()
         if active_frame_name == "budgets": self.update_budgets_view()
         if active_frame_name == "savings": self.update_savings_view()
 
+    def apply_data_change(self, event):
+        """Patches the active view for one committed write instead of re-running its queries.
+
+        Views that are not on screen need nothing: they reload when they are next shown.
+        """
+        self.data_version = None
+        if isinstance(event, TransactionsImported):
+            # Imports commit a chunk at a time, so reload once when they pause
+            if self.refresh_after_id is not None:
+                self.after_cancel(self.refresh_after_id)
+            self.refresh_after_id = self.after(SEARCH_DEBOUNCE_MS, self.refresh_active_view)
+            return
+        name = self.get_active_frame_name()
+        if name in self.frames:
+            getattr(self, f"patch_{name}")(event)
+
+    def refresh_active_view(self):
+        self.refresh_after_id = None
+        self.update_all_views()
+
+    def import_action(self):
+        path = filedialog.askopenfilename(title="Import Statement", filetypes=[("Bank statements", "*.csv *.ofx *.qfx"), ("All files", "*.*")])
+        if not path:
+            return
+        def report(read, inserted, duplicates):
+            # Called on the import thread, so hand the message to the UI thread
+            self.executor.post(self.show_status_message, f"Importing... {read:,} rows read, {inserted:,} added.")
+        importer = StatementImporter(self.db, on_progress=report)
+        self.import_button.configure(state="disabled")
+        self.executor.submit("import", importer.run, path, on_done=self.on_import_done, on_error=self.on_import_error)
+
+    def on_import_done(self, counts):
+        self.import_button.configure(state="normal")
+        self.show_status_message(f"Import complete: {counts['inserted']:,} added, {counts['duplicates']:,} duplicates skipped.")
+        if counts['inserted']:
+            # Imported rows are not followed one by one, so check every budget again
+            self.run_query("budget_alerts", self.budget_monitor.reevaluate, self.on_budgets_reevaluated)
+
+    def run_recurring(self):
+        """Posts the recurring transactions that have fallen due, now and every RECURRING_INTERVAL_MS."""
+        if self.recurring_after_id is not None:
+            self.after_cancel(self.recurring_after_id)
+        self.recurring_after_id = self.after(RECURRING_INTERVAL_MS, self.run_recurring)
+        self.run_query("recurring", self.db.post_recurring_transactions, self.on_recurring_posted)
+
+    def on_recurring_posted(self, count):
+        if count:
+            self.show_status_message(f"{count:,} recurring transaction(s) posted.")
+            self.run_query("budget_alerts", self.budget_monitor.reevaluate, self.on_budgets_reevaluated)
+
+    def on_budgets_reevaluated(self, alerts):
+        # Each alert has already been shown; sum them up when there were several
+        if len(alerts) > 1:
+            over = sum(1 for alert in alerts if alert.over_budget)
+            self.show_status_message(f"{len(alerts)} budgets passed an alert threshold after the import ({over} over budget).", is_error=over > 0)
+
+    def on_import_error(self, error):
+        self.import_button.configure(state="normal")
+        self.show_status_message(f"Error: Import failed ({error}).", is_error=True)
+
+    def open_diagnostics_window(self):
+        if self.diagnostics_window is not None and self.diagnostics_window.winfo_exists():
+            self.diagnostics_window.focus()
+            return
+        self.diagnostics_window = ctk.CTkToplevel(self)
+        self.diagnostics_window.title("Query Diagnostics")
+        self.diagnostics_window.geometry("900x500")
+        self.diagnostics_window.grid_columnconfigure((0, 1, 2), weight=1)
+        self.diagnostics_window.grid_rowconfigure(0, weight=1)
+        textbox = ctk.CTkTextbox(self.diagnostics_window, font=ctk.CTkFont(family="Courier", size=12), wrap="none")
+        textbox.grid(row=0, column=0, columnspan=3, sticky="nsew", padx=10, pady=10)
+        ctk.CTkButton(self.diagnostics_window, text="Refresh", command=lambda: self.render_diagnostics(textbox)).grid(row=1, column=0, padx=10, pady=(0, 10))
+        ctk.CTkButton(self.diagnostics_window, text="Reset", fg_color="gray50", command=lambda: (self.db.query_stats.reset(), self.render_diagnostics(textbox))).grid(row=1, column=1, padx=10, pady=(0, 10))
+        ctk.CTkButton(self.diagnostics_window, text="Save JSON", fg_color="gray50", command=self.dump_diagnostics_action).grid(row=1, column=2, padx=10, pady=(0, 10))
+        self.render_diagnostics(textbox)
+
+    def render_diagnostics(self, textbox):
+        snapshot = self.db.query_stats.snapshot()
+        lines = ["VIEW REFRESHES", f"{'view':<12}{'refreshes':>10}{'queries/refresh':>17}{'query ms/refresh':>18}{'last ms':>10}"]
+        for view, totals in sorted(snapshot["refreshes"].items()):
+            refreshes = totals["refreshes"]
+            lines.append(f"{view:<12}{refreshes:>10}{totals['queries'] / refreshes:>17.1f}{totals['query_ms'] / refreshes:>18.1f}{totals['last']['wall_ms']:>10.1f}")
+        lines += ["", "QUERIES BY TOTAL TIME", f"{'calls':>7}{'total ms':>11}{'max ms':>9}{'rows':>10}{'bytes':>12}  sql"]
+        for stats in snapshot["queries"]:
+            lines.append(f"{stats['calls']:>7}{stats['total_ms']:>11.1f}{stats['max_ms']:>9.1f}{stats['rows']:>10}{stats['bytes']:>12}  {stats['sql']}")
+        textbox.configure(state="normal")
+        textbox.delete("1.0", "end")
+        textbox.insert("1.0", "\n".join(lines))
+        textbox.configure(state="disabled")
+
+    def dump_diagnostics_action(self):
+        path = filedialog.asksaveasfilename(title="Save Query Statistics", defaultextension=".json", filetypes=[("JSON", "*.json")])
+        if path:
+            self.db.query_stats.dump_json(path)
+            self.show_status_message(f"Query statistics saved to {path}.")
+
     def get_active_frame_name(self):
         buttons = {"dashboard": self.dashboard_button, "history": self.history_button, "reports": self.reports_button, "budgets": self.budgets_button, "savings": self.savings_button}
         for name, button in buttons.items():
@@ -131,8 +328,11 @@ class App(ctk.CTk):
         self.desc_entry.grid(row=0, column=1, padx=5, pady=10, sticky="ew")
         self.category_combobox = ctk.CTkComboBox(actions_frame, values=[])
         self.category_combobox.grid(row=0, column=2, padx=5, pady=10, sticky="ew")
-        ctk.CTkButton(actions_frame, text="Add Income", command=self.add_income_action).grid(row=0, column=3, padx=5, pady=10)
-        ctk.CTkButton(actions_frame, text="Add Expense", command=self.add_expense_action).grid(row=0, column=4, padx=(5, 10), pady=10)
+        self.repeat_combobox = ctk.CTkComboBox(actions_frame, values=list(REPEAT_OPTIONS), width=100, state="readonly")
+        self.repeat_combobox.set("Once")
+        self.repeat_combobox.grid(row=0, column=3, padx=5, pady=10)
+        ctk.CTkButton(actions_frame, text="Add Income", command=self.add_income_action).grid(row=0, column=4, padx=5, pady=10)
+        ctk.CTkButton(actions_frame, text="Add Expense", command=self.add_expense_action).grid(row=0, column=5, padx=(5, 10), pady=10)
         bottom_frame = ctk.CTkFrame(self.dashboard_frame, fg_color="transparent")
         bottom_frame.grid(row=2, column=0, sticky="nsew", padx=10, pady=10)
         bottom_frame.grid_columnconfigure(0, weight=1)
@@ -140,7 +340,7 @@ class App(ctk.CTk):
         bottom_frame.grid_rowconfigure(0, weight=1)
         self.chart_frame = ctk.CTkFrame(bottom_frame)
         self.chart_frame.grid(row=0, column=0, sticky="nsew", padx=(0, 5))
-        self.transactions_frame = ctk.CTkScrollableFrame(bottom_frame, label_text="Recent Transactions")
+        self.transactions_frame = VirtualTransactionList(bottom_frame, label_text="Recent Transactions", on_edit=self.open_edit_window, on_delete=self.delete_transaction_action)
         self.transactions_frame.grid(row=0, column=1, sticky="nsew", padx=(5, 0))
 
     def add_income_action(self):
@@ -161,54 +361,150 @@ class App(ctk.CTk):
         except ValueError:
             self.show_status_message("Error: Amount must be a number.", is_error=True)
             return
-        self.db.add_transaction(amount, trans_type, category, description)
+        frequency = REPEAT_OPTIONS[self.repeat_combobox.get()]
+        on_done = lambda new_id: self.on_transaction_added(new_id, trans_type, amount, frequency)
+        if frequency:
+            self.run_write(self.db.add_recurring_rule, amount, trans_type, category, description, frequency, on_done=on_done)
+        else:
+            self.run_write(self.db.add_transaction, amount, trans_type, category, description, on_done=on_done)
+
+    def on_transaction_added(self, new_id, trans_type, amount, frequency):
+        if new_id is None:
+            kind = "recurring transaction" if frequency else "transaction"
+            self.show_status_message(f"Error: Could not save the {kind}.", is_error=True)
+            return
+        if frequency:
+            # The scheduler posts today's occurrence along with any other that is due
+            self.run_recurring()
         self.amount_entry.delete(0, "end")
         self.desc_entry.delete(0, "end")
         self.category_combobox.set("")
-        self.update_all_views()
-        self.show_status_message(f"{trans_type.capitalize()} of {amount:,.0f} RWF added.")
-
-    def update_dashboard(self):
-        summary = self.db.get_summary()
-        self.balance_label.configure(text=f"BALANCE\n{summary['balance']:,.0f} RWF")
-        self.income_label.configure(text=f"INCOME\n{summary['total_income']:,.0f} RWF")
-        self.expense_label.configure(text=f"EXPENSE\n{summary['total_expense']:,.0f} RWF")
-        self.category_combobox.configure(values=self.db.get_categories())
-        self.update_transactions_list(self.transactions_frame, lambda: self.db.get_transactions(limit=15))
-        self.update_pie_chart()
-
-    def update_transactions_list(self, frame, get_trans_func):
-        for widget in frame.winfo_children():
-            widget.destroy()
-        transactions = get_trans_func()
-        if not transactions:
-            ctk.CTkLabel(frame, text="No transactions found.").pack(pady=10)
+        self.repeat_combobox.set("Once")
+        if frequency:
+            self.show_status_message(f"{frequency.capitalize()} {trans_type} of {amount:,.0f} RWF scheduled.")
         else:
-            for trans in transactions:
-                trans_id = trans['id']
-                trans_frame = ctk.CTkFrame(frame)
-                trans_frame.pack(fill="x", padx=5, pady=5)
-                trans_frame.grid_columnconfigure(1, weight=1)
-                ctk.CTkLabel(trans_frame, text=trans['transaction_date'].strftime("%Y-%m-%d"), width=80).grid(row=0, column=0, padx=5, pady=5, sticky="w")
-                ctk.CTkLabel(trans_frame, text=trans['description'], anchor="w").grid(row=0, column=1, padx=5, pady=5, sticky="w")
-                ctk.CTkLabel(trans_frame, text=trans['category'], anchor="w", text_color="gray60").grid(row=0, column=2, padx=5, pady=5, sticky="w")
-                amount_text = f"{trans['amount']:,.0f} RWF"
-                amount_color = "#4CAF50" if trans['type'] == 'income' else "#F44336"
-                ctk.CTkLabel(trans_frame, text=amount_text, text_color=amount_color, font=ctk.CTkFont(weight="bold"), width=100, anchor="e").grid(row=0, column=3, padx=5, pady=5, sticky="e")
-                ctk.CTkButton(trans_frame, text="Edit", width=40, command=lambda t_id=trans_id: self.open_edit_window(t_id)).grid(row=0, column=4, padx=5)
-                ctk.CTkButton(trans_frame, text="Del", width=40, command=lambda t_id=trans_id: self.delete_transaction_action(t_id)).grid(row=0, column=5, padx=(0,5))
+            self.show_status_message(f"{trans_type.capitalize()} of {amount:,.0f} RWF added.")
+
+    def update_dashboard(self, known_version=None):
+        # One round trip for every part (see DBManager.get_dashboard_snapshot)
+        self.run_query("dashboard", lambda: self.fetch_dashboard_data(known_version), self.render_dashboard)
+
+    def fetch_dashboard_data(self, known_version=None):
+        """(data version, dashboard parts), or None if the data is still at known_version."""
+        # Runs on a worker thread: only DBManager calls here, no widgets. The version is read
+        # first, so a write landing in between can only make the data look older than it is.
+        version = self.db.get_data_version()
+        if known_version is not None and version == known_version:
+            return None
+        snapshot = self.db.get_dashboard_snapshot(recent=RECENT_TRANSACTIONS)
+        return (version, snapshot.parts()) if snapshot else None
+
+    def render_dashboard(self, data):
+        if data is None:
+            return  # What is on screen is current
+        self.data_version, parts = data
+        self.render_dashboard_parts(parts)
+
+    def render_dashboard_parts(self, parts):
+        for part, result in parts.items():
+            self.render_dashboard_part(part, result)
+
+    def save_dashboard_snapshot(self):
+        if self.snapshot_file is None or self.summary is None or "dashboard" not in self.frames:
+            return
+        parts = {
+            "summary": self.summary,
+            "categories": list(self.category_combobox.cget("values")),
+            "transactions": self.transactions_frame.rows[:RECENT_TRANSACTIONS],
+        }
+        if self.spending is not None:
+            parts["spending"] = self.spending
+        self.snapshot_file.save(self.db, self.data_version, parts)
+
+    def when_painted(self, callback):
+        """Calls callback once the dashboard's FIRST_PAINT_PARTS are on screen (at once if they already are)."""
+        if FIRST_PAINT_PARTS <= self.dashboard_painted:
+            self.after_idle(callback)
+        else:
+            self.on_first_paint = callback
+
+    def render_dashboard_part(self, part, result):
+        self.get_frame("dashboard")
+        if part == "summary":
+            self.summary = dict(result)
+            self.balance_label.configure(text=f"BALANCE\n{result['balance']:,.0f} RWF")
+            self.income_label.configure(text=f"INCOME\n{result['total_income']:,.0f} RWF")
+            self.expense_label.configure(text=f"EXPENSE\n{result['total_expense']:,.0f} RWF")
+        elif part == "categories":
+            self.category_combobox.configure(values=result)
+        elif part == "transactions":
+            self.transactions_frame.show_rows(result)
+        elif part == "spending":
+            self.spending = [dict(item) for item in result or []]
+            if self.pie_chart is None:
+                # matplotlib is the slowest import in the app, so load it after the first paint
+                self.after_idle(self.render_spending_chart, result)
+            else:
+                self.render_spending_chart(result)
+        self.dashboard_painted.add(part)
+        if self.on_first_paint and FIRST_PAINT_PARTS <= self.dashboard_painted:
+            callback, self.on_first_paint = self.on_first_paint, None
+            self.after_idle(callback)  # Runs once Tk has drawn the widgets just updated
+
+    def render_spending_chart(self, spending):
+        if self.pie_chart is None:
+            from charts import PieChart
+            self.pie_chart = PieChart(self.chart_frame)
+        self.pie_chart.update(spending)
+
+    def patch_dashboard(self, event):
+        contributions = event.contributions()
+        if not contributions:
+            return
+        if self.summary is not None:
+            for trans, sign in contributions:
+                key = "total_income" if trans['type'] == 'income' else "total_expense"
+                self.summary[key] += sign * trans['amount']
+            self.summary["balance"] = self.summary["total_income"] - self.summary["total_expense"]
+            self.render_dashboard_part("summary", self.summary)
+        if self.spending is not None:
+            totals = {item['category']: item['total'] for item in self.spending}
+            for trans, sign in contributions:
+                if trans['type'] == 'expense':
+                    totals[trans['category']] = totals.get(trans['category'], 0) + sign * trans['amount']
+            spending = [{'category': category, 'total': total} for category, total in totals.items() if total > 0]
+            self.render_dashboard_part("spending", sorted(spending, key=lambda item: item['total'], reverse=True))
+        removed = False
+        for trans, sign in contributions:
+            if sign < 0:
+                removed = self.transactions_frame.remove_row(trans['id']) or removed
+            else:
+                self.transactions_frame.insert_row(trans, limit=RECENT_TRANSACTIONS)
+        if removed and len(self.transactions_frame.rows) < RECENT_TRANSACTIONS:
+            # A row left the list: fetch the one that now takes the last place
+            self.run_query("dashboard", lambda: self.db.get_transactions(limit=RECENT_TRANSACTIONS),
+                           lambda rows: self.render_dashboard_part("transactions", rows), key="dashboard:transactions")
 
     def delete_transaction_action(self, transaction_id):
         if messagebox.askyesno("Confirm Delete", "Are you sure you want to permanently delete this transaction?"):
-            self.db.delete_transaction(transaction_id)
+            self.run_write(self.db.delete_transaction, transaction_id, on_done=self.on_transaction_deleted)
+
+    def on_transaction_deleted(self, result):
+        if result is None:
+            self.show_status_message("Error: Transaction not found.", is_error=True)
+        else:
             self.show_status_message("Transaction deleted.")
-            self.update_all_views()
 
     def open_edit_window(self, transaction_id):
         if self.edit_window is not None and self.edit_window.winfo_exists():
             self.edit_window.focus()
             return
-        trans = self.db.get_transaction_by_id(transaction_id)
+        self.run_query("edit", lambda: (self.db.get_transaction_by_id(transaction_id), self.db.get_categories()),
+                       lambda result: self.show_edit_window(transaction_id, *result))
+
+    def show_edit_window(self, transaction_id, trans, categories):
+        if self.edit_window is not None and self.edit_window.winfo_exists():
+            return  # Opened meanwhile by another click
         if not trans:
             self.show_status_message("Error: Transaction not found.", is_error=True)
             return
@@ -226,9 +522,9 @@ class App(ctk.CTk):
         desc_entry.grid(row=1, column=1, padx=10, pady=5, sticky="ew")
         desc_entry.insert(0, trans['description'])
         ctk.CTkLabel(self.edit_window, text="Category:").grid(row=2, column=0, padx=10, pady=5, sticky="w")
-        cat_combobox = ctk.CTkComboBox(self.edit_window, values=self.db.get_categories())
+        cat_combobox = ctk.CTkComboBox(self.edit_window, values=categories)
         cat_combobox.grid(row=2, column=1, padx=10, pady=5, sticky="ew")
-        cat_combobox.set(trans['category'])
+        cat_combobox.set(trans['category'] or "")
         ctk.CTkLabel(self.edit_window, text="Type:").grid(row=3, column=0, padx=10, pady=5, sticky="w")
         type_combobox = ctk.CTkComboBox(self.edit_window, values=["income", "expense"])
         type_combobox.grid(row=3, column=1, padx=10, pady=5, sticky="ew")
@@ -255,74 +551,51 @@ class App(ctk.CTk):
         except ValueError:
             self.show_status_message("Error: Date must be in YYYY-MM-DD format.", is_error=True)
             return
-        self.db.update_transaction(trans_id, date, amount, trans_type, category, desc)
-        self.edit_window.destroy()
-        self.show_status_message("Transaction updated.")
-        self.update_all_views()
+        self.run_write(self.db.update_transaction, trans_id, date, amount, trans_type, category, desc, on_done=self.on_transaction_updated)
 
-    def update_pie_chart(self):
-        if self.chart_canvas:
-            self.chart_canvas.get_tk_widget().destroy()
-        fig = Figure(figsize=(5, 5), dpi=100, facecolor="#2B2B2B")
-        ax = fig.add_subplot(111)
-        spending_data = self.db.get_spending_by_category()
-        if not spending_data:
-            ax.text(0.5, 0.5, "No expense data", ha='center', va='center', color="white")
-            ax.axis('off')
-        else:
-            labels = [item['category'] for item in spending_data]
-            sizes = [item['total'] for item in spending_data]
-            ax.pie(sizes, labels=labels, autopct=lambda p: f'{p:.0f}%', startangle=140, textprops={'color':"w"})
-            ax.axis('equal')
-        fig.tight_layout()
-        self.chart_canvas = FigureCanvasTkAgg(fig, master=self.chart_frame)
-        self.chart_canvas.draw()
-        self.chart_canvas.get_tk_widget().pack(side=ctk.TOP, fill=ctk.BOTH, expand=True)
+    def on_transaction_updated(self, result):
+        if result is None:
+            self.show_status_message("Error: Could not update the transaction.", is_error=True)
+            return
+        if self.edit_window is not None and self.edit_window.winfo_exists():
+            self.edit_window.destroy()
+        self.show_status_message("Transaction updated.")
 
     # --- REPORTS PAGE ---
     def setup_reports_ui(self):
+        # Deferred: numpy and matplotlib are only needed once Reports is opened
+        from analytics import LedgerAnalytics
+        from charts import ReportChart
+        self.analytics = LedgerAnalytics(self.db)
         self.reports_frame.grid_columnconfigure(0, weight=1)
-        self.reports_frame.grid_rowconfigure(0, weight=1)
-        self.trends_chart_frame = ctk.CTkFrame(self.reports_frame)
-        self.trends_chart_frame.grid(row=0, column=0, sticky="nsew", padx=20, pady=20)
-
-    def update_trends_chart(self):
-        if self.trends_canvas:
-            self.trends_canvas.get_tk_widget().destroy()
-        db_data = self.db.get_monthly_summary()
-        today = datetime.date.today()
-        months_data = {}
-        for i in range(12):
-            month = today.month - i
-            year = today.year
-            if month <= 0:
-                month += 12
-                year -= 1
-            months_data[(year, month)] = {'income': 0, 'expense': 0}
-        for row in db_data:
-            if (row['year'], row['month']) in months_data:
-                months_data[(row['year'], row['month'])] = {'income': row['total_income'], 'expense': row['total_expense']}
-        sorted_months = sorted(months_data.keys())
-        labels = [f"{datetime.date(y, m, 1):%b %y}" for y, m in sorted_months]
-        incomes = [months_data[key]['income'] for key in sorted_months]
-        expenses = [months_data[key]['expense'] for key in sorted_months]
-        fig = Figure(figsize=(10, 6), dpi=100, facecolor="#2B2B2B")
-        ax = fig.add_subplot(111)
-        x = np.arange(len(labels))
-        width = 0.35
-        ax.bar(x - width/2, incomes, width, label='Income', color='#4CAF50')
-        ax.bar(x + width/2, expenses, width, label='Expense', color='#F44336')
-        ax.set_ylabel('Amount (RWF)', color='white')
-        ax.set_title('Monthly Income vs Expense', color='white')
-        ax.set_xticks(x)
-        ax.set_xticklabels(labels, color='white')
-        ax.legend()
-        ax.tick_params(axis='y', colors='white')
-        ax.set_facecolor("#343638")
-        fig.tight_layout()
-        self.trends_canvas = FigureCanvasTkAgg(fig, master=self.trends_chart_frame)
-        self.trends_canvas.draw()
-        self.trends_canvas.get_tk_widget().pack(side=ctk.TOP, fill=ctk.BOTH, expand=True)
+        self.reports_frame.grid_rowconfigure(1, weight=1)
+        controls_frame = ctk.CTkFrame(self.reports_frame)
+        controls_frame.grid(row=0, column=0, sticky="ew", padx=20, pady=(20, 0))
+        controls_frame.grid_columnconfigure(1, weight=1)
+        self.granularity_button = ctk.CTkSegmentedButton(controls_frame, values=[name.capitalize() for name in REPORT_PERIODS], command=lambda value: self.update_reports())
+        self.granularity_button.set("Month")
+        self.granularity_button.grid(row=0, column=0, padx=10, pady=10, sticky="w")
+        self.forecast_label = ctk.CTkLabel(controls_frame, text="", anchor="e", text_color="gray60")
+        self.forecast_label.grid(row=0, column=1, padx=10, pady=10, sticky="e")
+        self.report_chart_frame = ctk.CTkFrame(self.reports_frame)
+        self.report_chart_frame.grid(row=1, column=0, sticky="nsew", padx=20, pady=20)
+        self.report_chart = ReportChart(self.report_chart_frame)
+
+    def update_reports(self):
+        granularity = self.granularity_button.get().lower()
+        # The first report loads the ledger into memory; later ones run no SQL at all
+        self.run_query("reports", lambda: self.analytics.report(granularity, periods=REPORT_PERIODS[granularity]), self.render_report)
+
+    def render_report(self, report):
+        forecast = report["forecast"]
+        if len(forecast):
+            self.forecast_label.configure(text=f"Forecast expense for {report['forecast_labels'][0]}: {forecast[0]:,.0f} RWF")
+        self.report_chart.update(report)
+
+    def patch_reports(self, event):
+        # LedgerAnalytics has already applied the change to its cached rollups
+        if event.contributions():
+            self.update_reports()
 
     # --- HISTORY PAGE ---
     def setup_history_ui(self):
@@ -333,7 +606,8 @@ class App(ctk.CTk):
         filter_frame.grid_columnconfigure(0, weight=1)
         self.search_desc_entry = ctk.CTkEntry(filter_frame, placeholder_text="Search by description...")
         self.search_desc_entry.grid(row=0, column=0, columnspan=2, padx=(10,5), pady=5, sticky="ew")
-        self.search_cat_combo = ctk.CTkComboBox(filter_frame, values=["All Categories"] + self.db.get_categories())
+        self.search_desc_entry.bind("<KeyRelease>", self.schedule_search)
+        self.search_cat_combo = ctk.CTkComboBox(filter_frame, values=["All Categories"])
         self.search_cat_combo.set("All Categories")
         self.search_cat_combo.grid(row=0, column=2, padx=5, pady=5)
         self.search_type_combo = ctk.CTkComboBox(filter_frame, values=["All Types", "income", "expense"])
@@ -345,10 +619,25 @@ class App(ctk.CTk):
         self.end_date_entry.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
         ctk.CTkButton(filter_frame, text="Search", command=self.search_transactions_action).grid(row=1, column=2, padx=5, pady=5)
         ctk.CTkButton(filter_frame, text="Clear", command=self.clear_filters_action, fg_color="gray50").grid(row=1, column=3, padx=5, pady=5)
-        self.history_results_frame = ctk.CTkScrollableFrame(self.history_frame, label_text="Transactions")
+        ctk.CTkButton(filter_frame, text="Export", command=self.export_transactions_action, fg_color="gray50").grid(row=1, column=4, padx=(5, 10), pady=5)
+        self.history_results_frame = VirtualTransactionList(self.history_frame, label_text="Transactions", on_edit=self.open_edit_window, on_delete=self.delete_transaction_action,
+                                                            submit=lambda func, on_done, on_dropped: self.run_query("history", func, on_done, on_dropped=on_dropped))
         self.history_results_frame.grid(row=1, column=0, sticky="nsew", padx=20, pady=(0,20))
 
+    def load_search_categories(self):
+        # Asked for each time History is shown, since leaving the frame cancels its queries
+        self.run_query("history", self.db.get_categories, lambda names: self.search_cat_combo.configure(values=["All Categories"] + names), key="history:categories")
+
+    def schedule_search(self, event=None):
+        # Search as the user types, but only once they pause, so each keystroke doesn't hit the database
+        if self.search_after_id is not None:
+            self.after_cancel(self.search_after_id)
+        self.search_after_id = self.after(SEARCH_DEBOUNCE_MS, self.search_transactions_action)
+
     def search_transactions_action(self):
+        if self.search_after_id is not None:
+            self.after_cancel(self.search_after_id)
+            self.search_after_id = None
         desc = self.search_desc_entry.get()
         cat = self.search_cat_combo.get()
         trans_type = self.search_type_combo.get()
@@ -365,8 +654,38 @@ class App(ctk.CTk):
             if start_date_str: search_params["start_date"] = datetime.datetime.strptime(start_date_str, '%Y-%m-%d').date()
             if end_date_str: search_params["end_date"] = datetime.datetime.strptime(end_date_str, '%Y-%m-%d').date()
         except ValueError: self.show_status_message("Error: Date format must be YYYY-MM-DD.", is_error=True); return
-        self.update_transactions_list(frame=self.history_results_frame, get_trans_func=lambda: self.db.search_transactions(**search_params))
-        self.show_status_message("Search complete.")
+        self.last_search_params = search_params
+        self.history_results_frame.load(lambda cursor: self.db.search_transactions_page(PAGE_SIZE, cursor, **search_params), on_loaded=lambda: self.show_status_message("Search complete."))
+
+    def patch_history(self, event):
+        contributions = event.contributions()
+        if not contributions:
+            return
+        if self.last_search_params.get("description"):
+            self.search_transactions_action()  # Full-text matching is left to the database
+            return
+        for trans, sign in contributions:
+            if sign < 0:
+                self.history_results_frame.remove_row(trans['id'])
+            elif self.matches_search(trans):
+                self.history_results_frame.insert_row(trans)
+
+    def matches_search(self, trans):
+        params = self.last_search_params
+        return ((not params.get("category") or trans['category'] == params["category"])
+                and (not params.get("trans_type") or trans['type'] == params["trans_type"])
+                and (not params.get("start_date") or trans['transaction_date'] >= params["start_date"])
+                and (not params.get("end_date") or trans['transaction_date'] <= params["end_date"]))
+
+    def export_transactions_action(self):
+        # Export the filters of the search on screen, not whatever has been typed since
+        path = filedialog.asksaveasfilename(title="Export Transactions", defaultextension=".csv",
+                                            filetypes=[("CSV", "*.csv"), ("Parquet", "*.parquet"), ("Arrow", "*.arrow")])
+        if not path:
+            return
+        self.executor.submit("export", export_transactions, self.db, path, **self.last_search_params,
+                             on_done=lambda count: self.show_status_message(f"Exported {count:,} transactions."),
+                             on_error=lambda error: self.show_status_message(f"Error: Export failed ({error}).", is_error=True))
 
     def clear_filters_action(self):
         self.search_desc_entry.delete(0, "end")
@@ -385,23 +704,52 @@ class App(ctk.CTk):
         self.budgets_scroll_frame.grid_columnconfigure(0, weight=1)
 
     def update_budgets_view(self):
-        for widget in self.budgets_scroll_frame.winfo_children(): widget.destroy()
         now = datetime.datetime.now()
-        budget_data = self.db.get_budgets_for_month(now.month, now.year)
+        self.budget_period = (now.month, now.year)
+        self.run_query("budgets", lambda: self.db.get_budgets_for_month(now.month, now.year), self.render_budgets_view)
+
+    def render_budgets_view(self, budget_data):
+        for widget in self.budgets_scroll_frame.winfo_children(): widget.destroy()
+        self.budget_rows = {}
         for item in budget_data:
-            category = item['category']; budget = item['budget_amount']; spent = item['spent_amount']; progress = (spent / budget) if budget > 0 else 0; progress = min(progress, 1.0)
+            category = item['category']; budget = item['budget_amount']; spent = item['spent_amount']
             item_frame = ctk.CTkFrame(self.budgets_scroll_frame); item_frame.pack(fill="x", expand=True, padx=10, pady=5); item_frame.grid_columnconfigure(1, weight=1)
             ctk.CTkLabel(item_frame, text=category, font=ctk.CTkFont(size=14, weight="bold")).grid(row=0, column=0, padx=10, pady=5, sticky="w")
-            progress_bar = ctk.CTkProgressBar(item_frame, orientation="horizontal"); progress_bar.set(progress); progress_bar.grid(row=1, column=0, columnspan=2, padx=10, pady=5, sticky="ew")
-            ctk.CTkLabel(item_frame, text=f"{spent:,.0f} / {budget:,.0f} RWF").grid(row=0, column=1, padx=10, pady=5, sticky="e")
+            progress_bar = ctk.CTkProgressBar(item_frame, orientation="horizontal"); progress_bar.grid(row=1, column=0, columnspan=2, padx=10, pady=5, sticky="ew")
+            amount_label = ctk.CTkLabel(item_frame); amount_label.grid(row=0, column=1, padx=10, pady=5, sticky="e")
+            self.budget_rows[category] = {"budget": budget, "spent": spent, "bar": progress_bar, "label": amount_label}
+            self.show_budget_row(category)
             budget_entry = ctk.CTkEntry(item_frame, placeholder_text="Set Budget");
             if budget > 0: budget_entry.insert(0, f"{budget:.0f}")
             budget_entry.grid(row=0, column=2, padx=10, pady=5)
             ctk.CTkButton(item_frame, text="Save", width=60, command=lambda c=category, e=budget_entry: self.save_budget_action(c, e)).grid(row=0, column=3, padx=10, pady=5)
 
+    def show_budget_row(self, category):
+        row = self.budget_rows[category]; budget = row["budget"]; spent = row["spent"]
+        row["bar"].set(min((spent / budget) if budget > 0 else 0, 1.0))
+        row["label"].configure(text=f"{spent:,.0f} / {budget:,.0f} RWF")
+
+    def patch_budgets(self, event):
+        if isinstance(event, BudgetSet):
+            if (event.month, event.year) == self.budget_period and event.category in self.budget_rows:
+                self.budget_rows[event.category]["budget"] = event.amount
+                self.show_budget_row(event.category)
+            return
+        for trans, sign in event.contributions():
+            date = trans['transaction_date']
+            if trans['type'] == 'expense' and (date.month, date.year) == self.budget_period and trans['category'] in self.budget_rows:
+                self.budget_rows[trans['category']]["spent"] += sign * trans['amount']
+                self.show_budget_row(trans['category'])
+
     def save_budget_action(self, category, entry_widget):
-        try: new_budget = float(entry_widget.get()); now = datetime.datetime.now(); self.db.set_budget(category, new_budget, now.month, now.year); self.update_budgets_view(); self.show_status_message(f"Budget for {category} saved.")
-        except (ValueError, TypeError): self.show_status_message(f"Error: Invalid budget for {category}.", is_error=True)
+        try: new_budget = float(entry_widget.get())
+        except (ValueError, TypeError): self.show_status_message(f"Error: Invalid budget for {category}.", is_error=True); return
+        now = datetime.datetime.now()
+        self.run_write(self.db.set_budget, category, new_budget, now.month, now.year, on_done=lambda result: self.on_budget_saved(result, category))
+
+    def on_budget_saved(self, result, category):
+        if result is None: self.show_status_message(f"Error: Could not save the budget for {category}.", is_error=True)
+        else: self.show_status_message(f"Budget for {category} saved.")
 
     # --- SAVINGS PAGE ---
     def setup_savings_ui(self):
@@ -419,25 +767,50 @@ class App(ctk.CTk):
         if not all([name, target_str]): self.show_status_message("Error: All fields required.", is_error=True); return
         try: target = float(target_str)
         except ValueError: self.show_status_message("Error: Target must be a number.", is_error=True); return
-        self.db.add_savings_goal(name, target); self.goal_name_entry.delete(0, "end"); self.goal_target_entry.delete(0, "end"); self.update_savings_view(); self.show_status_message(f"Goal '{name}' created.")
+        self.run_write(self.db.add_savings_goal, name, target, on_done=lambda goal_id: self.on_goal_created(goal_id, name))
+
+    def on_goal_created(self, goal_id, name):
+        if goal_id is None: self.show_status_message(f"Error: Could not create the goal '{name}'.", is_error=True); return
+        self.goal_name_entry.delete(0, "end"); self.goal_target_entry.delete(0, "end"); self.show_status_message(f"Goal '{name}' created.")
 
     def update_savings_view(self):
+        self.run_query("savings", self.db.get_savings_goals, self.render_savings_view)
+
+    def render_savings_view(self, goals):
         for widget in self.savings_scroll_frame.winfo_children(): widget.destroy()
-        goals = self.db.get_savings_goals()
+        self.goal_rows = {}
         if not goals: ctk.CTkLabel(self.savings_scroll_frame, text="No savings goals yet.").pack(pady=10)
         else:
             for goal in goals: 
-                goal_id = goal['id']; name = goal['name']; target = goal['target_amount']; current = goal['current_amount']; progress = (current / target) if target > 0 else 0; progress = min(progress, 1.0)
+                goal_id = goal['id']; name = goal['name']; target = goal['target_amount']; current = goal['current_amount']
                 item_frame = ctk.CTkFrame(self.savings_scroll_frame); item_frame.pack(fill="x", expand=True, padx=10, pady=5); item_frame.grid_columnconfigure(1, weight=1)
                 ctk.CTkLabel(item_frame, text=name, font=ctk.CTkFont(size=14, weight="bold")).grid(row=0, column=0, padx=10, pady=5, sticky="w")
-                progress_bar = ctk.CTkProgressBar(item_frame, orientation="horizontal"); progress_bar.set(progress); progress_bar.grid(row=1, column=0, columnspan=2, padx=10, pady=5, sticky="ew")
-                ctk.CTkLabel(item_frame, text=f"{current:,.0f} / {target:,.0f} RWF").grid(row=0, column=1, padx=10, pady=5, sticky="e")
+                progress_bar = ctk.CTkProgressBar(item_frame, orientation="horizontal"); progress_bar.grid(row=1, column=0, columnspan=2, padx=10, pady=5, sticky="ew")
+                amount_label = ctk.CTkLabel(item_frame); amount_label.grid(row=0, column=1, padx=10, pady=5, sticky="e")
+                self.goal_rows[goal_id] = {"target": target, "current": current, "bar": progress_bar, "label": amount_label}
+                self.show_goal_row(goal_id)
                 add_funds_entry = ctk.CTkEntry(item_frame, placeholder_text="Add Funds"); add_funds_entry.grid(row=0, column=2, padx=10, pady=5)
                 ctk.CTkButton(item_frame, text="Add", width=50, command=lambda g_id=goal_id, g_name=name, e=add_funds_entry: self.add_funds_action(g_id, g_name, e)).grid(row=0, column=3, padx=10, pady=5)
 
+    def show_goal_row(self, goal_id):
+        row = self.goal_rows[goal_id]; target = row["target"]; current = row["current"]
+        row["bar"].set(min((current / target) if target > 0 else 0, 1.0))
+        row["label"].configure(text=f"{current:,.0f} / {target:,.0f} RWF")
+
+    def patch_savings(self, event):
+        if isinstance(event, GoalAdded):
+            self.update_savings_view()  # A new row to build: one small query
+        elif isinstance(event, GoalFunded) and event.goal_id in self.goal_rows:
+            self.goal_rows[event.goal_id]["current"] += event.amount
+            self.show_goal_row(event.goal_id)
+
     def add_funds_action(self, goal_id, goal_name, entry_widget):
         try: 
             amount = float(entry_widget.get())
             if amount <= 0: self.show_status_message("Error: Amount must be positive.", is_error=True); return
-            self.db.add_to_savings_goal(goal_id, goal_name, amount); self.update_savings_view(); self.show_status_message(f"{amount:,.0f} RWF added to '{goal_name}'.")
-        except (ValueError, TypeError): self.show_status_message(f"Error: Invalid amount for {goal_name}.", is_error=True)
\ No newline at end of file
+        except (ValueError, TypeError): self.show_status_message(f"Error: Invalid amount for {goal_name}.", is_error=True); return
+        self.run_write(self.db.add_to_savings_goal, goal_id, goal_name, amount, on_done=lambda result: self.on_funds_added(result, goal_name, amount))
+
+    def on_funds_added(self, result, goal_name, amount):
+        if result is None: self.show_status_message(f"Error: Could not add funds to '{goal_name}'.", is_error=True); return
+        self.show_status_message(f"{amount:,.0f} RWF added to '{goal_name}'.")
\ No newline at end of file
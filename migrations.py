@@ -0,0 +1,211 @@
+import datetime
+import rollups
+
+# bms.sql (bms_sqlite.sql for SQLite) creates the base schema; everything after it is a
+# numbered migration here. Each step is called as step(cursor, backend) and must be safe to
+# re-run, because MySQL commits DDL immediately and a migration interrupted half way is
+# simply applied again on the next startup.
+
+
+def create_index(table, name, columns, kind=""):
+    def step(cursor, backend):
+        backend.create_index(cursor, table, name, columns, kind)
+    return step
+
+
+def drop_index(table, name):
+    def step(cursor, backend):
+        backend.drop_index(cursor, table, name)
+    return step
+
+
+def add_column(table, column, definition):
+    def step(cursor, backend):
+        backend.add_column(cursor, table, column, definition)
+    return step
+
+
+def replace_unique(table, columns, name, new_columns):
+    def step(cursor, backend):
+        backend.replace_unique(cursor, table, columns, name, new_columns)
+    return step
+
+
+def execute(statement):
+    def step(cursor, backend):
+        cursor.execute(statement)
+    return step
+
+
+# monthly_rollups as migration 2 first created it; migration 4 replaces it with the
+# account-scoped table in rollups.py (and fills it)
+MONTHLY_ROLLUPS_V2 = """
+CREATE TABLE IF NOT EXISTS monthly_rollups (
+    year SMALLINT NOT NULL,
+    month TINYINT NOT NULL,
+    category_id INT NOT NULL,
+    type VARCHAR(7) NOT NULL,
+    total DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    txn_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (year, month, category_id, type)
+)
+"""
+
+
+def create_accounts(cursor, backend):
+    """The accounts table, with account 1 owning every row that predates it."""
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS accounts (
+        id {backend.id_column},
+        name VARCHAR(100) NOT NULL UNIQUE
+    )
+    """)
+    cursor.execute("SELECT id FROM accounts WHERE id = 1")
+    if not cursor.fetchone():
+        cursor.execute("INSERT INTO accounts (id, name) VALUES (1, 'Default')")
+
+
+def create_recurring_rules(cursor, backend):
+    """Rules for transactions that repeat; see recurring.py."""
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS recurring_rules (
+        id {backend.id_column},
+        account_id INT NOT NULL DEFAULT 1,
+        amount DECIMAL(10, 2) NOT NULL,
+        type VARCHAR(7) NOT NULL,
+        category_id INT,
+        description VARCHAR(255),
+        frequency VARCHAR(7) NOT NULL,
+        every INT NOT NULL DEFAULT 1,
+        start_date DATE NOT NULL,
+        end_date DATE,
+        next_date DATE NOT NULL,
+        FOREIGN KEY (category_id) REFERENCES categories(id)
+    )
+    """)
+
+
+MIGRATIONS = [
+    (1, "Index transactions by date, type and category", [
+        # Recent-first listing and keyset pages: ORDER BY transaction_date DESC, id DESC
+        create_index("transactions", "idx_transactions_date", "transaction_date, id"),
+        # Summaries and monthly trends: covers type + date range + amount without touching rows
+        create_index("transactions", "idx_transactions_type_date", "type, transaction_date, amount"),
+        # Category searches ordered by date
+        create_index("transactions", "idx_transactions_category_date", "category_id, transaction_date"),
+        # Spending per category and budgets: covers type + category + date range + amount
+        create_index("transactions", "idx_transactions_type_category_date", "type, category_id, transaction_date, amount"),
+    ]),
+    (2, "Add monthly_rollups aggregate table", [
+        execute(MONTHLY_ROLLUPS_V2),
+    ]),
+    (3, "Full-text index on transaction descriptions", [
+        create_index("transactions", "ft_transactions_description", "description", kind="FULLTEXT"),
+    ]),
+    (4, "Scope ledgers, budgets and savings goals by account", [
+        create_accounts,
+        # Existing rows become account 1's
+        add_column("transactions", "account_id", "INT NOT NULL DEFAULT 1"),
+        add_column("budgets", "account_id", "INT NOT NULL DEFAULT 1"),
+        add_column("savings_goals", "account_id", "INT NOT NULL DEFAULT 1"),
+        # One budget per category and month within each account
+        replace_unique("budgets", "category_id, month, year", "uq_budgets_account_category_month", "account_id, category_id, month, year"),
+        # Every transaction query filters on account_id first, so the indexes of migration 1
+        # are replaced by ones led by it. idx_transactions_category_date stays: MySQL needs an
+        # index led by category_id for the foreign key.
+        create_index("transactions", "idx_transactions_account_date", "account_id, transaction_date, id"),
+        create_index("transactions", "idx_transactions_account_type_date", "account_id, type, transaction_date, amount"),
+        create_index("transactions", "idx_transactions_account_category_date", "account_id, category_id, transaction_date"),
+        create_index("transactions", "idx_transactions_account_type_category_date", "account_id, type, category_id, transaction_date, amount"),
+        drop_index("transactions", "idx_transactions_date"),
+        drop_index("transactions", "idx_transactions_type_date"),
+        drop_index("transactions", "idx_transactions_type_category_date"),
+        create_index("savings_goals", "idx_savings_goals_account_name", "account_id, name"),
+        rollups.recreate_table,
+        rollups.rebuild,
+    ]),
+    (5, "Add the data_versions change counter", [
+        # One counter per account, bumped by every committed change to its data; account 0
+        # counts changes to the shared categories
+        execute("""
+        CREATE TABLE IF NOT EXISTS data_versions (
+            account_id INT PRIMARY KEY,
+            version BIGINT NOT NULL DEFAULT 0
+        )
+        """),
+    ]),
+    (6, "Add recurring transaction rules", [
+        create_recurring_rules,
+        # The scheduler reads each account's rules that have fallen due
+        create_index("recurring_rules", "idx_recurring_rules_account_next", "account_id, next_date"),
+        # Posted occurrences remember their rule and date; the unique key (NULLs never clash)
+        # stops an occurrence from being posted twice
+        add_column("transactions", "recurring_rule_id", "INT"),
+        add_column("transactions", "occurrence_date", "DATE"),
+        create_index("transactions", "uq_transactions_occurrence", "recurring_rule_id, occurrence_date", kind="UNIQUE"),
+    ]),
+]
+
+
+def apply_migrations(db):
+    """Applies every migration newer than the database's recorded schema version."""
+    with db.cursor() as cursor:
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            description VARCHAR(255) NOT NULL,
+            applied_at DATETIME NOT NULL
+        )
+        """)
+        cursor.execute("SELECT version FROM schema_migrations")
+        applied = {row['version'] for row in cursor.fetchall()}
+        for version, description, steps in MIGRATIONS:
+            if version in applied:
+                continue
+            db.backend.begin(cursor.connection)
+            for step in steps:
+                step(cursor, db.backend)
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, description, applied_at) VALUES (%s, %s, %s)",
+                (version, description, datetime.datetime.now()))
+            cursor.connection.commit()
+            print(f"Applied migration {version}: {description}")
+
+
+def check_index_usage(db):
+    """EXPLAINs every query issued by the main DBManager read methods.
+
+    Returns (method, table, access type, key) for each plan row that reads the
+    transactions table, and a list of the rows among them that use no index.
+    """
+    today = datetime.date.today()
+    year_start = datetime.date(today.year, 1, 1)
+    categories = db.get_categories()
+    category = categories[0] if categories else None
+    calls = [
+        ("get_summary", db.get_summary),
+        ("get_dashboard_snapshot", db.get_dashboard_snapshot),
+        ("get_transactions", lambda: db.get_transactions(limit=15)),
+        ("get_transaction_by_id", lambda: db.get_transaction_by_id(1)),
+        ("get_spending_by_category", db.get_spending_by_category),
+        ("get_monthly_summary", db.get_monthly_summary),
+        ("get_budgets_for_month", lambda: db.get_budgets_for_month(today.month, today.year)),
+        ("search_transactions_page", lambda: db.search_transactions_page(50)),
+        ("search_transactions_page(category)", lambda: db.search_transactions_page(50, category=category)),
+        ("search_transactions_page(description)", lambda: db.search_transactions_page(50, description="lunch")),
+        ("search_transactions_page(type, dates)", lambda: db.search_transactions_page(50, trans_type='expense', start_date=year_start, end_date=today)),
+    ]
+    report = []
+    failures = []
+    for name, call in calls:
+        with db.record_queries() as queries:
+            call()
+        for query, params in queries:
+            for table, access, key in db.backend.explain(db, query, params):
+                if table not in ('t', 'transactions'):
+                    continue
+                entry = (name, table, access, key)
+                report.append(entry)
+                if access == 'ALL' or not key:
+                    failures.append(entry)
+    return report, failures
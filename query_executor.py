@@ -0,0 +1,130 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueryExecutor:
+    def __init__(self, widget, max_workers=4, poll_interval=30, on_busy_change=None):
+        """Run database calls on worker threads and hand results back to the Tk loop.
+
+        Tk widgets may only be touched from the main thread, so workers never call back
+        directly: finished futures are queued and drained by a widget.after() poll.
+        """
+        self.widget = widget
+        self.poll_interval = poll_interval
+        self.on_busy_change = on_busy_change
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bms-query")
+        self._finished = queue.Queue()
+        self._posted = queue.Queue()
+        self._generations = {}
+        self._pending = {}
+        self._latest = {}
+        self._cancel_callbacks = {}
+        self._poll_id = None
+        self._busy = False
+        self._shut_down = False
+
+    @property
+    def busy(self):
+        return any(self._pending.values())
+
+    def submit(self, tag, func, *args, on_done=None, on_error=None, on_cancel=None, key=None, **kwargs):
+        """Run func(*args, **kwargs) in the background and call on_done(result) on the UI thread.
+
+        tag groups requests by view so cancel() can drop them all at once. When key is given,
+        a newer request with the same key supersedes any older one still in flight. on_cancel()
+        is called instead of on_done when the result is dropped either way.
+        """
+        if self._shut_down:
+            return None
+        generation = self._generations.get(tag, 0)
+        future = self._pool.submit(func, *args, **kwargs)
+        self._pending.setdefault(tag, set()).add(future)
+        if key is not None:
+            self._latest[key] = future
+        if on_cancel is not None:
+            self._cancel_callbacks[future] = on_cancel
+        future.add_done_callback(lambda f: self._finished.put((tag, generation, key, f, on_done, on_error)))
+        self._update_busy()
+        self._schedule_poll()
+        return future
+
+    def post(self, callback, *args):
+        """Schedule callback(*args) on the UI thread; safe to call from a worker (e.g. for progress).
+
+        Calls posted from a worker run at the next poll, which happens while any query is pending.
+        """
+        self._posted.put((callback, args))
+        if threading.current_thread() is threading.main_thread():
+            self._schedule_poll()
+
+    def cancel(self, tag):
+        """Drop every outstanding result for tag; queued work that has not started is skipped."""
+        self._generations[tag] = self._generations.get(tag, 0) + 1
+        for future in self._pending.pop(tag, set()):
+            future.cancel()
+            on_cancel = self._cancel_callbacks.pop(future, None)
+            if on_cancel:
+                on_cancel()
+        self._update_busy()
+
+    def cancel_all(self, keep=None):
+        """Cancel every tag except keep."""
+        for tag in list(self._pending):
+            if tag != keep:
+                self.cancel(tag)
+
+    def _schedule_poll(self):
+        if self._poll_id is None and not self._shut_down:
+            self._poll_id = self.widget.after(self.poll_interval, self._poll)
+
+    def _poll(self):
+        self._poll_id = None
+        while True:
+            try:
+                callback, args = self._posted.get_nowait()
+            except queue.Empty:
+                break
+            callback(*args)
+        while True:
+            try:
+                tag, generation, key, future, on_done, on_error = self._finished.get_nowait()
+            except queue.Empty:
+                break
+            self._pending.get(tag, set()).discard(future)
+            on_cancel = self._cancel_callbacks.pop(future, None)
+            if key is not None and self._latest.get(key) is future:
+                del self._latest[key]
+            elif key is not None:
+                # Superseded by a newer request with the same key
+                if on_cancel:
+                    on_cancel()
+                continue
+            if future.cancelled() or generation != self._generations.get(tag, 0):
+                continue
+            error = future.exception()
+            if error is not None:
+                if on_error:
+                    on_error(error)
+                else:
+                    print(f"Background query failed: {error}")
+            elif on_done:
+                on_done(future.result())
+        self._update_busy()
+        if self.busy:
+            self._schedule_poll()
+
+    def _update_busy(self):
+        busy = self.busy
+        if busy != self._busy:
+            self._busy = busy
+            if self.on_busy_change:
+                self.on_busy_change(busy)
+
+    def shutdown(self):
+        """Stop polling and abandon queued work; running queries finish on their own."""
+        self._shut_down = True
+        if self._poll_id is not None:
+            self.widget.after_cancel(self._poll_id)
+            self._poll_id = None
+        self._pool.shutdown(wait=False, cancel_futures=True)
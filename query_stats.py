@@ -0,0 +1,108 @@
+import json
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+slow_query_log = logging.getLogger("bms.slow_query")
+
+IN_LIST = re.compile(r"IN\s*\((?:\s*%s\s*,?)+\)", re.IGNORECASE)
+WHITESPACE = re.compile(r"\s+")
+SAMPLE_ROWS = 16
+
+
+def query_shape(query):
+    """Normalises SQL so calls that differ only in layout or IN-list length group together."""
+    return IN_LIST.sub("IN (...)", WHITESPACE.sub(" ", query).strip())
+
+
+def estimate_bytes(rows, sample=SAMPLE_ROWS):
+    """Approximate payload size of fetched rows: the text length of the values of up to `sample`
+    evenly spaced rows, scaled up to all of them (rows of one query are much alike in size).
+    """
+    if not rows:
+        return 0
+    step = max(1, len(rows) // sample)
+    sampled = rows[::step]
+    size = sum(len(str(value)) for row in sampled for value in (row.values() if isinstance(row, dict) else row))
+    return size * len(rows) // len(sampled)
+
+
+class QueryStats:
+    def __init__(self, slow_query_ms=200):
+        """Per-shape query counters plus per-view refresh totals, safe to update from any thread.
+
+        Queries slower than slow_query_ms are logged with their parameters to the
+        'bms.slow_query' logger; None disables the slow-query log.
+        """
+        self.slow_query_ms = slow_query_ms
+        self._shapes = {}
+        self._scopes = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def record(self, query, params, seconds, rows=None, failed=False, row_count=None):
+        """Adds one execution; pass the fetched rows, or just row_count for streamed or bulk statements."""
+        shape = query_shape(query)
+        elapsed_ms = seconds * 1000
+        if row_count is None:
+            row_count = len(rows) if rows is not None else 0
+        nbytes = estimate_bytes(rows)
+        with self._lock:
+            stats = self._shapes.setdefault(shape, {"calls": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0, "bytes": 0})
+            stats["calls"] += 1
+            stats["errors"] += int(failed)
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+            stats["rows"] += row_count
+            stats["bytes"] += nbytes
+        scope = getattr(self._local, "scope", None)
+        if scope is not None:
+            scope["queries"] += 1
+            scope["query_ms"] += elapsed_ms
+            scope["rows"] += row_count
+        if self.slow_query_ms is not None and elapsed_ms >= self.slow_query_ms:
+            slow_query_log.warning("Slow query (%.1f ms, %d rows): %s -- params %r", elapsed_ms, row_count, shape, params)
+
+    @contextmanager
+    def scope(self, name):
+        """Attributes every query this thread runs inside the block to one refresh of `name`."""
+        current = {"queries": 0, "query_ms": 0.0, "rows": 0}
+        self._local.scope = current
+        start = time.perf_counter()
+        try:
+            yield current
+        finally:
+            self._local.scope = None
+            current["wall_ms"] = (time.perf_counter() - start) * 1000
+            with self._lock:
+                totals = self._scopes.setdefault(name, {"refreshes": 0, "queries": 0, "query_ms": 0.0, "rows": 0, "wall_ms": 0.0})
+                totals["refreshes"] += 1
+                for key in ("queries", "query_ms", "rows", "wall_ms"):
+                    totals[key] += current[key]
+                totals["last"] = current
+
+    def scoped(self, name, func):
+        """Wraps func so each call is recorded as one refresh of `name`."""
+        def run(*args, **kwargs):
+            with self.scope(name):
+                return func(*args, **kwargs)
+        return run
+
+    def snapshot(self):
+        """Returns {'queries': [...by total time...], 'refreshes': {view: totals}} as plain data."""
+        with self._lock:
+            shapes = [dict(stats, sql=shape) for shape, stats in self._shapes.items()]
+            scopes = {name: dict(totals) for name, totals in self._scopes.items()}
+        shapes.sort(key=lambda stats: stats["total_ms"], reverse=True)
+        return {"queries": shapes, "refreshes": scopes}
+
+    def dump_json(self, path):
+        with open(path, "w", encoding="utf-8") as stream:
+            json.dump(self.snapshot(), stream, indent=2)
+
+    def reset(self):
+        with self._lock:
+            self._shapes.clear()
+            self._scopes.clear()
@@ -0,0 +1,53 @@
+import calendar
+import datetime
+
+# Date arithmetic for recurring_rules. A rule repeats every `every` days, weeks, months or
+# years from its start_date; next_date is the first occurrence not posted yet.
+# DBManager.post_recurring_transactions() posts everything due in one write, and the unique
+# (recurring_rule_id, occurrence_date) key on transactions makes posting an occurrence twice impossible.
+
+FREQUENCIES = ("daily", "weekly", "monthly", "yearly")
+UNITS = {"daily": "days", "weekly": "weeks", "monthly": "months", "yearly": "years"}
+
+
+def add_months(date, months):
+    """date moved by whole months, on the same day or the last day of a shorter month."""
+    index = date.year * 12 + date.month - 1 + months
+    year, month = divmod(index, 12)
+    return datetime.date(year, month + 1, min(date.day, calendar.monthrange(year, month + 1)[1]))
+
+
+def following(rule, date):
+    """The occurrence after `date`, which must itself be an occurrence of rule.
+
+    Months and years are counted from start_date, so a rule starting on the 31st falls on the
+    last day of shorter months and returns to the 31st afterwards.
+    """
+    frequency, every, start = rule['frequency'], rule['every'], rule['start_date']
+    if frequency == "daily":
+        return date + datetime.timedelta(days=every)
+    if frequency == "weekly":
+        return date + datetime.timedelta(weeks=every)
+    if frequency in ("monthly", "yearly"):
+        step = every if frequency == "monthly" else every * 12
+        elapsed = (date.year - start.year) * 12 + date.month - start.month
+        return add_months(start, elapsed + step)
+    raise ValueError(f"Unknown frequency: {frequency!r}")
+
+
+def due_dates(rule, today):
+    """Every occurrence of rule from its next_date up to today (and its end_date, if any).
+
+    Returns the dates and the rule's next_date after posting them.
+    """
+    last = min(today, rule['end_date']) if rule['end_date'] else today
+    dates = []
+    date = rule['next_date']
+    while date <= last:
+        dates.append(date)
+        following_date = following(rule, date)
+        if following_date <= date:
+            # Only a rule stored with every < 1 stands still; never loop on one
+            raise ValueError(f"Recurring rule {rule.get('id')} does not advance (every={rule['every']!r}).")
+        date = following_date
+    return dates, date
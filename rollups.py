@@ -0,0 +1,99 @@
+import datetime
+from decimal import Decimal
+
+CENT = Decimal("0.01")
+
+# monthly_rollups holds one row of SUM(amount) and COUNT(*) per (account_id, year, month, category_id, type).
+# DBManager keeps it current in the same database transaction as every transaction write, so
+# summaries, budgets and trends read months x categories rows instead of the whole ledger.
+# Transactions without a category are rolled up under category_id 0.
+
+CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS monthly_rollups (
+    account_id INT NOT NULL,
+    year SMALLINT NOT NULL,
+    month TINYINT NOT NULL,
+    category_id INT NOT NULL,
+    type VARCHAR(7) NOT NULL,
+    total DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    txn_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (account_id, year, month, category_id, type)
+)
+"""
+
+COLUMNS = ["account_id", "year", "month", "category_id", "type", "total", "txn_count"]
+KEY = COLUMNS[:5]
+
+
+def from_cents(cents):
+    """The Decimal a DECIMAL(10, 2) column would hold for an amount in cents."""
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def aggregate_sql(backend):
+    """SELECT of the rollup rows computed from the raw transactions."""
+    year, month = backend.year("transaction_date"), backend.month("transaction_date")
+    return f"""
+    SELECT account_id, {year} AS year, {month} AS month,
+           COALESCE(category_id, 0) AS category_id, type,
+           SUM(amount) AS total, COUNT(*) AS txn_count
+    FROM transactions
+    GROUP BY account_id, {year}, {month}, COALESCE(category_id, 0), type
+    """
+
+
+def adjust_sql(backend):
+    """Upsert that adds one delta_params() row to its rollup, creating the row if needed."""
+    return backend.upsert("monthly_rollups", COLUMNS, KEY, increment=["total", "txn_count"])
+
+
+def as_date(value):
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.datetime.strptime(str(value), '%Y-%m-%d').date()
+
+
+def delta_params(account_id, date, category_id, trans_type, amount, count):
+    """Parameters for adjust_sql(); pass a negative amount and count to take a transaction back out."""
+    date = as_date(date)
+    return (account_id, date.year, date.month, category_id or 0, trans_type, amount, count)
+
+
+def create_table(cursor, backend):
+    cursor.execute(CREATE_TABLE)
+
+
+def recreate_table(cursor, backend):
+    """Replaces monthly_rollups (of any earlier shape) with an empty table of the current one."""
+    cursor.execute("DROP TABLE IF EXISTS monthly_rollups")
+    cursor.execute(CREATE_TABLE)
+
+
+def rebuild(cursor, backend):
+    """Recomputes every rollup row from the raw transactions."""
+    cursor.execute("DELETE FROM monthly_rollups")
+    cursor.execute(f"INSERT INTO monthly_rollups ({', '.join(COLUMNS)}) " + aggregate_sql(backend))
+
+
+def as_cents(value):
+    # SQLite sums DECIMAL columns as floats, so compare totals at cent precision
+    return Decimal(str(value)).quantize(CENT)
+
+
+def verify(cursor, backend):
+    """Compares the rollups against the raw transactions.
+
+    Returns a list of (account_id, year, month, category_id, type, expected, actual) for every key whose
+    (total, count) differs; an empty list means the rollups are consistent.
+    """
+    cursor.execute(aggregate_sql(backend))
+    expected = {tuple(r[column] for column in KEY): (as_cents(r['total']), r['txn_count']) for r in cursor.fetchall()}
+    cursor.execute(f"SELECT {', '.join(COLUMNS)} FROM monthly_rollups")
+    actual = {tuple(r[column] for column in KEY): (as_cents(r['total']), r['txn_count']) for r in cursor.fetchall()}
+    empty = (Decimal(0), 0)
+    mismatches = []
+    for key in sorted(set(expected) | set(actual)):
+        want, have = expected.get(key, empty), actual.get(key, empty)
+        if want != have:
+            mismatches.append(key + (want, have))
+    return mismatches
@@ -0,0 +1,40 @@
+import asyncio
+import json
+import pytest
+from api_server import ApiServer, MAX_PAGE_SIZE, Request
+from db_manager import DBManager
+
+
+@pytest.fixture
+def server(tmp_path):
+    db = DBManager(backend="sqlite", path=str(tmp_path / "bms.sqlite3"))
+    for day in range(1, 21):
+        db.add_transaction(day, "expense", "Other", f"item {day}")
+    server = ApiServer(db)
+    yield server
+    server.executor.shutdown(wait=True)
+    db.close()
+
+
+def get(server, target):
+    """Dispatches a GET without a socket; returns (status code, decoded body)."""
+    response = asyncio.run(server.dispatch(Request("GET", target, "HTTP/1.1", {}, b"")))
+    return response.status.value, json.loads(response.encode(keep_alive=True).split(b"\r\n\r\n", 1)[1])
+
+
+@pytest.mark.parametrize("target", ["/transactions?limit=0", "/transactions?limit=-1", "/transactions/search?limit=0",
+                                    "/dashboard?recent=0", "/dashboard?recent=-1"])
+def test_row_counts_below_one_are_rejected(server, target):
+    status, body = get(server, target)
+    assert status == 400
+    assert "at least 1" in body["error"]
+
+
+def test_dashboard_recent_defaults_to_15_and_is_capped(server, monkeypatch):
+    status, body = get(server, "/dashboard")
+    assert status == 200 and len(body["transactions"]) == 15
+    asked = []
+    snapshot = server.db.get_dashboard_snapshot
+    monkeypatch.setattr(server.db, "get_dashboard_snapshot", lambda recent: asked.append(recent) or snapshot(recent))
+    status, _ = get(server, f"/dashboard?recent={MAX_PAGE_SIZE + 1}")
+    assert status == 200 and asked == [MAX_PAGE_SIZE]
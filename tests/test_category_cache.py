@@ -0,0 +1,59 @@
+from category_cache import CategoryCache
+
+
+class Loader:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return list(self.rows)
+
+
+def cache_of(*names, ttl=None):
+    loader = Loader([{"id": index, "name": name} for index, name in enumerate(names, start=1)])
+    return CategoryCache(loader, ttl=ttl), loader
+
+
+def test_uncategorised_ids_never_reach_the_loader():
+    cache, loader = cache_of("Food")
+    assert cache.name_for(0) is None and cache.name_for(None) is None
+    assert loader.calls == 0
+
+
+def test_unknown_keys_reload_once_until_invalidated():
+    cache, loader = cache_of("Food")
+    for _ in range(5):
+        assert cache.id_for("Nope") is None
+        assert cache.name_for(99) is None
+    assert loader.calls == 3  # First load, then one reload per unknown key
+    loader.rows.append({"id": 99, "name": "Nope"})
+    assert cache.id_for("Nope") is None  # Still remembered as missing
+    cache.invalidate()
+    assert cache.id_for("Nope") == 99 and cache.name_for(99) == "Nope"
+
+
+def test_alternating_unknown_names_do_not_reload_each_time():
+    cache, loader = cache_of("Food")
+    for _ in range(10):
+        cache.id_for("A")
+        cache.id_for("B")
+    assert loader.calls == 3
+
+
+def test_missing_keys_are_forgotten_when_the_ttl_expires(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("category_cache.time.monotonic", lambda: now[0])
+    cache, loader = cache_of("Food", ttl=60)
+    assert cache.id_for("Travel") is None
+    loader.rows.append({"id": 2, "name": "Travel"})
+    now[0] += 61
+    assert cache.id_for("Travel") == 2
+
+
+def test_a_new_category_is_found_by_the_miss_reload():
+    cache, loader = cache_of("Food")
+    assert cache.id_for("Food") == 1
+    loader.rows.append({"id": 2, "name": "Travel"})
+    assert cache.id_for("Travel") == 2
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+charts = pytest.importorskip("charts")
+
+
+class AggCanvas(FigureCanvasAgg):
+    """Stands in for FigureCanvasTkAgg, so the charts draw without a display."""
+
+    def __init__(self, figure, master=None):
+        super().__init__(figure)
+        self.draws = 0
+
+    def get_tk_widget(self):
+        return self
+
+    def pack(self, **options):
+        pass
+
+    def draw_idle(self):
+        self.draws += 1
+        self.draw()
+
+
+@pytest.fixture
+def chart(monkeypatch):
+    monkeypatch.setattr(charts, "FigureCanvasTkAgg", AggCanvas)
+    return charts.ReportChart(None)
+
+
+def report(scale=1.0, categories=("Food", "Internet")):
+    periods = 4
+    income = np.array([100.0, 120, 90, 110]) * scale
+    expense = np.array([60.0, 80, 70, 75]) * scale
+    return {
+        "granularity": "month",
+        "labels": [f"2024-0{month}" for month in range(1, periods + 1)],
+        "income": income,
+        "expense": expense,
+        "rolling_expense": expense.cumsum() / np.arange(1, periods + 1),
+        "balance": np.cumsum(income - expense),
+        "forecast_labels": ["2024-05", "2024-06"],
+        "forecast": np.array([78.0, 80]) * scale,
+        "categories": {name: expense / len(categories) for name in categories},
+    }
+
+
+def test_unchanged_report_is_not_redrawn(chart):
+    assert chart.update(report())
+    assert not chart.update(report())
+    assert chart.canvas.draws == 1
+
+
+def test_new_values_move_the_existing_artists(chart):
+    chart.update(report())
+    bars, line, patches = chart.income_bars, chart.balance_line, list(chart.category_ax.patches)
+    chart.update(report(scale=10))
+    assert chart.income_bars is bars and chart.balance_line is line and list(chart.category_ax.patches) == patches
+    assert [bar.get_height() for bar in bars] == [1000, 1200, 900, 1100]
+    assert list(line.get_ydata()) == list(np.cumsum(report(scale=10)["income"] - report(scale=10)["expense"]))
+    # The second category's bars sit on top of the first's
+    assert [bar.get_y() for bar in chart.category_bars[1]] == [bar.get_height() for bar in chart.category_bars[0]]
+    # The axes were rescaled to the new values
+    assert chart.flow_ax.get_ylim()[1] >= 1200
+    assert chart.balance_ax.get_ylim()[1] >= max(line.get_ydata())
+
+
+def test_new_categories_rebuild_the_chart(chart):
+    chart.update(report())
+    bars = chart.income_bars
+    chart.update(report(categories=("Food", "Internet", "Other")))
+    assert chart.income_bars is not bars
+    assert len(chart.category_bars) == 3
+    assert [text.get_text() for text in chart.category_ax.get_legend().get_texts()] == ["Food", "Internet", "Other"]
@@ -0,0 +1,93 @@
+import threading
+import time
+import pytest
+import connection_pool
+from connection_pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self):
+        self.alive = True
+        self.closed = False
+
+    def rollback(self):
+        if not self.alive:
+            raise ConnectionError("server has gone away")
+
+    def close(self):
+        self.closed = True
+
+
+def ping(conn):
+    if not conn.alive:
+        raise ConnectionError("server has gone away")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(connection_pool.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_recently_used_connections_are_not_pinged(clock):
+    pool = ConnectionPool(FakeConnection, ping, size=2, ping_after_idle=30)
+    conn = pool.acquire()
+    for _ in range(5):
+        pool.release(conn)
+        clock[0] += 1
+        assert pool.acquire() is conn
+    assert pool.pings == 0
+
+
+def test_idle_connections_are_pinged_and_replaced_when_dead(clock):
+    pool = ConnectionPool(FakeConnection, ping, size=1, ping_after_idle=30)
+    conn = pool.acquire()
+    pool.release(conn)
+    clock[0] += 31
+    conn.alive = False
+    fresh = pool.acquire()
+    assert pool.pings == 1
+    assert fresh is not conn and conn.closed
+
+
+def test_connection_that_died_in_use_is_dropped_on_release(clock):
+    pool = ConnectionPool(FakeConnection, ping, size=1, ping_after_idle=30)
+    conn = pool.acquire()
+    conn.alive = False
+    pool.release(conn)
+    assert conn.closed
+    assert pool.acquire() is not conn
+    assert pool.pings == 0
+
+
+def test_waiter_opens_a_connection_when_a_dead_one_is_dropped():
+    pool = ConnectionPool(FakeConnection, ping, size=1, timeout=5)
+    conn = pool.acquire()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.acquire()))
+    waiter.start()
+    time.sleep(0.05)
+    conn.alive = False
+    pool.release(conn)  # The rollback fails, so the connection is dropped rather than handed over
+    waiter.join(timeout=2)
+    assert got and got[0] is not conn
+
+
+def test_waiter_gets_a_released_connection():
+    pool = ConnectionPool(FakeConnection, ping, size=1, timeout=5)
+    conn = pool.acquire()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.acquire()))
+    waiter.start()
+    time.sleep(0.05)
+    pool.release(conn)
+    waiter.join(timeout=2)
+    assert got == [conn]
+
+
+def test_timeout_reports_the_wait_actually_used():
+    pool = ConnectionPool(FakeConnection, ping, size=1, timeout=10)
+    pool.acquire()
+    with pytest.raises(PoolTimeout, match=r"after 0\.05s"):
+        pool.acquire(timeout=0.05)
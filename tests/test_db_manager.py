@@ -0,0 +1,234 @@
+import datetime
+import os
+import re
+import uuid
+from decimal import Decimal
+import pytest
+from db_manager import DBManager, DashboardSnapshot
+
+# One suite for every backend: each test runs against SQLite, SQLite answering reads from the
+# in-memory store, and MySQL when BMS_TEST_MYSQL_HOST is set (BMS_TEST_MYSQL_USER and
+# BMS_TEST_MYSQL_PASSWORD as needed); the MySQL runs get a throwaway database each.
+
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bms.sql")
+JAN = datetime.date(2024, 1, 15)
+FEB = datetime.date(2024, 2, 10)
+MAR = datetime.date(2024, 3, 5)
+UNCATEGORISED = datetime.date(2024, 1, 2)
+
+
+def mysql_database():
+    """Creates a database with the bms.sql schema; returns its name and a function that drops it."""
+    pymysql = pytest.importorskip("pymysql")
+    settings = dict(host=os.environ["BMS_TEST_MYSQL_HOST"], user=os.environ.get("BMS_TEST_MYSQL_USER", "root"),
+                    password=os.environ.get("BMS_TEST_MYSQL_PASSWORD", ""))
+    name = f"bms_test_{uuid.uuid4().hex[:12]}"
+    with open(SCHEMA_FILE, encoding="utf-8") as stream:
+        script = re.sub(r"--[^\n]*", "", stream.read()).replace("bms_db", name)
+    conn = pymysql.connect(**settings)
+    with conn.cursor() as cursor:
+        for statement in script.split(";"):
+            if statement.strip():
+                cursor.execute(statement)
+    conn.commit()
+
+    def drop():
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP DATABASE `{name}`")
+        conn.close()
+    return settings, name, drop
+
+
+@pytest.fixture(params=["sqlite", "sqlite-in-memory", "mysql"])
+def db(request, tmp_path):
+    if request.param == "mysql":
+        if not os.environ.get("BMS_TEST_MYSQL_HOST"):
+            pytest.skip("Set BMS_TEST_MYSQL_HOST to run the suite against MySQL")
+        settings, name, drop = mysql_database()
+        db = DBManager(backend="mysql", database=name, **settings)
+    else:
+        drop = None
+        db = DBManager(backend="sqlite", path=str(tmp_path / "bms.sqlite3"), in_memory=request.param == "sqlite-in-memory")
+    assert db.pool, "could not connect"
+    yield db
+    db.close()
+    if drop:
+        drop()
+
+
+@pytest.fixture
+def ledger(db):
+    """A few months of transactions; returns their ids by description."""
+    rows = [
+        (JAN, 1000, "income", "Parental Money", "January allowance"),
+        (JAN, 120, "expense", "Canteen/Food", "Lunch at school"),
+        (JAN, 300, "expense", "Internet", "January internet bundle"),
+        (FEB, 1000, "income", "Parental Money", "February allowance"),
+        (FEB, 80, "expense", "Canteen/Food", "Lunch with friends"),
+        (FEB, 45.5, "expense", "Other", "Notebook"),
+        (MAR, 60, "expense", "Canteen/Food", "Dinner"),
+    ]
+    ids = {description: db.add_transaction(amount, trans_type, category, description, date)
+           for date, amount, trans_type, category, description in rows}
+    # Imports may leave category_id NULL
+    db.add_transactions_bulk([(UNCATEGORISED, Decimal("25"), "expense", None, "Cash withdrawal")])
+    ids["Cash withdrawal"] = db.search_transactions(description="withdrawal")[0]['id']
+    return ids
+
+
+def totals(rows):
+    return {row['category']: Decimal(str(row['total'])) for row in rows}
+
+
+def test_add_and_read_back(db, ledger):
+    row = db.get_transaction_by_id(ledger["Notebook"])
+    assert row['transaction_date'] == FEB
+    assert Decimal(str(row['amount'])) == Decimal("45.50")
+    assert (row['type'], row['category'], row['description']) == ("expense", "Other", "Notebook")
+    assert db.get_transaction_by_id(999999) is None
+
+
+def test_recent_transactions_are_newest_first(db, ledger):
+    recent = db.get_transactions(limit=3)
+    assert [row['description'] for row in recent] == ["Dinner", "Notebook", "Lunch with friends"]
+
+
+def test_summary(db, ledger):
+    summary = db.get_summary()
+    assert Decimal(str(summary['total_income'])) == Decimal("2000")
+    assert Decimal(str(summary['total_expense'])) == Decimal("630.50")
+    assert Decimal(str(summary['balance'])) == Decimal("1369.50")
+
+
+def test_spending_by_category(db, ledger):
+    assert totals(db.get_spending_by_category()) == {"Canteen/Food": Decimal("260"), "Internet": Decimal("300"), "Other": Decimal("45.50")}
+
+
+def test_spending_keeps_categories_with_an_empty_month(db, ledger):
+    # Deleting February's only Other expense leaves a zero rollup row next to a positive one
+    db.add_transaction(30, "expense", "Other", "Pens", JAN)
+    db.delete_transaction(ledger["Notebook"])
+    assert totals(db.get_spending_by_category())["Other"] == Decimal("30")
+    assert db.verify_rollups() == []
+
+
+def test_dashboard_snapshot_matches_the_separate_reads(db, ledger):
+    snapshot = db.get_dashboard_snapshot(recent=4)
+    assert isinstance(snapshot, DashboardSnapshot)
+    assert {key: Decimal(str(value)) for key, value in snapshot.summary.items()} == \
+        {key: Decimal(str(value)) for key, value in db.get_summary().items()}
+    assert totals(snapshot.spending) == totals(db.get_spending_by_category())
+    assert [row['id'] for row in snapshot.transactions] == [row['id'] for row in db.get_transactions(limit=4)]
+    assert snapshot.categories == sorted(db.get_categories())
+
+
+def test_update_and_delete_keep_rollups_in_step(db, ledger):
+    db.update_transaction(ledger["Dinner"], MAR, 90, "expense", "Other", "Dinner out")
+    row = db.get_transaction_by_id(ledger["Dinner"])
+    assert (row['category'], row['description'], Decimal(str(row['amount']))) == ("Other", "Dinner out", Decimal("90"))
+    assert db.delete_transaction(ledger["Lunch at school"]) is not None
+    assert db.get_transaction_by_id(ledger["Lunch at school"]) is None
+    assert db.delete_transaction(ledger["Lunch at school"]) is None
+    assert totals(db.get_spending_by_category())["Canteen/Food"] == Decimal("80")
+    assert db.verify_rollups() == []
+
+
+def test_search_pages_cover_every_match_once(db, ledger):
+    seen, cursor = [], None
+    while True:
+        rows, cursor = db.search_transactions_page(2, cursor, trans_type="expense")
+        seen += [row['id'] for row in rows]
+        if cursor is None:
+            break
+    expected = [row['id'] for row in db.search_transactions(trans_type="expense")]
+    assert seen == expected and len(seen) == 6
+
+
+def test_search_filters(db, ledger):
+    assert {row['description'] for row in db.search_transactions(description="lunch")} == {"Lunch at school", "Lunch with friends"}
+    assert {row['description'] for row in db.search_transactions(category="Canteen/Food", start_date=FEB)} == {"Lunch with friends", "Dinner"}
+    rows, cursor = db.search_transactions_page(10, start_date=JAN, end_date=JAN)
+    assert len(rows) == 3 and cursor is None
+
+
+def test_short_words_match_as_the_backend_matches_them(db, ledger):
+    db.add_transaction(15, "expense", "Other", "Cat food", FEB)
+    found = {row['description'] for row in db.search_transactions(description="at")}
+    # MySQL leaves "at" out of its full-text index and falls back to LIKE; FTS5 prefix-matches every word
+    assert found == ({"Lunch at school", "Cat food"} if db.backend.name == "mysql" else {"Lunch at school"})
+
+
+def test_uncategorised_rows_are_listed_but_not_in_spending(db, ledger):
+    row = db.get_transaction_by_id(ledger["Cash withdrawal"])
+    assert (row['transaction_date'], row['category']) == (UNCATEGORISED, None)
+    assert [row['description'] for row in db.search_transactions(start_date=UNCATEGORISED, end_date=UNCATEGORISED)] == ["Cash withdrawal"]
+    assert [row['id'] for row in db.get_transactions(limit=50)][-1] == ledger["Cash withdrawal"]
+    assert None not in totals(db.get_spending_by_category())
+    assert db.verify_rollups() == []
+
+
+def test_category_ids_beyond_16_bits(db, ledger):
+    db.execute_query("INSERT INTO categories (id, name) VALUES (40000, 'Travel')")
+    db.category_cache.invalidate()
+    trans_id = db.add_transaction(500, "expense", "Travel", "Bus to Kigali", MAR)
+    assert [row['id'] for row in db.search_transactions(category="Travel")] == [trans_id]
+    assert db.get_transactions(limit=1)[0]['category'] == "Travel"
+    assert totals(db.get_spending_by_category())["Travel"] == Decimal("500")
+
+
+def test_budgets(db, ledger):
+    db.set_budget("Canteen/Food", 100, 2, 2024)
+    db.set_budget("Canteen/Food", 150, 2, 2024)  # Replaces the first
+    budgets = {row['category']: row for row in db.get_budgets_for_month(2, 2024)}
+    assert Decimal(str(budgets["Canteen/Food"]['budget_amount'])) == Decimal("150")
+    assert Decimal(str(budgets["Canteen/Food"]['spent_amount'])) == Decimal("80")
+    assert Decimal(str(budgets["Internet"]['budget_amount'])) == 0
+
+
+def test_savings_goals(db):
+    goal_id = db.add_savings_goal("Laptop", 900)
+    assert db.add_to_savings_goal(goal_id, "Laptop", 50) is not None
+    goal = next(goal for goal in db.get_savings_goals() if goal['id'] == goal_id)
+    assert Decimal(str(goal['current_amount'])) == Decimal("50")
+    assert [row['description'] for row in db.search_transactions(category="Savings")] == ["Contribution to Laptop"]
+    assert db.add_to_savings_goal(999999, "Missing", 5) is None
+
+
+def test_bulk_insert(db):
+    category_id = db.get_category_id_by_name("Other")
+    rows = [(JAN + datetime.timedelta(days=day), Decimal("1.25"), "expense", category_id, f"item {day}") for day in range(40)]
+    assert db.add_transactions_bulk(rows) == 40
+    assert totals(db.get_spending_by_category())["Other"] == Decimal("50")
+    assert db.verify_rollups() == []
+
+
+def test_accounts_are_isolated(db, ledger):
+    other = db.for_account(db.add_account("Second"))
+    other.add_transaction(5, "expense", "Other", "Their coffee", JAN)
+    assert [row['description'] for row in other.get_transactions()] == ["Their coffee"]
+    assert "Their coffee" not in {row['description'] for row in db.get_transactions(limit=50)}
+    assert db.update_transaction(ledger["Dinner"], MAR, 1, "expense", "Other", "x") is not None
+    assert other.delete_transaction(ledger["Dinner"]) is None
+
+
+def test_data_version_moves_on_every_write(db):
+    version = db.get_data_version()
+    db.add_transaction(10, "expense", "Other", "Gum", JAN)
+    assert db.get_data_version() > version
+
+
+def test_recurring_catch_up_posts_each_occurrence_once(db):
+    db.add_recurring_rule(20, "expense", "Internet", "Subscription", "monthly", start_date=datetime.date(2024, 1, 31))
+    assert db.post_recurring_transactions(today=datetime.date(2024, 5, 1)) == 4
+    assert db.post_recurring_transactions(today=datetime.date(2024, 5, 1)) == 0
+    dates = sorted(row['transaction_date'] for row in db.search_transactions(description="Subscription"))
+    assert dates == [datetime.date(2024, 1, 31), datetime.date(2024, 2, 29), datetime.date(2024, 3, 31), datetime.date(2024, 4, 30)]
+    assert db.verify_rollups() == []
+    with pytest.raises(ValueError):
+        db.add_recurring_rule(20, "expense", "Internet", "Never", "weekly", every=0)
+
+
+@pytest.mark.parametrize("page_size", [0, -1])
+def test_search_page_size_must_be_positive(db, ledger, page_size):
+    with pytest.raises(ValueError):
+        db.search_transactions_page(page_size)
@@ -0,0 +1,199 @@
+import datetime
+import importlib
+import threading
+import sys
+import types
+import pytest
+from db_manager import DBManager
+
+# Builds the App without a display: customtkinter is replaced by stand-in widgets that accept
+# any option and record what they were configured with, and after() only queues callbacks,
+# which run_after() then runs as the Tk main loop would.
+
+
+class Widget:
+    def __init__(self, *args, **kwargs):
+        self.options = dict(kwargs)
+        self.scheduled = []
+        self._after_ids = 0
+
+    def __getattr__(self, name):
+        # grid, pack, bind, destroy, ... do nothing
+        return lambda *args, **kwargs: None
+
+    def configure(self, **kwargs):
+        self.options.update(kwargs)
+
+    def cget(self, name):
+        return self.options.get(name)
+
+    def get(self):
+        return self.options.get("value", "")
+
+    def set(self, *values):
+        self.options["value"] = values[0] if len(values) == 1 else values
+
+    def winfo_children(self):
+        return []
+
+    def winfo_exists(self):
+        return True
+
+    def winfo_height(self):
+        return 400
+
+    def after(self, delay, callback=None, *args):
+        self._after_ids += 1
+        self.scheduled.append((self._after_ids, delay, callback, args))
+        return self._after_ids
+
+    def after_cancel(self, after_id):
+        self.scheduled = [entry for entry in self.scheduled if entry[0] != after_id]
+
+
+def stub_customtkinter():
+    module = types.ModuleType("customtkinter")
+    classes = {}
+
+    def widget_class(name):
+        if name not in classes:
+            classes[name] = type(name, (Widget,), {})
+        return classes[name]
+
+    def module_getattr(name):
+        if name.startswith("CTk"):
+            return widget_class(name)
+        if name.startswith("set_"):
+            return lambda *args, **kwargs: None
+        raise AttributeError(name)
+    module.__getattr__ = module_getattr
+    return module
+
+
+@pytest.fixture
+def main_app(monkeypatch):
+    monkeypatch.setitem(sys.modules, "customtkinter", stub_customtkinter())
+    for name in ("main_app", "virtual_list", "charts"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    yield importlib.import_module("main_app")
+    for name in ("main_app", "virtual_list", "charts"):
+        sys.modules.pop(name, None)
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DBManager(backend="sqlite", path=str(tmp_path / "bms.sqlite3"))
+    yield db
+    db.close()
+
+
+def run_after(app, rounds=50, within_ms=1000):
+    """Runs the callbacks app.after() queued for the next within_ms (the executor's polls among
+    them) until no query is pending; timers further off, such as the hourly one, are left queued.
+    """
+    for _ in range(rounds):
+        due = [entry for entry in app.scheduled if entry[1] <= within_ms]
+        if not due and not app.executor.busy:
+            return
+        app.executor._pool.submit(lambda: None).result()
+        app.scheduled = [entry for entry in app.scheduled if entry not in due]
+        for _, _, callback, args in due:
+            callback(*args)
+
+
+def test_app_starts_before_its_footer_exists(main_app, db):
+    app = main_app.App(db)
+    try:
+        # The dashboard query was already running when the footer was built
+        assert app.loading_label.cget("text") == "Loading..."
+        assert app.status_bar is not None
+    finally:
+        app.executor.shutdown()
+
+
+def test_loading_indicator_clears_when_queries_finish(main_app, db, monkeypatch):
+    app = main_app.App(db)
+    monkeypatch.setattr(app, "render_dashboard", lambda data: None)
+    try:
+        run_after(app)
+        assert not app.executor.busy
+        assert app.loading_label.cget("text") == ""
+    finally:
+        app.executor.shutdown()
+
+
+@pytest.fixture
+def app(main_app, db, monkeypatch):
+    app = main_app.App(db)
+    monkeypatch.setattr(app, "render_dashboard", lambda data: None)
+    run_after(app)
+    yield app
+    app.executor.shutdown()
+
+
+def test_search_categories_load_after_history_was_left_early(app):
+    app.select_frame_by_name("history")
+    app.select_frame_by_name("dashboard")  # Cancels the history queries before they are delivered
+    run_after(app)
+    assert app.search_cat_combo.cget("values") == ["All Categories"]
+    app.select_frame_by_name("history")
+    run_after(app)
+    assert "Other" in app.search_cat_combo.cget("values")
+
+
+def test_cancelled_page_leaves_the_list_free_to_page(app):
+    app.select_frame_by_name("history")
+    assert app.history_results_frame.loading
+    app.select_frame_by_name("dashboard")
+    assert not app.history_results_frame.loading
+
+
+def test_failed_page_leaves_the_list_free_to_page(app, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("connection lost")
+    monkeypatch.setattr(app.db, "search_transactions_page", fail)
+    app.select_frame_by_name("history")
+    run_after(app)
+    assert not app.history_results_frame.loading
+    assert "connection lost" in app.status_bar.cget("text")
+
+
+def test_writes_commit_off_the_ui_thread(app, monkeypatch):
+    threads = []
+    add_transaction = app.db.add_transaction
+    monkeypatch.setattr(app.db, "add_transaction", lambda *args: threads.append(threading.current_thread()) or add_transaction(*args))
+    app.amount_entry.set("2500")
+    app.desc_entry.set("Bus fare")
+    app.category_combobox.set("Other")
+    app.repeat_combobox.set("Once")
+    app.add_transaction("expense")
+    # The form is only cleared once the write has committed
+    assert app.category_combobox.get() == "Other"
+    run_after(app)
+    assert threads and threading.main_thread() not in threads
+    assert app.category_combobox.get() == ""
+    assert app.status_bar.cget("text") == "Expense of 2,500 RWF added."
+    assert [row['description'] for row in app.db.get_transactions(limit=1)] == ["Bus fare"]
+
+
+def test_failed_write_is_reported(app, monkeypatch):
+    monkeypatch.setattr(app.db, "add_savings_goal", lambda name, target: None)
+    app.select_frame_by_name("savings")
+    run_after(app)
+    app.goal_name_entry.set("Bike")
+    app.goal_target_entry.set("50000")
+    app.create_goal_action()
+    run_after(app)
+    assert app.status_bar.cget("text") == "Error: Could not create the goal 'Bike'."
+
+
+def test_edit_window_reads_and_saves_in_the_background(app):
+    trans_id = app.db.add_transaction(100, "expense", "Other", "Tea", datetime.date(2024, 3, 1))
+    app.open_edit_window(trans_id)
+    assert app.edit_window is None
+    run_after(app)
+    assert app.edit_window is not None
+    app.save_edited_transaction(trans_id, "2024-03-02", "150", "expense", "Other", "Green tea")
+    run_after(app)
+    assert app.db.get_transaction_by_id(trans_id)['description'] == "Green tea"
+    assert app.status_bar.cget("text") == "Transaction updated."
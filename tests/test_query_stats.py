@@ -0,0 +1,30 @@
+from query_stats import QueryStats, estimate_bytes
+
+
+class CountingValue:
+    """A column value that counts how often its size is measured."""
+    measured = 0
+
+    def __str__(self):
+        CountingValue.measured += 1
+        return "12345"
+
+
+def test_small_results_are_measured_exactly():
+    rows = [{"id": 1, "description": "Lunch"}, {"id": 22, "description": "Bus"}]
+    assert estimate_bytes(rows) == len("1Lunch22Bus")
+
+
+def test_large_results_are_sampled():
+    CountingValue.measured = 0
+    rows = [(CountingValue(), CountingValue()) for _ in range(100000)]
+    assert estimate_bytes(rows, sample=16) == 100000 * 10
+    assert CountingValue.measured <= 2 * 17
+
+
+def test_record_counts_rows_and_bytes():
+    stats = QueryStats(slow_query_ms=None)
+    stats.record("SELECT   id FROM t WHERE id IN (%s, %s)", (1, 2), 0.001, rows=[{"id": 1}, {"id": 2}])
+    [shape] = stats.snapshot()["queries"]
+    assert shape["sql"] == "SELECT id FROM t WHERE id IN (...)"
+    assert (shape["calls"], shape["rows"], shape["bytes"]) == (1, 2, 2)
@@ -0,0 +1,322 @@
+import datetime
+import itertools
+import sys
+import threading
+import numpy as np
+from backends import search_words
+from rollups import from_cents
+from data_events import TransactionAdded, TransactionUpdated, TransactionDeleted, TransactionsImported
+
+# Every transaction as one element of a few parallel NumPy columns: about 29 bytes a row
+# instead of the several hundred a DictCursor row with Decimal and date objects costs.
+# Rows are kept sorted by (date, id), so date ranges are binary searches and newest-first
+# results are the matching positions read backwards. Descriptions are interned: each row
+# holds a code into one list of distinct descriptions, and a description search tests each
+# distinct text once rather than each row.
+
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+LOAD_BATCH = 50000
+TYPES = ("expense", "income")
+TYPE_CODES = {name: code for code, name in enumerate(TYPES)}
+EXPENSE, INCOME = TYPE_CODES["expense"], TYPE_CODES["income"]
+COLUMNS = {
+    "ids": np.int64,
+    "days": np.int32,
+    "cents": np.int64,
+    "types": np.int8,
+    "category_ids": np.int32,
+    "description_codes": np.int32,
+}
+MATCH_CACHE_SIZE = 32
+
+
+def to_days(date):
+    return date.toordinal() - EPOCH_ORDINAL
+
+
+def from_days(days):
+    return datetime.date.fromordinal(int(days) + EPOCH_ORDINAL)
+
+
+def to_cents(amount):
+    return int(round(amount * 100))
+
+
+def description_matcher(text, backend):
+    """Returns a function telling whether a description matches a search the way backend's database does.
+
+    Prefix words must each start a word of the description (the full-text match); the other
+    words must appear anywhere in it (the LIKE fallback). Which words are which is up to the
+    backend: MySQL leaves short words and stopwords out of its index, FTS5 indexes every word.
+    """
+    prefixes, substrings = backend.description_terms(text)
+
+    def matches(description):
+        if not description:
+            return False
+        lowered = description.lower()
+        if not all(word in lowered for word in substrings):
+            return False
+        tokens = search_words(description)
+        return all(any(token.startswith(prefix) for token in tokens) for prefix in prefixes)
+    return matches
+
+
+class TransactionStore:
+    def __init__(self, db):
+        """An in-memory copy of db's transactions; subscribes to db.events to stay current.
+
+        The first query loads it; a bulk import drops it to be reloaded on the next one.
+        """
+        self.db = db
+        for name, dtype in COLUMNS.items():
+            setattr(self, name, np.zeros(0, dtype=dtype))
+        self.descriptions = [None]  # Code 0 is a missing description
+        self._description_codes = {None: 0}
+        self.loaded = False
+        self.generation = 0
+        self.lock = threading.RLock()
+        self._pending = {}
+        self._max_id = 0
+        self._loading = None
+        self._matches = {}
+        self._watchers = []
+        self.unsubscribe = db.events.subscribe(self.on_data_change, TransactionAdded, TransactionUpdated, TransactionDeleted, TransactionsImported)
+
+    def load(self):
+        """Reads every transaction into the columns, LOAD_BATCH rows at a time."""
+        with self.lock:
+            self._loading = []  # Changes committed while the rows stream in, replayed afterwards
+        try:
+            parts = {name: [] for name in COLUMNS}
+            rows = self.db.stream_ledger(batch_size=LOAD_BATCH)
+            while True:
+                batch = list(itertools.islice(rows, LOAD_BATCH))
+                if not batch:
+                    break
+                count = len(batch)
+                parts["ids"].append(np.fromiter((row['id'] for row in batch), np.int64, count))
+                parts["days"].append(np.fromiter((to_days(row['transaction_date']) for row in batch), np.int32, count))
+                parts["cents"].append(np.fromiter((to_cents(row['amount']) for row in batch), np.int64, count))
+                parts["types"].append(np.fromiter((TYPE_CODES[row['type']] for row in batch), np.int8, count))
+                parts["category_ids"].append(np.fromiter((row['category_id'] or 0 for row in batch), np.int32, count))
+                with self.lock:
+                    parts["description_codes"].append(np.fromiter((self._intern(row['description']) for row in batch), np.int32, count))
+        except BaseException:
+            with self.lock:
+                self._loading = None
+            raise
+        with self.lock:
+            for name, dtype in COLUMNS.items():
+                setattr(self, name, np.concatenate(parts[name]) if parts[name] else np.zeros(0, dtype=dtype))
+            order = np.lexsort((self.ids, self.days))
+            for name in COLUMNS:
+                setattr(self, name, getattr(self, name)[order])
+            self._max_id = int(self.ids.max()) if len(self.ids) else 0
+            self._pending = {}
+            self.loaded = True
+            self.generation += 1
+            replay, self._loading = self._loading, None
+            self._notify(None)
+            for event in replay:
+                self.on_data_change(event)
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            self.load()
+
+    def watch(self, callback):
+        """Calls callback(day, cents, type_code, category_id, sign) under the lock for every row change,
+        and callback(None) whenever the columns are reloaded or dropped; returns a function that stops the calls.
+        """
+        with self.lock:
+            self._watchers.append(callback)
+
+        def unwatch():
+            with self.lock:
+                if callback in self._watchers:
+                    self._watchers.remove(callback)
+        return unwatch
+
+    def _notify(self, change):
+        for callback in self._watchers:
+            callback(change)
+
+    def _intern(self, description):
+        code = self._description_codes.get(description)
+        if code is None:
+            code = self._description_codes[description] = len(self.descriptions)
+            self.descriptions.append(description)
+        return code
+
+    def on_data_change(self, event):
+        with self.lock:
+            if self._loading is not None:
+                self._loading.append(event)
+                return
+            if isinstance(event, TransactionsImported):
+                self.loaded = False  # Cheaper to reload once than to replay a bulk import row by row
+                self._notify(None)
+                return
+            if not self.loaded:
+                return
+            for trans, sign in event.contributions():
+                row = self._encode(trans)
+                # Removing first makes replaying a change the load already saw harmless
+                self._remove(trans['id'], row[1])
+                if sign > 0:
+                    self._pending[trans['id']] = row
+                self._notify((row[1], row[2], row[3], row[4], sign))
+
+    def _encode(self, trans):
+        return (
+            trans['id'],
+            to_days(trans['transaction_date']),
+            to_cents(trans['amount']),
+            TYPE_CODES[trans['type']],
+            self.db.get_category_id_by_name(trans['category']) or 0,
+            self._intern(trans['description']),
+        )
+
+    def _remove(self, transaction_id, day):
+        if self._pending.pop(transaction_id, None) is not None or transaction_id > self._max_id:
+            return
+        start, stop = np.searchsorted(self.days, [day, day + 1])
+        positions = start + np.flatnonzero(self.ids[start:stop] == transaction_id)
+        if len(positions):
+            for name in COLUMNS:
+                setattr(self, name, np.delete(getattr(self, name), positions))
+
+    def compact(self):
+        """Merges rows added since the last query into the sorted columns."""
+        with self.lock:
+            if not self._pending:
+                return
+            rows = sorted(self._pending.values(), key=lambda row: (row[1], row[0]))
+            self._pending = {}
+            new = {name: np.array(values, dtype=COLUMNS[name]) for name, values in zip(COLUMNS, zip(*rows))}
+            keys = (self.days.astype(np.int64) << 32) | self.ids
+            positions = np.searchsorted(keys, (new["days"].astype(np.int64) << 32) | new["ids"])
+            for name in COLUMNS:
+                setattr(self, name, np.insert(getattr(self, name), positions, new[name]))
+            self._max_id = max(self._max_id, int(new["ids"].max()))
+
+    def ensure_current(self):
+        """Loads the columns if needed and merges in any pending rows."""
+        self.ensure_loaded()
+        self.compact()
+
+    def _description_mask(self, text):
+        """A boolean per distinct description: does it match `text`? Extended as new descriptions appear."""
+        known, mask = self._matches.pop(text, (0, np.zeros(0, dtype=bool)))
+        if known < len(self.descriptions):
+            matches = description_matcher(text, self.db.backend)
+            added = np.fromiter((matches(description) for description in self.descriptions[known:]), bool, len(self.descriptions) - known)
+            mask = np.concatenate((mask, added))
+        self._matches[text] = (len(self.descriptions), mask)
+        if len(self._matches) > MATCH_CACHE_SIZE:
+            del self._matches[next(iter(self._matches))]
+        return mask
+
+    def _select(self, description=None, category=None, trans_type=None, start_date=None, end_date=None, before=None):
+        """Positions of the matching rows, oldest first."""
+        start = np.searchsorted(self.days, to_days(start_date)) if start_date else 0
+        stop = np.searchsorted(self.days, to_days(end_date), side="right") if end_date else len(self.days)
+        if before:
+            last_date, last_id = before
+            keys = (self.days[start:stop].astype(np.int64) << 32) | self.ids[start:stop]
+            stop = start + np.searchsorted(keys, (to_days(last_date) << 32) | last_id)
+        if stop <= start:
+            return np.zeros(0, dtype=np.int64)
+        mask = np.ones(stop - start, dtype=bool)
+        if category:
+            category_id = self.db.get_category_id_by_name(category)
+            if category_id is None:
+                return np.zeros(0, dtype=np.int64)
+            mask &= self.category_ids[start:stop] == category_id
+        if trans_type:
+            if trans_type not in TYPE_CODES:
+                return np.zeros(0, dtype=np.int64)
+            mask &= self.types[start:stop] == TYPE_CODES[trans_type]
+        if description:
+            mask &= self._description_mask(description)[self.description_codes[start:stop]]
+        return start + np.flatnonzero(mask)
+
+    def _rows(self, positions):
+        """Builds TRANSACTION_COLUMNS rows for the given positions, converting each column in one pass."""
+        dates = {day: from_days(day) for day in np.unique(self.days[positions]).tolist()}
+        names = self.db.category_cache.name_for
+        categories = {category_id: names(category_id) for category_id in np.unique(self.category_ids[positions]).tolist()}
+        descriptions = self.descriptions
+        return [
+            {
+                'id': transaction_id,
+                'transaction_date': dates[day],
+                'amount': from_cents(cents),
+                'type': TYPES[type_code],
+                'category': categories[category_id],
+                'description': descriptions[code],
+            }
+            for transaction_id, day, cents, type_code, category_id, code in zip(
+                self.ids[positions].tolist(), self.days[positions].tolist(), self.cents[positions].tolist(),
+                self.types[positions].tolist(), self.category_ids[positions].tolist(), self.description_codes[positions].tolist())
+        ]
+
+    def search(self, description=None, category=None, trans_type=None, start_date=None, end_date=None, before=None, limit=None):
+        """search_transactions() answered from memory: matching rows newest first, as TRANSACTION_COLUMNS rows.
+
+        before=(date, id) keeps only rows older than that key, for keyset paging; limit caps the rows returned.
+        description matches as the database's own search does (see description_matcher), e.g. on
+        SQLite "at" finds "Lunch at school" but not "Cat food", since FTS5 matches word prefixes.
+        """
+        with self.lock:
+            self.ensure_current()
+            positions = self._select(description, category, trans_type, start_date, end_date, before)[::-1]
+            if limit is not None:
+                positions = positions[:limit]
+            return self._rows(positions)
+
+    def count(self, **filters):
+        """How many rows search(**filters) would return, without building them."""
+        with self.lock:
+            self.ensure_current()
+            return len(self._select(**filters))
+
+    def summary(self):
+        """get_summary() answered from memory."""
+        with self.lock:
+            self.ensure_current()
+            income = int(self.cents[self.types == INCOME].sum())
+            expense = int(self.cents[self.types == EXPENSE].sum())
+        return {
+            "total_income": from_cents(income),
+            "total_expense": from_cents(expense),
+            "balance": from_cents(income - expense),
+        }
+
+    def spending_by_category(self, start_date=None, end_date=None):
+        """{category_id: expense in cents} over an optional date range.
+
+        Uncategorised expense (category_id 0) is left out, as the database's per-category reports leave it out.
+        """
+        with self.lock:
+            self.ensure_current()
+            start = np.searchsorted(self.days, to_days(start_date)) if start_date else 0
+            stop = np.searchsorted(self.days, to_days(end_date), side="right") if end_date else len(self.days)
+            expense = self.types[start:stop] == EXPENSE
+            category_ids = self.category_ids[start:stop][expense]
+            cents = self.cents[start:stop][expense]
+        if len(category_ids) == 0:
+            return {}
+        totals = np.bincount(category_ids, weights=cents)
+        # Weighted bincounts sum in float64, which is exact for totals below 2**53 cents
+        return {int(category_id): int(round(totals[category_id])) for category_id in np.flatnonzero(np.bincount(category_ids)) if category_id}
+
+    def nbytes(self):
+        """Approximate memory held by the columns and the interned descriptions."""
+        with self.lock:
+            columns = sum(getattr(self, name).nbytes for name in COLUMNS)
+            return columns + sum(sys.getsizeof(text) for text in self.descriptions) + sys.getsizeof(self.descriptions)
+
+    def close(self):
+        self.unsubscribe()
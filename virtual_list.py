@@ -0,0 +1,198 @@
+import customtkinter as ctk
+
+ROW_HEIGHT = 44
+PAGE_SIZE = 100
+
+
+class TransactionRow(ctk.CTkFrame):
+    def __init__(self, master, on_edit, on_delete, height):
+        """A reusable row widget; show() rebinds it to a different transaction."""
+        super().__init__(master, height=height)
+        self.grid_propagate(False)
+        self.grid_columnconfigure(1, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+        self.index = None
+        self.trans_id = None
+        self.date_label = ctk.CTkLabel(self, text="", width=80)
+        self.date_label.grid(row=0, column=0, padx=5, pady=5, sticky="w")
+        self.desc_label = ctk.CTkLabel(self, text="", anchor="w")
+        self.desc_label.grid(row=0, column=1, padx=5, pady=5, sticky="w")
+        self.category_label = ctk.CTkLabel(self, text="", anchor="w", text_color="gray60")
+        self.category_label.grid(row=0, column=2, padx=5, pady=5, sticky="w")
+        self.amount_label = ctk.CTkLabel(self, text="", font=ctk.CTkFont(weight="bold"), width=100, anchor="e")
+        self.amount_label.grid(row=0, column=3, padx=5, pady=5, sticky="e")
+        ctk.CTkButton(self, text="Edit", width=40, command=lambda: on_edit(self.trans_id)).grid(row=0, column=4, padx=5)
+        ctk.CTkButton(self, text="Del", width=40, command=lambda: on_delete(self.trans_id)).grid(row=0, column=5, padx=(0,5))
+
+    def show(self, index, trans):
+        self.index = index
+        self.trans_id = trans['id']
+        self.date_label.configure(text=trans['transaction_date'].strftime("%Y-%m-%d"))
+        self.desc_label.configure(text=trans['description'])
+        self.category_label.configure(text=trans['category'] or "")
+        amount_color = "#4CAF50" if trans['type'] == 'income' else "#F44336"
+        self.amount_label.configure(text=f"{trans['amount']:,.0f} RWF", text_color=amount_color)
+
+
+class VirtualTransactionList(ctk.CTkFrame):
+    def __init__(self, master, label_text, on_edit, on_delete, submit=None, row_height=ROW_HEIGHT, **kwargs):
+        """A transaction list that only builds widgets for the rows in view.
+
+        Row widgets are pooled and rebound as the list scrolls. Rows come either from
+        show_rows() or page by page from load(); pages are requested through
+        submit(func, on_done, on_dropped) so they can be fetched off the UI thread, and
+        on_dropped() is called instead of on_done when a page fails or is cancelled.
+        """
+        super().__init__(master, **kwargs)
+        self.on_edit = on_edit
+        self.on_delete = on_delete
+        self.submit = submit or (lambda func, on_done, on_dropped: on_done(func()))
+        self.row_height = row_height
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+        ctk.CTkLabel(self, text=label_text).grid(row=0, column=0, columnspan=2, pady=(5, 0))
+        self.viewport = ctk.CTkFrame(self, fg_color="transparent")
+        self.viewport.grid(row=1, column=0, sticky="nsew", padx=(5, 0), pady=5)
+        self.scrollbar = ctk.CTkScrollbar(self, command=self.on_scrollbar)
+        self.scrollbar.grid(row=1, column=1, sticky="ns", pady=5)
+        self.empty_label = ctk.CTkLabel(self.viewport, text="No transactions found.")
+
+        self.rows = []
+        self.row_widgets = []
+        self.top = 0
+        self.fetch_page = None
+        self.next_page = None
+        self.loading = False
+        self.generation = 0
+
+        self.viewport.bind("<Configure>", lambda event: self.redraw())
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.bind_all(sequence, self.on_mousewheel, add="+")
+
+    def show_rows(self, rows):
+        """Display a fixed list of rows with no further paging."""
+        self.generation += 1
+        self.fetch_page = None
+        self.next_page = None
+        self.loading = False
+        self.rows = list(rows or [])
+        self.top = 0
+        self.redraw(force=True)
+
+    def load(self, fetch_page, on_loaded=None):
+        """Reset the list and page through fetch_page(token) -> (rows, next_token) as the user scrolls."""
+        self.generation += 1
+        self.fetch_page = fetch_page
+        self.next_page = None
+        self.rows = []
+        self.top = 0
+        self.request_page(None, on_loaded)
+
+    def remove_row(self, trans_id):
+        """Drops the loaded row with this id; returns False if it is not loaded."""
+        for index, row in enumerate(self.rows):
+            if row['id'] == trans_id:
+                del self.rows[index]
+                self.redraw(force=True)
+                return True
+        return False
+
+    def insert_row(self, trans, limit=None):
+        """Inserts a row at its newest-first (transaction_date, id) position, keeping at most limit rows.
+
+        Returns False when the row belongs to a page that has not been loaded yet.
+        """
+        if self.loading and not self.rows:
+            return False  # The first page is still on its way
+        key = (trans['transaction_date'], trans['id'])
+        position = next((index for index, row in enumerate(self.rows) if (row['transaction_date'], row['id']) < key), len(self.rows))
+        if position == len(self.rows) and self.next_page is not None:
+            return False
+        if limit is not None and position >= limit:
+            return False
+        self.rows.insert(position, trans)
+        if limit is not None:
+            del self.rows[limit:]
+        self.redraw(force=True)
+        return True
+
+    def request_page(self, token, on_loaded=None):
+        self.loading = True
+        generation = self.generation
+        fetch_page = self.fetch_page
+
+        def on_done(result):
+            if generation != self.generation:
+                return
+            rows, next_token = result
+            self.loading = False
+            self.rows.extend(rows or [])
+            self.next_page = next_token
+            self.redraw(force=True)
+            if on_loaded:
+                on_loaded()
+
+        def on_dropped():
+            # The next scroll asks for the page again
+            if generation == self.generation:
+                self.loading = False
+
+        self.submit(lambda: fetch_page(token), on_done, on_dropped)
+
+    def visible_count(self):
+        return self.viewport.winfo_height() // self.row_height + 2
+
+    def redraw(self, force=False):
+        height = self.viewport.winfo_height()
+        total = len(self.rows) * self.row_height
+        self.top = max(0, min(self.top, total - height))
+        first = self.top // self.row_height
+        visible = self.visible_count()
+        while len(self.row_widgets) < visible:
+            self.row_widgets.append(TransactionRow(self.viewport, self.on_edit, self.on_delete, height=self.row_height - 4))
+        for offset, row in enumerate(self.row_widgets):
+            index = first + offset
+            if offset < visible and index < len(self.rows):
+                if force or row.index != index:
+                    row.show(index, self.rows[index])
+                row.place(x=0, y=index * self.row_height - self.top, relwidth=1)
+            else:
+                row.index = None
+                row.place_forget()
+
+        if self.rows or self.loading:
+            self.empty_label.place_forget()
+        else:
+            self.empty_label.place(relx=0.5, y=10, anchor="n")
+        if total > height:
+            self.scrollbar.set(self.top / total, (self.top + height) / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+        # Fetch the next page once the viewport is within a screenful of the loaded rows
+        if self.next_page is not None and not self.loading and first + 2 * visible >= len(self.rows):
+            self.request_page(self.next_page)
+
+    def scroll_to(self, top):
+        self.top = int(top)
+        self.redraw()
+
+    def on_scrollbar(self, action, amount, unit=None):
+        total = len(self.rows) * self.row_height
+        if action == "moveto":
+            self.scroll_to(float(amount) * total)
+        elif unit == "pages":
+            self.scroll_to(self.top + int(amount) * self.viewport.winfo_height())
+        else:
+            self.scroll_to(self.top + (1 if float(amount) > 0 else -1) * self.row_height)
+
+    def on_mousewheel(self, event):
+        if not str(event.widget).startswith(str(self.viewport)):
+            return
+        if event.num == 4:
+            steps = -1
+        elif event.num == 5:
+            steps = 1
+        else:
+            steps = -1 if event.delta > 0 else 1
+        self.scroll_to(self.top + steps * self.row_height)
@@ -0,0 +1,67 @@
+import datetime
+import json
+import os
+from decimal import Decimal
+
+# The dashboard as it was last drawn, saved when the app closes so the next launch can show
+# it before any query has run. Each snapshot is stamped with the database it came from, the
+# account and DBManager.get_data_version() at the time it was read, so the app can tell
+# with one cheap query whether it is still current.
+
+FORMAT_VERSION = 1
+
+
+def encode(value):
+    if isinstance(value, Decimal):
+        return {"$decimal": str(value)}
+    if isinstance(value, datetime.datetime):
+        return {"$datetime": value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {"$date": value.isoformat()}
+    raise TypeError(f"Cannot save {type(value).__name__} in a snapshot")
+
+
+def decode(value):
+    if "$decimal" in value:
+        return Decimal(value["$decimal"])
+    if "$datetime" in value:
+        return datetime.datetime.fromisoformat(value["$datetime"])
+    if "$date" in value:
+        return datetime.date.fromisoformat(value["$date"])
+    return value
+
+
+class SnapshotFile:
+    def __init__(self, path):
+        self.path = path
+
+    def load(self, db):
+        """Returns (data version, dashboard parts) saved for db's database and account, or None."""
+        try:
+            with open(self.path, encoding="utf-8") as stream:
+                saved = json.load(stream, object_hook=decode)
+        except (OSError, ValueError) as e:
+            if not isinstance(e, FileNotFoundError):
+                print(f"Ignoring unreadable dashboard snapshot: {e}")
+            return None
+        if saved.get("format") != FORMAT_VERSION or saved.get("source") != db.backend.location or saved.get("account_id") != db.account_id:
+            return None
+        return saved.get("version"), saved["parts"]
+
+    def save(self, db, version, parts):
+        """Writes the snapshot atomically, so a crash mid-write leaves the previous one intact."""
+        saved = {
+            "format": FORMAT_VERSION,
+            "source": db.backend.location,
+            "account_id": db.account_id,
+            "version": version,
+            "saved_at": datetime.datetime.now(),
+            "parts": parts,
+        }
+        temporary = f"{self.path}.tmp"
+        try:
+            with open(temporary, "w", encoding="utf-8") as stream:
+                json.dump(saved, stream, default=encode, separators=(",", ":"))
+            os.replace(temporary, self.path)
+        except (OSError, TypeError) as e:
+            print(f"Could not save the dashboard snapshot: {e}")
@@ -0,0 +1,117 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, wait
+
+# Durability levels for WriteQueue.submit():
+#   immediate - the write runs on the caller's thread and is committed before submit() returns
+#   group     - the write is committed before submit() returns, but in one commit with every
+#               other write queued meanwhile (concurrent writers share the fsync)
+#   deferred  - submit() returns at once; the write commits within max_delay_ms, and is lost
+#               if the process dies first. flush() waits for everything submitted so far.
+DURABILITY_LEVELS = ("immediate", "group", "deferred")
+
+
+class WriteQueue:
+    def __init__(self, db, durability="immediate", max_delay_ms=5, max_batch=200):
+        """Runs DBManager writes as units of work, coalescing queued ones into group commits."""
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"Unknown durability level: {durability!r}")
+        self.db = db
+        self.durability = durability
+        self.max_delay = max_delay_ms / 1000
+        self.max_batch = max_batch
+        self.commits = 0
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, func, *args, **kwargs):
+        """Runs func(*args, **kwargs) in a transaction of its own or of a group; returns a Future of its result.
+
+        Each write is its own unit of work: if it raises, its statements are rolled back and
+        the exception is set on its Future, without affecting the rest of the group.
+        """
+        future = Future()
+        if self.durability == "immediate":
+            try:
+                with self.db.transaction():
+                    result = func(*args, **kwargs)
+                future.set_result(result)
+            except Exception as e:
+                future.set_exception(e)
+            self.commits += 1
+            return future
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="bms-write-queue", daemon=True)
+                self._thread.start()
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+        self._queue.put((future, func, args, kwargs))
+        if self.durability == "group":
+            wait([future])
+        return future
+
+    def _done(self, future):
+        with self._lock:
+            self._pending.discard(future)
+
+    def flush(self, timeout=None):
+        """Blocks until every write submitted so far is committed (or has failed)."""
+        with self._lock:
+            pending = list(self._pending)
+        wait(pending, timeout=timeout)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            # Group writers are waiting on the commit, so take only what queued up during the
+            # previous one; deferred writers are not, so wait a little for more
+            delay = self.max_delay if self.durability == "deferred" else 0
+            deadline = time.monotonic() + delay
+            stop = False
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+            if stop:
+                return
+
+    def _commit(self, batch):
+        outcomes = []
+        try:
+            with self.db.transaction():
+                for future, func, args, kwargs in batch:
+                    try:
+                        with self.db.transaction():  # Savepoint: a failed write only undoes itself
+                            result = func(*args, **kwargs)
+                        outcomes.append((future, result, None))
+                    except Exception as e:
+                        outcomes.append((future, None, e))
+        except Exception as e:
+            # The commit itself failed, so none of the batch is durable
+            outcomes = [(future, None, e) for future, *_ in batch]
+        self.commits += 1
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def close(self):
+        """Commits whatever is still queued and stops the writer thread."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None